@@ -0,0 +1,180 @@
+import asyncio
+import hashlib
+import heapq
+import hmac
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from loguru import logger
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import OperationFailure, PyMongoError
+
+from .config import get_settings
+
+# Returned by standalone servers, which have no oplog to watch.
+CHANGE_STREAMS_UNSUPPORTED = 40573
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after a TTL or at an explicit deadline."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.time()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        if expires_at is None:
+            expires_at = time.time() + self.ttl
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data), "maxsize": self.maxsize}
+
+
+class OrgCache(TTLCache):
+    """Organization metadata keyed by name, with an ``_id`` index so change events can evict renamed orgs."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        super().__init__(maxsize, ttl)
+        self._names_by_id: Dict[Any, str] = {}
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None) -> None:
+        super().set(key, value, expires_at)
+        if "_id" in value:
+            self._names_by_id[value["_id"]] = key
+        if len(self._names_by_id) > 2 * max(self.maxsize, 1):
+            self._names_by_id = {doc_id: name for doc_id, name in self._names_by_id.items() if name in self._data}
+
+    def invalidate(self, *names: Optional[str]) -> None:
+        for name in names:
+            if name is None:
+                continue
+            value = self.pop(name)
+            if value is not None:
+                self._names_by_id.pop(value.get("_id"), None)
+
+    def invalidate_id(self, doc_id: Any) -> None:
+        name = self._names_by_id.pop(doc_id, None)
+        if name is not None:
+            self.pop(name)
+
+    def clear(self) -> None:
+        super().clear()
+        self._names_by_id.clear()
+
+
+class TokenCache:
+    """Already-verified JWT payloads, each evicted at its own ``exp``, plus the revocations this process has seen.
+
+    Revocations are authoritative in Mongo (see ``utils.verify_access_token``); the set here only
+    short-circuits known ones, so forgetting an entry when it is full costs a lookup, not a revocation.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self._verified = TTLCache(maxsize, ttl=0)
+        self._revoked: Dict[str, float] = {}
+
+    @staticmethod
+    def digest(token: str) -> str:
+        # Keyed by the signing secret so a rotated key never serves payloads verified under the old one.
+        secret = get_settings().secret_key.encode()
+        return hmac.new(secret, token.encode(), hashlib.sha256).hexdigest()
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        return self._verified.get(digest)
+
+    def add(self, digest: str, payload: Dict[str, Any]) -> None:
+        exp = payload.get("exp")
+        if exp is not None:
+            self._verified.set(digest, payload, expires_at=float(exp))
+
+    def revoke(self, digest: str, expires_at: float) -> None:
+        self._verified.pop(digest)
+        now = time.time()
+        limit = max(self._verified.maxsize, 1)
+        if len(self._revoked) >= limit:
+            self._revoked = {key: exp for key, exp in self._revoked.items() if exp > now}
+        if len(self._revoked) >= limit:
+            # Still full: forget the revocations closest to expiring; Mongo still refuses their tokens.
+            for key in heapq.nsmallest(len(self._revoked) - limit + 1, self._revoked, key=self._revoked.__getitem__):
+                del self._revoked[key]
+        self._revoked[digest] = expires_at
+
+    def is_revoked(self, digest: str) -> bool:
+        return digest in self._revoked
+
+    def clear(self) -> None:
+        self._verified.clear()
+        self._revoked.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._verified.stats(), "revoked": len(self._revoked)}
+
+
+def _build_org_cache() -> OrgCache:
+    settings = get_settings()
+    return OrgCache(settings.org_cache_size, settings.org_cache_ttl_seconds)
+
+
+org_cache = _build_org_cache()
+token_cache = TokenCache(get_settings().token_cache_size)
+
+
+async def watch_organization_changes(collection: AsyncIOMotorCollection, cache: OrgCache = org_cache) -> None:
+    """Evict cache entries changed by other workers; requires a replica set or sharded cluster."""
+    while True:
+        try:
+            async with collection.watch(full_document="updateLookup") as stream:
+                # Anything written while the stream was down was missed.
+                cache.clear()
+                async for change in stream:
+                    cache.invalidate_id(change["documentKey"]["_id"])
+                    full_document = change.get("fullDocument")
+                    if full_document:
+                        cache.invalidate(full_document.get("organization_name"))
+        except asyncio.CancelledError:
+            raise
+        except PyMongoError as exc:
+            if isinstance(exc, OperationFailure) and exc.code == CHANGE_STREAMS_UNSUPPORTED:
+                logger.warning("Organization change stream unavailable, relying on TTL expiry: {}", exc)
+                return
+            logger.warning("Organization change stream interrupted, reconnecting: {}", exc)
+            cache.clear()
+            await asyncio.sleep(1)
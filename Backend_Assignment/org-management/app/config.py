@@ -1,4 +1,6 @@
 from functools import lru_cache
+from typing import Dict, List, Literal, Optional
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -6,9 +8,75 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class Settings(BaseSettings):
     mongodb_uri: str = Field(default="mongodb://localhost:27017", alias="MONGODB_URI")
     master_db_name: str = Field(default="org_master", alias="MASTER_DB_NAME")
+    mongo_max_pool_size: int = Field(default=100, alias="MONGO_MAX_POOL_SIZE")
+    mongo_min_pool_size: int = Field(default=10, alias="MONGO_MIN_POOL_SIZE")
+    mongo_max_idle_time_ms: Optional[int] = Field(default=300000, alias="MONGO_MAX_IDLE_TIME_MS")
+    mongo_wait_queue_timeout_ms: Optional[int] = Field(default=5000, alias="MONGO_WAIT_QUEUE_TIMEOUT_MS")
+    mongo_server_selection_timeout_ms: int = Field(default=5000, alias="MONGO_SERVER_SELECTION_TIMEOUT_MS")
+    mongo_compressors: str = Field(default="", alias="MONGO_COMPRESSORS")
+    mongo_read_preference: Literal["primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"] = Field(
+        default="primary", alias="MONGO_READ_PREFERENCE"
+    )
+    mongo_max_staleness_seconds: int = Field(default=-1, alias="MONGO_MAX_STALENESS_SECONDS")
     secret_key: str = Field(default="changeme", alias="SECRET_KEY")
     algorithm: str = Field(default="HS256", alias="ALGORITHM")
-    access_token_expire_minutes: int = Field(default=60, alias="ACCESS_TOKEN_EXPIRE_MINUTES")
+    access_token_expire_minutes: int = Field(default=15, alias="ACCESS_TOKEN_EXPIRE_MINUTES")
+    refresh_token_expire_days: int = Field(default=30, alias="REFRESH_TOKEN_EXPIRE_DAYS")
+    login_rate_limit_backend: Literal["memory", "mongo"] = Field(default="memory", alias="LOGIN_RATE_LIMIT_BACKEND")
+    login_rate_limit_max_keys: int = Field(default=100000, alias="LOGIN_RATE_LIMIT_MAX_KEYS")
+    login_ip_burst: int = Field(default=0, alias="LOGIN_IP_BURST")
+    login_ip_per_minute: float = Field(default=60.0, alias="LOGIN_IP_PER_MINUTE")
+    login_email_burst: int = Field(default=5, alias="LOGIN_EMAIL_BURST")
+    login_email_per_minute: float = Field(default=5.0, alias="LOGIN_EMAIL_PER_MINUTE")
+    hash_executor: Literal["thread", "process"] = Field(default="thread", alias="HASH_EXECUTOR")
+    hash_workers: Optional[int] = Field(default=None, alias="HASH_WORKERS")
+    hash_max_concurrency: Optional[int] = Field(default=None, alias="HASH_MAX_CONCURRENCY")
+    hash_queue_size: int = Field(default=256, alias="HASH_QUEUE_SIZE")
+    migration_batch_size: int = Field(default=1000, alias="MIGRATION_BATCH_SIZE")
+    org_cache_size: int = Field(default=10000, alias="ORG_CACHE_SIZE")
+    org_cache_ttl_seconds: float = Field(default=30.0, alias="ORG_CACHE_TTL_SECONDS")
+    org_cache_change_stream: bool = Field(default=False, alias="ORG_CACHE_CHANGE_STREAM")
+    token_cache_size: int = Field(default=10000, alias="TOKEN_CACHE_SIZE")
+    bulk_create_max_items: int = Field(default=10000, alias="BULK_CREATE_MAX_ITEMS")
+    bulk_create_chunk_size: int = Field(default=100, alias="BULK_CREATE_CHUNK_SIZE")
+    bulk_create_max_bytes: int = Field(default=8 * 1024 * 1024, alias="BULK_CREATE_MAX_BYTES")
+    bulk_create_admin_emails: List[str] = Field(default_factory=list, alias="BULK_CREATE_ADMIN_EMAILS")
+    batch_get_max_names: int = Field(default=5000, alias="BATCH_GET_MAX_NAMES")
+    tenant_query_max_limit: int = Field(default=1000, alias="TENANT_QUERY_MAX_LIMIT")
+    tenant_bulk_max_operations: int = Field(default=10000, alias="TENANT_BULK_MAX_OPERATIONS")
+    tenant_bulk_max_bytes: int = Field(default=16 * 1024 * 1024, alias="TENANT_BULK_MAX_BYTES")
+    tenant_bulk_batch_size: int = Field(default=1000, alias="TENANT_BULK_BATCH_SIZE")
+    tenant_bulk_concurrency: int = Field(default=8, alias="TENANT_BULK_CONCURRENCY")
+    tenant_bulk_queue_size: int = Field(default=32, alias="TENANT_BULK_QUEUE_SIZE")
+    tenant_write_lease_seconds: float = Field(default=60.0, alias="TENANT_WRITE_LEASE_SECONDS")
+    export_batch_size: int = Field(default=2000, alias="EXPORT_BATCH_SIZE")
+    export_chunk_bytes: int = Field(default=1024 * 1024, alias="EXPORT_CHUNK_BYTES")
+    export_gzip_level: int = Field(default=1, alias="EXPORT_GZIP_LEVEL")
+    import_batch_size: int = Field(default=1000, alias="IMPORT_BATCH_SIZE")
+    stats_cache_ttl_seconds: float = Field(default=60.0, alias="STATS_CACHE_TTL_SECONDS")
+    stats_concurrency: int = Field(default=16, alias="STATS_CONCURRENCY")
+    stats_refresh_interval_seconds: float = Field(default=300.0, alias="STATS_REFRESH_INTERVAL_SECONDS")
+    stats_summary_top: int = Field(default=10, alias="STATS_SUMMARY_TOP")
+    stats_admin_emails: List[str] = Field(default_factory=list, alias="STATS_ADMIN_EMAILS")
+    list_page_max_size: int = Field(default=1000, alias="LIST_PAGE_MAX_SIZE")
+    list_batch_size: int = Field(default=1000, alias="LIST_BATCH_SIZE")
+    tenancy_mode: Literal["collection", "shared"] = Field(default="collection", alias="TENANCY_MODE")
+    tenant_shared_collection: str = Field(default="tenant_data", alias="TENANT_SHARED_COLLECTION")
+    tenant_shards: Dict[str, str] = Field(default_factory=dict, alias="TENANT_SHARDS")
+    tenant_shard_replicas: int = Field(default=128, alias="TENANT_SHARD_REPLICAS")
+    slow_request_ms: float = Field(default=1000.0, alias="SLOW_REQUEST_MS")
+    log_level: str = Field(default="INFO", alias="LOG_LEVEL")
+    log_serialize: bool = Field(default=False, alias="LOG_SERIALIZE")
+    server_host: str = Field(default="0.0.0.0", alias="HOST")
+    server_port: int = Field(default=8000, alias="PORT")
+    web_concurrency: Optional[int] = Field(default=None, alias="WEB_CONCURRENCY")
+    graceful_shutdown_seconds: int = Field(default=30, alias="GRACEFUL_SHUTDOWN_SECONDS")
+    job_workers: int = Field(default=4, alias="JOB_WORKERS")
+    job_max_attempts: int = Field(default=5, alias="JOB_MAX_ATTEMPTS")
+    job_lease_seconds: float = Field(default=60.0, alias="JOB_LEASE_SECONDS")
+    job_poll_interval_seconds: float = Field(default=1.0, alias="JOB_POLL_INTERVAL_SECONDS")
+    job_retry_backoff_seconds: float = Field(default=2.0, alias="JOB_RETRY_BACKOFF_SECONDS")
+    job_retention_seconds: int = Field(default=7 * 24 * 3600, alias="JOB_RETENTION_SECONDS")
 
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=False, extra="ignore")
 
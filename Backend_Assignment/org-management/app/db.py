@@ -1,28 +1,309 @@
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from typing import Optional
+import asyncio
+import bisect
+import hashlib
+import os
+import time
+from contextlib import asynccontextmanager
+from loguru import logger
+from motor.motor_asyncio import (
+    AsyncIOMotorClient,
+    AsyncIOMotorClientSession,
+    AsyncIOMotorCollection,
+    AsyncIOMotorDatabase,
+)
+from pymongo import ASCENDING, IndexModel, monitoring, read_preferences, uri_parser
+from pymongo.errors import ConfigurationError
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 from .config import get_settings
+from .metrics import CommandMetricsListener
+
+MASTER_INDEXES = [
+    IndexModel([("organization_name", ASCENDING)], unique=True, name="organization_name_unique"),
+    # tenant_id is absent (null) for collection-per-tenant orgs, so their collection names stay unique,
+    # while shared-mode orgs all point at the one shared collection.
+    IndexModel([("collection_name", ASCENDING), ("tenant_id", ASCENDING)], unique=True, name="collection_tenant_unique"),
+    IndexModel([("admin.email", ASCENDING)], unique=True, name="admin_email_unique"),
+    # The collection a collection-per-tenant org owns or is being renamed into; shared-mode orgs claim none.
+    IndexModel([("collection_claim", ASCENDING)], unique=True, sparse=True, name="collection_claim_unique"),
+    # Orgs whose rename or deletion still awaits its job; swept at startup in case the job was never queued.
+    IndexModel([("pending_job._id", ASCENDING)], sparse=True, name="pending_job"),
+]
+# Replaced by collection_tenant_unique; left in place it rejects every shared-mode org after the first.
+SUPERSEDED_MASTER_INDEXES = ("collection_name_unique",)
+
+READ_PREFERENCES = {
+    "primaryPreferred": read_preferences.PrimaryPreferred,
+    "secondary": read_preferences.Secondary,
+    "secondaryPreferred": read_preferences.SecondaryPreferred,
+    "nearest": read_preferences.Nearest,
+}
+
+
+def read_preference() -> read_preferences._ServerMode:
+    """The configured ``MONGO_READ_PREFERENCE``, bounded by ``MONGO_MAX_STALENESS_SECONDS`` when set."""
+    settings = get_settings()
+    if settings.mongo_read_preference == "primary":
+        return read_preferences.Primary()
+    return READ_PREFERENCES[settings.mongo_read_preference](max_staleness=settings.mongo_max_staleness_seconds)
+
+
+@asynccontextmanager
+async def causal_session(client: AsyncIOMotorClient) -> AsyncIterator[Optional[AsyncIOMotorClientSession]]:
+    """A causally consistent session, so reads on secondaries observe the writes made before them in it.
+
+    Yields ``None`` where sessions are unavailable (``mongomock`` in tests); operations then run
+    without a session, which is only consistent when reads also go to the primary.
+    """
+    try:
+        session = await client.start_session(causal_consistency=True)
+    except (ConfigurationError, NotImplementedError):
+        session = None
+    if session is None:
+        yield None
+        return
+    async with session:
+        yield session
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Tracks connection pool activity across all servers the client talks to."""
+
+    def __init__(self) -> None:
+        self.open = 0
+        self.checked_out = 0
+        self.created = 0
+        self.closed = 0
+        self.check_out_failures = 0
+        self.pools_cleared = 0
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        pass
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        self.pools_cleared += 1
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        self.created += 1
+        self.open += 1
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        self.closed += 1
+        self.open -= 1
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        pass
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        self.check_out_failures += 1
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        self.checked_out += 1
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        self.checked_out -= 1
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "open": self.open,
+            "in_use": self.checked_out,
+            "idle": self.open - self.checked_out,
+            "created": self.created,
+            "closed": self.closed,
+            "check_out_failures": self.check_out_failures,
+            "pools_cleared": self.pools_cleared,
+        }
 
 
 class Database:
+    """Lazily built Mongo clients, owned by the process that built them.
+
+    Motor clients are not fork-safe: a child that inherits one shares its sockets and monitor
+    threads with the parent. Clients are therefore tagged with the creating pid and rebuilt on
+    first use in any other process; inherited ones are abandoned, not closed, since closing
+    would tear down connections the parent still uses.
+    """
+
     def __init__(self) -> None:
         self._client: Optional[AsyncIOMotorClient] = None
+        # Handles built once per client: building one per request is wasted work, and under mongomock each
+        # new collection handle stacks another patch on the shared collection until calls hit the recursion limit.
+        self._handles: Dict[Any, Any] = {}
+        self._handles_client: Optional[AsyncIOMotorClient] = None
+        self._shard_clients: Dict[str, AsyncIOMotorClient] = {}
+        self._pid = os.getpid()
+        self.pool_stats = PoolStatsListener()
+
+    def _check_pid(self) -> None:
+        if self._pid != os.getpid():
+            self._client = None
+            self._handles, self._handles_client = {}, None
+            self._shard_clients = {}
+            self._pid = os.getpid()
+            self.pool_stats = PoolStatsListener()
+
+    def client_options(self) -> Dict[str, Any]:
+        settings = get_settings()
+        options: Dict[str, Any] = {
+            "maxPoolSize": settings.mongo_max_pool_size,
+            "minPoolSize": settings.mongo_min_pool_size,
+            "maxIdleTimeMS": settings.mongo_max_idle_time_ms,
+            "waitQueueTimeoutMS": settings.mongo_wait_queue_timeout_ms,
+            "serverSelectionTimeoutMS": settings.mongo_server_selection_timeout_ms,
+            "event_listeners": [self.pool_stats, CommandMetricsListener()],
+        }
+        if settings.mongo_compressors:
+            options["compressors"] = settings.mongo_compressors
+        return options
 
     def get_client(self) -> AsyncIOMotorClient:
+        self._check_pid()
         if self._client is None:
             settings = get_settings()
-            self._client = AsyncIOMotorClient(settings.mongodb_uri)
+            self._client = AsyncIOMotorClient(settings.mongodb_uri, **self.client_options())
         return self._client
 
     def get_master_db(self) -> AsyncIOMotorDatabase:
         settings = get_settings()
         return self.get_client()[settings.master_db_name]
 
+    def _cached_handles(self) -> Dict[Any, Any]:
+        # Tests swap ``_client`` in directly, so the cache follows the client object rather than its lifecycle.
+        client = self.get_client()
+        if self._handles_client is not client:
+            self._handles, self._handles_client = {}, client
+        return self._handles
+
+    def get_read_db(self) -> AsyncIOMotorDatabase:
+        """The master database for reads that tolerate replication lag, routed by the read preference."""
+        handles = self._cached_handles()
+        if "read_db" not in handles:
+            settings = get_settings()
+            handles["read_db"] = self.get_client().get_database(
+                settings.master_db_name, read_preference=read_preference()
+            )
+        return handles["read_db"]
+
+    def get_collection(self, name: str, read: bool = False) -> AsyncIOMotorCollection:
+        """A master database collection handle, built once per client; ``read`` routes it like ``get_read_db``."""
+        handles = self._cached_handles()
+        key = (get_settings().master_db_name, name, read)
+        if key not in handles:
+            handles[key] = (self.get_read_db() if read else self.get_master_db())[name]
+        return handles[key]
+
+    def get_shard_db(self, uri: str) -> AsyncIOMotorDatabase:
+        settings = get_settings()
+        self._check_pid()
+        if uri not in self._shard_clients:
+            self._shard_clients[uri] = AsyncIOMotorClient(uri, **self.client_options())
+        return self._shard_clients[uri][uri_parser.parse_uri(uri)["database"] or settings.master_db_name]
+
+    async def ping(self) -> float:
+        start = time.perf_counter()
+        await self.get_client().admin.command("ping")
+        return (time.perf_counter() - start) * 1000
+
+    async def connect(self) -> None:
+        await self.ping()
+        # Open minPoolSize connections up front so the first requests don't pay the handshakes.
+        warm = get_settings().mongo_min_pool_size
+        if warm:
+            await asyncio.gather(*(self.get_client().admin.command("ping") for _ in range(warm)))
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+        self._handles, self._handles_client = {}, None
+        for client in self._shard_clients.values():
+            client.close()
+        self._shard_clients.clear()
+
+
+class HashRing:
+    """Consistent hashing with virtual nodes: adding a shard only moves the keys it takes over."""
+
+    def __init__(self, nodes: List[str], replicas: int = 128) -> None:
+        self.nodes = sorted(nodes)
+        self._ring: List[Tuple[int, str]] = sorted(
+            (self._hash(f"{node}#{replica}"), node) for node in self.nodes for replica in range(replicas)
+        )
+        self._keys = [point for point, _ in self._ring]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+    def get_node(self, key: str) -> str:
+        if not self._ring:
+            raise LookupError("Hash ring has no nodes")
+        index = bisect.bisect(self._keys, self._hash(key)) % len(self._ring)
+        return self._ring[index][1]
+
+
+class ShardRouter:
+    """Maps organizations to the tenant database configured in ``TENANT_SHARDS``.
+
+    Placement is decided once, at creation, and recorded as ``shard`` on the org metadata;
+    orgs without a recorded shard live in the master database.
+    """
+
+    def __init__(self, database: Database) -> None:
+        self.database = database
+        self._ring: Optional[HashRing] = None
+
+    @property
+    def shards(self) -> Dict[str, str]:
+        return get_settings().tenant_shards
+
+    @property
+    def ring(self) -> HashRing:
+        if self._ring is None or self._ring.nodes != sorted(self.shards):
+            self._ring = HashRing(list(self.shards), get_settings().tenant_shard_replicas)
+        return self._ring
+
+    def place(self, placement_key: str) -> Optional[str]:
+        return self.ring.get_node(placement_key) if self.shards else None
+
+    def get_database(self, shard: Optional[str]) -> AsyncIOMotorDatabase:
+        if shard is None:
+            return self.database.get_master_db()
+        if shard not in self.shards:
+            raise LookupError(f"Unknown shard {shard}")
+        return self.database.get_shard_db(self.shards[shard])
+
+    def database_for(self, org: Dict) -> AsyncIOMotorDatabase:
+        return self.get_database(org.get("shard"))
+
+    def databases(self) -> List[AsyncIOMotorDatabase]:
+        """Every database that can hold tenant data: the master plus each configured shard."""
+        return [self.database.get_master_db()] + [self.get_database(shard) for shard in sorted(self.shards)]
+
 
 db = Database()
+shard_router = ShardRouter(db)
 
 
 async def get_master_collection():
-    return db.get_master_db()["organizations"]
+    return db.get_collection("organizations")
 
 
+async def ensure_master_indexes(collection: Optional[AsyncIOMotorCollection] = None) -> List[str]:
+    collection = collection if collection is not None else await get_master_collection()
+    created = await collection.create_indexes(MASTER_INDEXES)
+    existing = await collection.index_information()
+    for name in SUPERSEDED_MASTER_INDEXES:
+        if name in existing:
+            await collection.drop_index(name)
+            logger.info("Dropped superseded index {} on {}", name, collection.full_name)
+    return created
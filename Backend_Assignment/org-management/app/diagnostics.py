@@ -0,0 +1,36 @@
+from typing import Any, Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from .services.org_service import LIVE_ORGS
+
+# Filters issued against the master collection by OrgService and AuthService.
+SERVICE_QUERIES: Dict[str, Dict[str, Any]] = {
+    "OrgService.get_organization": {"organization_name": "__probe__", **LIVE_ORGS},
+    "AuthService.get_admin_org": {"admin.email": "probe@example.com", **LIVE_ORGS},
+}
+
+
+def plan_stages(plan: Any) -> List[str]:
+    stages: List[str] = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(plan_stages(item))
+    return stages
+
+
+async def explain_service_queries(collection: AsyncIOMotorCollection) -> Dict[str, List[str]]:
+    plans = {}
+    for name, query in SERVICE_QUERIES.items():
+        explained = await collection.find(query).explain()
+        plans[name] = plan_stages(explained["queryPlanner"]["winningPlan"])
+    return plans
+
+
+def collection_scans(plans: Dict[str, List[str]]) -> List[str]:
+    return [name for name, stages in plans.items() if "COLLSCAN" in stages or "IXSCAN" not in stages]
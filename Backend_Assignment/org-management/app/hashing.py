@@ -0,0 +1,90 @@
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from .config import get_settings
+from .metrics import PASSWORD_HASH_DURATION
+from .tracing import span
+from .utils import get_password_hash, verify_password as _verify_password
+
+
+class HashingOverloadedError(RuntimeError):
+    pass
+
+
+class PasswordHasher:
+    """Runs bcrypt work on a bounded worker pool so the event loop never blocks on it."""
+
+    def __init__(self) -> None:
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._max_concurrency = 0
+        self._pending = 0
+        self._pid = os.getpid()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def get_executor(self) -> Executor:
+        if self._pid != os.getpid():
+            # Worker threads don't survive a fork; build a fresh pool in the child.
+            self._executor = None
+            self._pid = os.getpid()
+        if self._executor is None:
+            settings = get_settings()
+            workers = settings.hash_workers or os.cpu_count() or 1
+            if settings.hash_executor == "process":
+                self._executor = ProcessPoolExecutor(max_workers=workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            settings = get_settings()
+            self._max_concurrency = settings.hash_max_concurrency or settings.hash_workers or os.cpu_count() or 1
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    async def _run(self, operation: str, func: Callable[..., Any], *args: Any) -> Any:
+        semaphore = self._get_semaphore()
+        if self._pending >= self._max_concurrency + get_settings().hash_queue_size:
+            raise HashingOverloadedError("Password hashing queue is full")
+        self._pending += 1
+        try:
+            with span(f"bcrypt.{operation}") as current:
+                async with semaphore:
+                    if current is not None:
+                        current.attributes["queued_ms"] = round(current.duration_ms, 3)
+                    loop = asyncio.get_running_loop()
+                    with PASSWORD_HASH_DURATION.time(operation=operation):
+                        return await loop.run_in_executor(self.get_executor(), func, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash_password(self, password: str) -> str:
+        return await self._run("hash", get_password_hash, password)
+
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", _verify_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+hasher = PasswordHasher()
+
+
+async def hash_password(password: str) -> str:
+    return await hasher.hash_password(password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await hasher.verify_password(plain_password, hashed_password)
@@ -0,0 +1,359 @@
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from .config import get_settings
+from .db import Database, db
+from .services.org_service import LIVE_ORGS, METADATA_PROJECTION, STORAGE_FIELDS, OrgService
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+Progress = Callable[[Dict[str, Any]], Awaitable[None]]
+JobHandler = Callable[[Dict[str, Any], Progress], Awaitable[Optional[Dict[str, Any]]]]
+FailureHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class JobQueue:
+    """Jobs persisted in the master ``jobs`` collection and worked by a bounded pool of asyncio workers.
+
+    A worker claims a job by atomically flipping it to ``running`` under a lease, which a
+    heartbeat renews while the handler runs, however long a single step takes. A job whose
+    lease runs out, because its process died, is claimed
+    again, so in-flight work survives restarts. Failed attempts are retried with exponential
+    backoff until ``JOB_MAX_ATTEMPTS``, after which the job's failure handler runs.
+    """
+
+    def __init__(self, database: Database) -> None:
+        self.database = database
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._handlers: Dict[str, JobHandler] = {}
+        self._failure_handlers: Dict[str, FailureHandler] = {}
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def collection(self) -> AsyncIOMotorCollection:
+        return self.database.get_collection("jobs")
+
+    def register(self, job_type: str, handler: JobHandler, on_failure: Optional[FailureHandler] = None) -> None:
+        self._handlers[job_type] = handler
+        if on_failure is not None:
+            self._failure_handlers[job_type] = on_failure
+
+    async def ensure_indexes(self) -> List[str]:
+        return await self.collection.create_indexes(
+            [
+                IndexModel([("status", ASCENDING), ("run_after", ASCENDING)], name="status_run_after"),
+                IndexModel([("status", ASCENDING), ("lease_expires_at", ASCENDING)], name="status_lease"),
+                IndexModel(
+                    [("finished_at", ASCENDING)],
+                    expireAfterSeconds=get_settings().job_retention_seconds,
+                    name="finished_at_ttl",
+                ),
+            ]
+        )
+
+    async def enqueue(
+        self,
+        job_type: str,
+        params: Dict[str, Any],
+        requested_by: Optional[str] = None,
+        job_id: Optional[str] = None,
+    ) -> Dict:
+        """Queue a job; with a ``job_id`` already queued, returns that job instead of adding another."""
+        now = datetime.now(timezone.utc)
+        job = {
+            "_id": job_id or new_job_id(),
+            "type": job_type,
+            "params": params,
+            "requested_by": requested_by,
+            "status": QUEUED,
+            "attempts": 0,
+            "progress": {},
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+            "run_after": now,
+        }
+        try:
+            await self.collection.insert_one(job)
+        except DuplicateKeyError:
+            existing = await self.get(job["_id"])
+            if existing is not None:
+                return existing
+            raise
+        if self._wakeup is not None:
+            self._wakeup.set()
+        logger.info("Queued {} job {}", job_type, job["_id"])
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        return await self.collection.find_one({"_id": job_id})
+
+    async def claim(self) -> Optional[Dict]:
+        now = datetime.now(timezone.utc)
+        return await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": QUEUED, "run_after": {"$lte": now}},
+                    {"status": RUNNING, "lease_expires_at": {"$lte": now}},
+                ]
+            },
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "worker": self.worker_id,
+                    "lease_expires_at": self._lease(now),
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("run_after", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    @staticmethod
+    def _lease(now: datetime) -> datetime:
+        return now + timedelta(seconds=get_settings().job_lease_seconds)
+
+    async def execute(self, job: Dict) -> None:
+        owned = {"_id": job["_id"], "worker": self.worker_id}
+
+        async def progress(update: Dict[str, Any]) -> None:
+            now = datetime.now(timezone.utc)
+            await self.collection.update_one(
+                owned, {"$set": {"progress": update, "updated_at": now, "lease_expires_at": self._lease(now)}}
+            )
+
+        async def heartbeat() -> None:
+            # Steps like renameCollection or $merge report nothing until they finish.
+            while True:
+                await asyncio.sleep(get_settings().job_lease_seconds / 3)
+                try:
+                    await self.collection.update_one(
+                        owned, {"$set": {"lease_expires_at": self._lease(datetime.now(timezone.utc))}}
+                    )
+                except PyMongoError as exc:
+                    logger.warning("Renewing the lease of job {} failed: {}", job["_id"], exc)
+
+        beat = asyncio.create_task(heartbeat())
+        try:
+            handler = self._handlers.get(job["type"])
+            if handler is None:
+                raise LookupError(f"No handler for job type {job['type']}")
+            result = await handler(job["params"], progress)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            await self._fail(job, exc)
+            return
+        finally:
+            beat.cancel()
+        now = datetime.now(timezone.utc)
+        await self.collection.update_one(
+            owned,
+            {
+                "$set": {
+                    "status": SUCCEEDED,
+                    "result": result or {},
+                    "error": None,
+                    "updated_at": now,
+                    "finished_at": now,
+                }
+            },
+        )
+        logger.info("Job {} ({}) succeeded", job["_id"], job["type"])
+
+    async def _fail(self, job: Dict, exc: Exception) -> None:
+        settings = get_settings()
+        now = datetime.now(timezone.utc)
+        owned = {"_id": job["_id"], "worker": self.worker_id}
+        if job["attempts"] < settings.job_max_attempts:
+            delay = settings.job_retry_backoff_seconds * 2 ** (job["attempts"] - 1)
+            await self.collection.update_one(
+                owned,
+                {
+                    "$set": {
+                        "status": QUEUED,
+                        "error": str(exc),
+                        "run_after": now + timedelta(seconds=delay),
+                        "updated_at": now,
+                    }
+                },
+            )
+            logger.warning(
+                "Job {} ({}) attempt {} failed, retrying in {}s: {}",
+                job["_id"],
+                job["type"],
+                job["attempts"],
+                delay,
+                exc,
+            )
+            return
+        await self.collection.update_one(
+            owned, {"$set": {"status": FAILED, "error": str(exc), "updated_at": now, "finished_at": now}}
+        )
+        logger.error("Job {} ({}) failed after {} attempts: {}", job["_id"], job["type"], job["attempts"], exc)
+        on_failure = self._failure_handlers.get(job["type"])
+        if on_failure is not None:
+            try:
+                await on_failure(job["params"])
+            except Exception as cleanup_exc:
+                logger.error("Failure handler for job {} raised: {}", job["_id"], cleanup_exc)
+
+    async def run_pending(self) -> int:
+        """Run claimable jobs one after another until none are left; returns how many ran."""
+        ran = 0
+        while True:
+            job = await self.claim()
+            if job is None:
+                return ran
+            await self.execute(job)
+            ran += 1
+
+    async def _work(self) -> None:
+        interval = get_settings().job_poll_interval_seconds
+        while True:
+            try:
+                job = await self.claim()
+            except PyMongoError as exc:
+                logger.warning("Claiming a job failed: {}", exc)
+                job = None
+            if job is not None:
+                await self.execute(job)
+                continue
+            # Sleep until the poll interval passes or this process enqueues something.
+            self._wakeup.clear()
+            waiter = asyncio.ensure_future(self._wakeup.wait())
+            try:
+                await asyncio.wait({waiter}, timeout=interval)
+            finally:
+                waiter.cancel()
+
+    def start(self, workers: Optional[int] = None) -> None:
+        self._wakeup = asyncio.Event()
+        count = workers or get_settings().job_workers
+        self._workers = [asyncio.create_task(self._work()) for _ in range(count)]
+        logger.info("Started {} job workers as {}", count, self.worker_id)
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._wakeup = None
+        # Hand interrupted jobs straight back instead of making them wait out their lease.
+        now = datetime.now(timezone.utc)
+        await self.collection.update_many(
+            {"status": RUNNING, "worker": self.worker_id},
+            {"$set": {"status": QUEUED, "run_after": now, "updated_at": now}, "$inc": {"attempts": -1}},
+        )
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+def pending_job(job_type: str, requested_by: Optional[str] = None, **fields: Any) -> Dict[str, Any]:
+    """A job to record on an org in the same write as the change it finishes, before queueing it."""
+    return {"_id": new_job_id(), "type": job_type, "requested_by": requested_by, **fields}
+
+
+async def enqueue_pending(org: Dict, queue: Optional[JobQueue] = None, job_id: Optional[str] = None) -> Dict:
+    """Queue the job recorded as ``pending_job`` on an org; safe to repeat."""
+    queue = queue or jobs
+    pending = org["pending_job"]
+    if pending["type"] == "drop_tenant":
+        params: Dict[str, Any] = {"org": tenant_storage(org)}
+    else:
+        params = {"org_id": org["_id"], "old_name": pending["old_name"]}
+    return await queue.enqueue(
+        pending["type"], params, requested_by=pending.get("requested_by"), job_id=job_id or pending["_id"]
+    )
+
+
+async def requeue_pending_jobs(queue: Optional[JobQueue] = None) -> int:
+    """Queue the recorded job of every org whose job was never queued, or failed; returns how many.
+
+    A process that dies between committing a rename or deletion and queueing its job would
+    otherwise leave the org write-fenced, or its tombstone unpurged, for good.
+    """
+    queue = queue or jobs
+    organizations = queue.database.get_collection("organizations")
+    requeued = 0
+    async for org in organizations.find({"pending_job._id": {"$exists": True}}, METADATA_PROJECTION):
+        job_id = org["pending_job"]["_id"]
+        job = await queue.get(job_id)
+        if job is not None and job["status"] != FAILED:
+            continue
+        if job is not None:
+            # Retry a failed job under a new id; the conditional update lets one worker claim it.
+            job_id = new_job_id()
+            result = await organizations.update_one(
+                {"_id": org["_id"], "pending_job._id": org["pending_job"]["_id"]}, {"$set": {"pending_job._id": job_id}}
+            )
+            if not result.matched_count:
+                continue
+        await enqueue_pending(org, queue, job_id=job_id)
+        requeued += 1
+    if requeued:
+        logger.warning("Requeued {} job(s) for organizations left without one", requeued)
+    return requeued
+
+
+def _org_service() -> OrgService:
+    return OrgService(db.get_collection("organizations"), db.get_master_db())
+
+
+async def rename_tenant(params: Dict[str, Any], progress: Progress) -> Dict[str, Any]:
+    service = _org_service()
+    org = await service.master_collection.find_one({"_id": params["org_id"], **LIVE_ORGS})
+    if org is None:
+        return {"skipped": "Organization no longer exists"}
+    moved = await service.move_renamed_tenant(org, on_progress=progress)
+    return {"organization_name": moved["organization_name"], "collection_name": moved["collection_name"]}
+
+
+async def restore_name(params: Dict[str, Any]) -> None:
+    service = _org_service()
+    org = await service.master_collection.find_one({"_id": params["org_id"]})
+    if org is not None:
+        await service.revert_rename(org, params["old_name"])
+
+
+async def drop_tenant(params: Dict[str, Any], progress: Progress) -> Dict[str, Any]:
+    await _org_service().purge_organization(params["org"], on_progress=progress)
+    return {"dropped": params["org"]["collection_name"]}
+
+
+async def move_tenant(params: Dict[str, Any], progress: Progress) -> Dict[str, Any]:
+    service = _org_service()
+    org = await service.master_collection.find_one({"_id": params["org_id"], **LIVE_ORGS})
+    if org is None:
+        return {"skipped": "Organization no longer exists"}
+    if org.get("shard") == params["target_shard"]:
+        return {"shard": params["target_shard"], "skipped": "Already on the target shard"}
+    result = await service.move_tenant(org, params["target_shard"], on_progress=progress)
+    return {"shard": params["target_shard"], "method": result["method"], "copied": result["copied"]}
+
+
+def tenant_storage(org: Dict) -> Dict[str, Any]:
+    return {field: org[field] for field in STORAGE_FIELDS if field in org}
+
+
+jobs = JobQueue(db)
+jobs.register("rename_tenant", rename_tenant, on_failure=restore_name)
+jobs.register("drop_tenant", drop_tenant)
+jobs.register("move_tenant", move_tenant)
@@ -1,9 +1,112 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
 
-from .routers.org_router import router as org_router
-from .routers.auth_router import router as auth_router
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+from loguru import logger
+from pymongo.errors import PyMongoError
 
-app = FastAPI(title="Organization Management Service")
+from .cache import org_cache, token_cache, watch_organization_changes
+from .config import get_settings
+from .db import db, ensure_master_indexes, get_master_collection, shard_router
+from .hashing import HashingOverloadedError, hasher
+from .jobs import jobs, requeue_pending_jobs
+from .metrics import CallbackGauge, MetricsMiddleware, registry
+from .ratelimit import MongoRateLimitStore, login_throttle
+from .tracing import TracingMiddleware, configure_logging
+from .utils import FastJSONResponse, ensure_revocation_indexes
+from .routers.org_router import get_org_service, router as org_router
+from .routers.auth_router import get_auth_service, router as auth_router
+from .services.auth_service import dummy_password_hash
+from .services.org_service import TenantMovingError
+from .routers.job_router import router as job_router
+from .routers.data_router import router as data_router
+from .services.stats_service import tenant_stats
+from .services.tenant_data_service import TenantWritesOverloadedError
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+    await db.connect()
+    await ensure_master_indexes()
+    org_service = await get_org_service()
+    for database in shard_router.databases():
+        await org_service.tenancy.default.ensure_indexes(database)
+    await (await get_auth_service()).ensure_indexes()
+    await ensure_revocation_indexes()
+    if isinstance(login_throttle.store, MongoRateLimitStore):
+        await login_throttle.store.ensure_indexes()
+    await dummy_password_hash()
+    await jobs.ensure_indexes()
+    await requeue_pending_jobs()
+    jobs.start()
+    tenant_stats.start(org_service)
+    watcher = None
+    if get_settings().org_cache_change_stream:
+        watcher = asyncio.create_task(watch_organization_changes(await get_master_collection()))
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    await jobs.stop()
+    await tenant_stats.stop()
+    hasher.shutdown()
+    db.close()
+    await logger.complete()
+
+
+app = FastAPI(title="Organization Management Service", lifespan=lifespan, default_response_class=FastJSONResponse)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+registry.register(
+    CallbackGauge(
+        "cache_stats",
+        "In-process cache counters (hits, misses, size).",
+        ["cache", "stat"],
+        lambda: [
+            ((name, stat), value)
+            for name, cache in (("org", org_cache), ("token", token_cache))
+            for stat, value in cache.stats().items()
+        ],
+    )
+)
+registry.register(
+    CallbackGauge(
+        "mongodb_pool_connections",
+        "Mongo connection pool state.",
+        ["state"],
+        lambda: [((state,), value) for state, value in db.pool_stats.snapshot().items()],
+    )
+)
+
+
+@app.exception_handler(HashingOverloadedError)
+async def hashing_overloaded_handler(request: Request, exc: HashingOverloadedError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server busy, retry later"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(TenantWritesOverloadedError)
+async def tenant_writes_overloaded_handler(request: Request, exc: TenantWritesOverloadedError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Too many bulk writes in progress, retry later"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(TenantMovingError)
+async def tenant_moving_handler(request: Request, exc: TenantMovingError):
+    # Raised by writes whose lease is refused or runs out because a data move has started.
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "5"},
+    )
 
 
 @app.get("/health")
@@ -11,7 +114,24 @@ async def health():
     return {"status": "ok"}
 
 
-app.include_router(auth_router)
-app.include_router(org_router)
+@app.get("/ready")
+async def ready():
+    try:
+        ping_ms = await db.ping()
+    except PyMongoError as exc:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "unavailable", "detail": str(exc)},
+        )
+    return {"status": "ready", "ping_ms": round(ping_ms, 3), "pool": db.pool_stats.snapshot()}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+app.include_router(auth_router)
+app.include_router(org_router)
+app.include_router(job_router)
+app.include_router(data_router)
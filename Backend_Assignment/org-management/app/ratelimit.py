@@ -0,0 +1,127 @@
+import hashlib
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+
+from .config import get_settings
+from .db import Database, db
+from .metrics import LOGIN_THROTTLED
+
+
+class RateLimitStore(ABC):
+    """Token buckets stored as GCRA state: one "theoretical arrival time" per key.
+
+    A bucket of ``capacity`` tokens refilled every ``interval`` seconds admits a hit when its
+    TAT, pushed one interval forward, is at most ``capacity`` intervals ahead of now. That is
+    exactly a token bucket, but needs a single number per key and a single atomic update.
+    """
+
+    @abstractmethod
+    async def hit(self, key: str, capacity: int, interval: float) -> float:
+        """Take one token; returns 0 when allowed, else the seconds until a token is available."""
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """Per-process buckets, bounded to ``max_keys`` with least-recently-used eviction."""
+
+    def __init__(self, max_keys: int) -> None:
+        self.max_keys = max_keys
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+
+    async def hit(self, key: str, capacity: int, interval: float) -> float:
+        now = time.time()
+        candidate = max(self._tats.get(key, now), now) + interval
+        if candidate - now > capacity * interval:
+            return candidate - now - capacity * interval
+        self._tats[key] = candidate
+        self._tats.move_to_end(key)
+        while len(self._tats) > self.max_keys:
+            self._tats.popitem(last=False)
+        return 0.0
+
+
+class MongoRateLimitStore(RateLimitStore):
+    """Buckets shared by every worker, updated with one pipeline ``find_one_and_update`` per hit."""
+
+    def __init__(self, database: Database, collection_name: str = "rate_limits") -> None:
+        self.database = database
+        self.collection_name = collection_name
+
+    @property
+    def collection(self) -> AsyncIOMotorCollection:
+        return self.database.get_collection(self.collection_name)
+
+    async def ensure_indexes(self) -> List[str]:
+        return await self.collection.create_indexes(
+            [IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl")]
+        )
+
+    async def hit(self, key: str, capacity: int, interval: float) -> float:
+        now = time.time()
+        window = capacity * interval
+        tat = {"$ifNull": ["$tat", now]}
+        bucket = await self.collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"candidate": {"$add": [{"$max": [tat, now]}, interval]}}},
+                {"$set": {"allowed": {"$lte": [{"$subtract": ["$candidate", now]}, window]}}},
+                {
+                    "$set": {
+                        "tat": {"$cond": ["$allowed", "$candidate", tat]},
+                        # A bucket untouched for a full window is full again, so its state can go.
+                        "expires_at": datetime.fromtimestamp(now + window, timezone.utc),
+                    }
+                },
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        if bucket["allowed"]:
+            return 0.0
+        return bucket["candidate"] - now - window
+
+
+def _key(kind: str, value: str) -> str:
+    # Keys are hashed so the shared store never holds raw emails or addresses.
+    return f"{kind}:{hashlib.sha256(value.strip().lower().encode()).hexdigest()[:32]}"
+
+
+class LoginThrottle:
+    """Limits login attempts per client IP and per email before any lookup or hashing happens."""
+
+    def __init__(self, store: Optional[RateLimitStore] = None) -> None:
+        self._store = store
+
+    @property
+    def store(self) -> RateLimitStore:
+        if self._store is None:
+            settings = get_settings()
+            if settings.login_rate_limit_backend == "mongo":
+                self._store = MongoRateLimitStore(db)
+            else:
+                self._store = MemoryRateLimitStore(settings.login_rate_limit_max_keys)
+        return self._store
+
+    async def check(self, client_ip: str, email: str) -> float:
+        """Returns 0 if the attempt may proceed, else the seconds to wait before retrying."""
+        settings = get_settings()
+        limits = (
+            ("ip", client_ip, settings.login_ip_burst, settings.login_ip_per_minute),
+            ("email", email, settings.login_email_burst, settings.login_email_per_minute),
+        )
+        for kind, value, burst, per_minute in limits:
+            if burst <= 0 or per_minute <= 0:
+                continue
+            retry_after = await self.store.hit(_key(kind, value), burst, 60.0 / per_minute)
+            if retry_after > 0:
+                LOGIN_THROTTLED.inc(key=kind)
+                return retry_after
+        return 0.0
+
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,54 @@
+import argparse
+import asyncio
+from typing import Dict, List
+
+from loguru import logger
+
+from .db import db, get_master_collection
+from .jobs import jobs
+from .services.org_service import LIVE_ORGS, METADATA_PROJECTION, OrgService
+
+
+async def plan_moves(service: OrgService) -> List[Dict]:
+    moves = []
+    async for org in service.master_collection.find(LIVE_ORGS, METADATA_PROJECTION):
+        target = service.router.place(str(org["_id"]))
+        if target is not None and target != org.get("shard"):
+            moves.append({"org": org, "source": org.get("shard"), "target": target})
+    return moves
+
+
+async def rebalance(service: OrgService, dry_run: bool = False, enqueue: bool = False) -> List[Dict]:
+    """Move misplaced tenants inline, or with ``enqueue`` hand each move to the app's job workers."""
+    moves = await plan_moves(service)
+    for move in moves:
+        name = move["org"]["organization_name"]
+        logger.info("{} {}: {} -> {}", "Would move" if dry_run else "Moving", name, move["source"], move["target"])
+        if dry_run:
+            continue
+        if enqueue:
+            job = await jobs.enqueue("move_tenant", {"org_id": move["org"]["_id"], "target_shard": move["target"]})
+            move["job_id"] = job["_id"]
+        else:
+            await service.move_tenant(move["org"], move["target"])
+    return moves
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Move tenants to the shard TENANT_SHARDS now assigns them.")
+    parser.add_argument("--dry-run", action="store_true", help="only report the planned moves")
+    parser.add_argument("--enqueue", action="store_true", help="queue move_tenant jobs for the app's workers")
+    args = parser.parse_args()
+
+    master_collection = await get_master_collection()
+    service = OrgService(master_collection, db.get_master_db())
+    try:
+        moves = await rebalance(service, dry_run=args.dry_run, enqueue=args.enqueue)
+        outcome = "to move" if args.dry_run else "queued" if args.enqueue else "moved"
+        logger.info("{} tenant(s) {}", len(moves), outcome)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,27 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import math
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 
+from ..config import get_settings
 from ..db import db
-from ..schemas import AdminLoginRequest, TokenResponse
+from ..ratelimit import login_throttle
+from ..schemas import AdminLoginRequest, RefreshRequest, TokenResponse
 from ..services.auth_service import AuthService
+from ..utils import oauth2_scheme, revoke_access_token
 
 router = APIRouter(prefix="/admin", tags=["auth"])
 
 
 async def get_auth_service() -> AuthService:
-    master_db = db.get_master_db()
-    return AuthService(master_db["organizations"])
+    return AuthService(
+        db.get_collection("organizations"),
+        refresh_collection=db.get_collection("refresh_tokens"),
+        read_collection=db.get_collection("organizations", read=True),
+    )
 
 
 @router.post("/login", response_model=TokenResponse)
-async def login(payload: AdminLoginRequest):
+async def login(payload: AdminLoginRequest, request: Request):
+    client_ip = request.client.host if request.client else "unknown"
+    retry_after = await login_throttle.check(client_ip, payload.email)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
     service = await get_auth_service()
     try:
         org = await service.authenticate_admin(payload.email, payload.password)
     except PermissionError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
-    token = await service.issue_token(payload.email, org["organization_name"])
-    return TokenResponse(access_token=token)
+    access_token, refresh_token = await service.issue_token_pair(org)
+    return token_response(access_token, refresh_token)
+
 
+@router.post("/refresh", response_model=TokenResponse)
+async def refresh(payload: RefreshRequest):
+    """Rotate a refresh token into a new token pair; no password check, one indexed lookup."""
+    service = await get_auth_service()
+    try:
+        access_token, refresh_token = await service.refresh(payload.refresh_token)
+    except PermissionError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+    return token_response(access_token, refresh_token)
 
+
+def token_response(access_token: str, refresh_token: str) -> TokenResponse:
+    expires_in = get_settings().access_token_expire_minutes * 60
+    return TokenResponse(access_token=access_token, refresh_token=refresh_token, expires_in=expires_in)
+
+
+@router.post("/logout")
+async def logout(payload: Optional[RefreshRequest] = None, token: str = Depends(oauth2_scheme)):
+    try:
+        await revoke_access_token(token)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    if payload is not None:
+        service = await get_auth_service()
+        await service.revoke_refresh_token(payload.refresh_token)
+    return {"message": "Logged out"}
@@ -0,0 +1,71 @@
+from typing import Any
+
+from bson import json_util
+from bson.json_util import RELAXED_JSON_OPTIONS
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from pydantic import ValidationError
+
+from ..config import get_settings
+from ..schemas import TenantQueryRequest
+from ..services.tenant_data_service import decode_cursor, encode_cursor
+from .org_router import get_current_admin, get_tenant_data_service, read_capped_body, resolve_org
+
+router = APIRouter(prefix="/data", tags=["tenant data"])
+
+
+def json_response(content: Any) -> Response:
+    # Relaxed extended JSON: ObjectIds and dates come back as {"$oid": ...} and {"$date": ...}.
+    body = json_util.dumps(content, json_options=RELAXED_JSON_OPTIONS)
+    return Response(content=body, media_type="application/json")
+
+
+async def read_body(request: Request, max_bytes: int) -> Any:
+    """Parse a JSON (or NDJSON, as a list) body that may use extended JSON for ObjectIds and dates."""
+    body = await read_capped_body(request, max_bytes)
+    try:
+        if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+            return [json_util.loads(line) for line in body.splitlines() if line.strip()]
+        return json_util.loads(body)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed request body")
+
+
+@router.post("/query")
+async def query_documents(request: Request, admin=Depends(get_current_admin)):
+    """One page of the caller's organization's documents in ``_id`` order; follow ``next_cursor`` for more."""
+    settings = get_settings()
+    try:
+        payload = TenantQueryRequest.model_validate(await read_body(request, settings.tenant_bulk_max_bytes))
+    except ValidationError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=exc.errors(include_url=False, include_context=False, include_input=False),
+        )
+    service = await get_tenant_data_service()
+    org = await resolve_org(service, admin["organization_name"], admin)
+    limit = min(payload.limit, settings.tenant_query_max_limit)
+    try:
+        after = decode_cursor(payload.cursor) if payload.cursor else None
+        docs = await service.query(org, payload.filter, payload.fields, limit=limit, after=after)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    next_cursor = encode_cursor(docs[-1]["_id"]) if len(docs) == limit else None
+    return json_response({"items": docs, "next_cursor": next_cursor})
+
+
+@router.post("/bulk")
+async def bulk_write_documents(request: Request, admin=Depends(get_current_admin)):
+    """Upsert and delete documents in unordered batches; answers with one result per batch."""
+    settings = get_settings()
+    operations = await read_body(request, settings.tenant_bulk_max_bytes)
+    if not isinstance(operations, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a JSON array or NDJSON")
+    if len(operations) > settings.tenant_bulk_max_operations:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.tenant_bulk_max_operations} operations per request",
+        )
+    service = await get_tenant_data_service()
+    org = await resolve_org(service, admin["organization_name"], admin, for_write=True)
+    batches = [batch async for batch in service.bulk_write(org, operations)]
+    return json_response({"operations": len(operations), "batches": batches})
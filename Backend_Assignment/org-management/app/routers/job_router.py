@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from ..jobs import jobs
+from ..schemas import JobStatus
+from .org_router import get_current_admin
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str, admin=Depends(get_current_admin)):
+    job = await jobs.get(job_id)
+    # Other admins' jobs look missing rather than forbidden, so job ids can't be probed.
+    if job is None or job.get("requested_by") != admin["admin_email"]:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return JobStatus(
+        job_id=job["_id"],
+        type=job["type"],
+        status=job["status"],
+        attempts=job["attempts"],
+        progress=job.get("progress") or {},
+        result=job.get("result"),
+        error=job.get("error"),
+        created_at=job["created_at"],
+        updated_at=job["updated_at"],
+    )
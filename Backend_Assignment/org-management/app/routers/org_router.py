@@ -1,30 +1,119 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+import base64
+import binascii
+import json
+from typing import Any, Dict, List, Literal, Optional
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from jose import JWTError
+from pydantic import ValidationError
 
 from ..config import get_settings
 from ..db import db
-from ..schemas import OrgCreateRequest, OrgResponse, OrgUpdateRequest
-from ..services.org_service import OrgService
-from ..utils import decode_access_token
+from ..jobs import enqueue_pending, pending_job
+from ..schemas import (
+    JobAccepted,
+    OrgBatchGetRequest,
+    OrgBatchGetResponse,
+    OrgCreateRequest,
+    OrgListResponse,
+    OrgResponse,
+    OrgStats,
+    OrgStatsSummary,
+    OrgUpdateRequest,
+)
+from ..services.auth_service import AuthService
+from ..services.org_service import OrgService, TenantMovingError
+from ..services.stats_service import tenant_stats
+from ..services.tenant_data_service import TenantDataService
+from ..streams import MEDIA_TYPES
+from ..utils import FastJSONResponse, oauth2_scheme, verify_access_token
 
 router = APIRouter(prefix="/org", tags=["organizations"])
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/admin/login")
 
 
 async def get_org_service() -> OrgService:
-    master_db = db.get_master_db()
-    return OrgService(master_db["organizations"], master_db)
+    return OrgService(
+        db.get_collection("organizations"), db.get_master_db(), read_collection=db.get_collection("organizations", read=True)
+    )
+
+
+async def get_tenant_data_service() -> TenantDataService:
+    return TenantDataService(await get_org_service())
+
+
+async def resolve_org(
+    service: TenantDataService, organization_name: str, admin: dict, for_write: bool = False
+) -> dict:
+    try:
+        return await service.resolve(organization_name, admin["admin_email"], for_write=for_write)
+    except LookupError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
+    except PermissionError as exc:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(exc))
+    except TenantMovingError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc), headers={"Retry-After": "5"}
+        )
+
+
+async def revoke_refresh_tokens(org_id) -> None:
+    # Refresh tokens carry the org name and admin email, so any change to either retires them.
+    await AuthService(
+        db.get_collection("organizations"), refresh_collection=db.get_collection("refresh_tokens")
+    ).revoke_org_tokens(org_id)
+
+
+def public_org(org: Dict[str, Any]) -> Dict[str, Any]:
+    """The ``OrgResponse`` fields of an org document, as a plain dict.
+
+    Routes return it in a ``FastJSONResponse`` rather than as a model: the values come straight
+    from the database, so validating them again against ``response_model`` would only cost CPU.
+    The ``response_model`` declarations remain for the OpenAPI schema.
+    """
+    return {
+        "organization_name": org["organization_name"],
+        "collection_name": org["collection_name"],
+        "admin_email": org["admin"]["email"],
+        "created_at": org["created_at"],
+    }
+
+
+def job_accepted(job: dict) -> JSONResponse:
+    status_url = f"/jobs/{job['_id']}"
+    body = JobAccepted(job_id=job["_id"], status=job["status"], status_url=status_url)
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED, content=body.model_dump(), headers={"Location": status_url}
+    )
 
 
 async def get_current_admin(token: str = Depends(oauth2_scheme)):
     try:
-        payload = decode_access_token(token)
+        payload = await verify_access_token(token)
     except (JWTError, ValueError):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
     return payload
 
 
+def require_operator(admin: Dict[str, Any], allowed_emails: List[str]) -> None:
+    if admin["admin_email"] not in allowed_emails:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Unauthorized")
+
+
+async def read_capped_body(request: Request, max_bytes: int) -> bytes:
+    """The raw request body, refused with ``413`` once it exceeds ``max_bytes``."""
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Request body too large")
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > max_bytes:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Request body too large")
+    return bytes(body)
+
+
 @router.post("/create", response_model=OrgResponse)
 async def create_org(payload: OrgCreateRequest):
     service = await get_org_service()
@@ -32,12 +121,49 @@ async def create_org(payload: OrgCreateRequest):
         org_doc = await service.create_organization(payload.organization_name, payload.email, payload.password)
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
-    return OrgResponse(
-        organization_name=org_doc["organization_name"],
-        collection_name=org_doc["collection_name"],
-        admin_email=org_doc["admin"]["email"],
-        created_at=org_doc["created_at"],
-    )
+    return FastJSONResponse(public_org(org_doc))
+
+
+@router.post("/bulk_create")
+async def bulk_create_orgs(request: Request, admin=Depends(get_current_admin)):
+    """Create many organizations, for the operators listed in ``BULK_CREATE_ADMIN_EMAILS``."""
+    settings = get_settings()
+    require_operator(admin, settings.bulk_create_admin_emails)
+    body = await read_capped_body(request, settings.bulk_create_max_bytes)
+    try:
+        if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+            raw_items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            raw_items = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed request body")
+    if not isinstance(raw_items, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a JSON array or NDJSON")
+    if len(raw_items) > settings.bulk_create_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.bulk_create_max_items} organizations per request",
+        )
+
+    items, invalid = [], []
+    for index, raw in enumerate(raw_items):
+        try:
+            payload = OrgCreateRequest.model_validate(raw)
+        except ValidationError as exc:
+            detail = exc.errors(include_url=False, include_context=False, include_input=False)
+            invalid.append({"index": index, "status": "error", "detail": detail})
+            continue
+        items.append({"index": index, **payload.model_dump()})
+
+    service = await get_org_service()
+
+    async def results():
+        for result in invalid:
+            yield json.dumps(result) + "\n"
+        async for result in service.create_organizations(items):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
 
 
 @router.get("/get", response_model=OrgResponse)
@@ -46,17 +172,117 @@ async def get_org(organization_name: str):
     org_doc = await service.get_organization(organization_name)
     if not org_doc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Organization not found")
-    return OrgResponse(
-        organization_name=org_doc["organization_name"],
-        collection_name=org_doc["collection_name"],
-        admin_email=org_doc["admin"]["email"],
-        created_at=org_doc["created_at"],
+    return FastJSONResponse(public_org(org_doc))
+
+
+@router.post("/batch_get", response_model=OrgBatchGetResponse)
+async def batch_get_orgs(payload: OrgBatchGetRequest):
+    """Look up many organizations in one round trip; results follow the input order."""
+    max_names = get_settings().batch_get_max_names
+    if len(payload.organization_names) > max_names:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {max_names} organization names per request",
+        )
+    service = await get_org_service()
+    found = await service.get_organizations(payload.organization_names)
+    items = []
+    for name in payload.organization_names:
+        org = found.get(name)
+        organization = public_org(org) if org is not None else None
+        items.append({"organization_name": name, "found": org is not None, "organization": organization})
+    return FastJSONResponse({"items": items})
+
+
+def encode_cursor(organization_name: str) -> str:
+    return base64.urlsafe_b64encode(organization_name.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return base64.urlsafe_b64decode(cursor.encode()).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+@router.get("/list", response_model=OrgListResponse)
+async def list_orgs(
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    prefix: Optional[str] = None,
+    stream: bool = False,
+    admin=Depends(get_current_admin),
+):
+    service = await get_org_service()
+    if stream:
+
+        async def lines():
+            async for org in service.iter_organizations(prefix=prefix):
+                yield orjson.dumps(org, option=orjson.OPT_UTC_Z) + b"\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    limit = min(limit, get_settings().list_page_max_size)
+    after = decode_cursor(cursor) if cursor else None
+    orgs = await service.list_organizations(limit=limit, after=after, prefix=prefix)
+    next_cursor = encode_cursor(orgs[-1]["organization_name"]) if len(orgs) == limit else None
+    return FastJSONResponse({"items": orgs, "next_cursor": next_cursor})
+
+
+@router.get("/stats", response_model=OrgStats)
+async def org_stats(organization_name: str, admin=Depends(get_current_admin)):
+    """Document count and storage sizes of the organization, cached for ``STATS_CACHE_TTL_SECONDS``."""
+    service = await get_tenant_data_service()
+    org = await resolve_org(service, organization_name, admin)
+    return await tenant_stats.get(service.org_service, org)
+
+
+@router.get("/stats/summary", response_model=OrgStatsSummary)
+async def org_stats_summary(admin=Depends(get_current_admin)):
+    """Totals across every organization, for the operators listed in ``STATS_ADMIN_EMAILS``."""
+    require_operator(admin, get_settings().stats_admin_emails)
+    return await tenant_stats.summary(await get_org_service())
+
+
+@router.get("/export")
+async def export_org(
+    organization_name: str,
+    format: Literal["ndjson", "bson"] = "ndjson",
+    gzip: bool = True,
+    admin=Depends(get_current_admin),
+):
+    """Stream the organization's documents as NDJSON (canonical extended JSON) or concatenated BSON."""
+    service = await get_tenant_data_service()
+    org = await resolve_org(service, organization_name, admin)
+    filename = f"{org['collection_name']}.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        service.export_documents(org, format, compress=gzip),
+        media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
 
 
-@router.put("/update", response_model=OrgResponse)
+@router.post("/import")
+async def import_org(
+    request: Request,
+    organization_name: str,
+    format: Literal["ndjson", "bson"] = "ndjson",
+    admin=Depends(get_current_admin),
+):
+    """Load an export stream, gzipped or not, into the organization; existing ``_id`` values are kept."""
+    service = await get_tenant_data_service()
+    org = await resolve_org(service, organization_name, admin, for_write=True)
+    try:
+        return await service.import_documents(org, request.stream(), format)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+
+@router.put("/update", response_model=OrgResponse, responses={202: {"model": JobAccepted}})
 async def update_org(payload: OrgUpdateRequest, admin=Depends(get_current_admin)):
+    """Metadata changes apply immediately; a rename answers ``202`` and moves the tenant's data in a job."""
     service = await get_org_service()
+    job = pending_job("rename_tenant", admin["admin_email"], old_name=payload.organization_name)
     try:
         updated = await service.update_organization(
             organization_name=payload.organization_name,
@@ -64,6 +290,8 @@ async def update_org(payload: OrgUpdateRequest, admin=Depends(get_current_admin)
             new_email=payload.email,
             new_password=payload.password,
             new_organization_name=payload.new_organization_name,
+            move_data=False,
+            pending_job=job,
         )
     except LookupError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
@@ -71,23 +299,27 @@ async def update_org(payload: OrgUpdateRequest, admin=Depends(get_current_admin)
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(exc))
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
-    return OrgResponse(
-        organization_name=updated["organization_name"],
-        collection_name=updated["collection_name"],
-        admin_email=updated["admin"]["email"],
-        created_at=updated["created_at"],
-    )
+    if payload.email or payload.password or payload.new_organization_name:
+        await revoke_refresh_tokens(updated["_id"])
+    if payload.new_organization_name and payload.new_organization_name != payload.organization_name:
+        return job_accepted(await enqueue_pending(updated))
+    return FastJSONResponse(public_org(updated))
 
 
-@router.delete("/delete")
+@router.delete("/delete", status_code=status.HTTP_202_ACCEPTED, response_model=JobAccepted)
 async def delete_org(organization_name: str, admin=Depends(get_current_admin)):
+    """Hides the organization at once; a job drops its data, then frees its name."""
     service = await get_org_service()
     try:
-        await service.delete_organization(organization_name, requester_email=admin["admin_email"])
+        org = await service.delete_organization(
+            organization_name,
+            requester_email=admin["admin_email"],
+            drop_data=False,
+            pending_job=pending_job("drop_tenant", admin["admin_email"]),
+        )
     except LookupError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
     except PermissionError as exc:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(exc))
-    return {"message": "Organization deleted"}
-
-
+    await revoke_refresh_tokens(org["_id"])
+    return job_accepted(await enqueue_pending(org))
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, EmailStr, Field
 
@@ -24,6 +24,60 @@ class OrgResponse(BaseModel):
     created_at: datetime
 
 
+class OrgListItem(BaseModel):
+    organization_name: str
+    collection_name: str
+    created_at: datetime
+
+
+class OrgListResponse(BaseModel):
+    items: List[OrgListItem]
+    next_cursor: Optional[str] = None
+
+
+class OrgBatchGetRequest(BaseModel):
+    organization_names: List[str] = Field(..., min_length=1)
+
+
+class OrgBatchItem(BaseModel):
+    organization_name: str
+    found: bool
+    organization: Optional[OrgResponse] = None
+
+
+class OrgBatchGetResponse(BaseModel):
+    items: List[OrgBatchItem]
+
+
+class TenantQueryRequest(BaseModel):
+    filter: Dict[str, Any] = Field(default_factory=dict)
+    fields: Optional[List[str]] = None
+    limit: int = Field(100, ge=1)
+    cursor: Optional[str] = None
+
+
+class OrgStats(BaseModel):
+    organization_name: str
+    collection_name: str
+    documents: int
+    data_size: Optional[int] = None
+    storage_size: Optional[int] = None
+    index_size: Optional[int] = None
+    source: str
+    computed_at: datetime
+
+
+class OrgStatsSummary(BaseModel):
+    organizations: int
+    failed: int
+    documents: int
+    data_size: int
+    storage_size: int
+    index_size: int
+    largest: List[OrgStats]
+    computed_at: datetime
+
+
 class OrgMetadata(BaseModel):
     organization_name: str
     collection_name: str
@@ -39,5 +93,27 @@ class AdminLoginRequest(BaseModel):
 class TokenResponse(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    expires_in: Optional[int] = None
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
+class JobAccepted(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    type: str
+    status: str
+    attempts: int
+    progress: Dict[str, Any] = {}
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
@@ -0,0 +1,55 @@
+"""Production entry point: ``python -m app.server [--workers N] [--host HOST] [--port PORT]``.
+
+Runs ``app.main:app`` under uvicorn with one worker process per core by default. Each worker
+imports the app itself, so it builds its own Mongo clients and hash pool, and warms its
+connections in the lifespan before accepting traffic. On SIGTERM/SIGINT workers stop accepting
+connections, drain in-flight requests for up to ``GRACEFUL_SHUTDOWN_SECONDS``, then run the
+lifespan shutdown (job workers stopped, clients closed).
+"""
+import argparse
+import os
+from typing import List, Optional
+
+import uvicorn
+
+from .config import get_settings
+
+
+def worker_count(requested: Optional[int] = None) -> int:
+    return max(1, requested or get_settings().web_concurrency or os.cpu_count() or 1)
+
+
+def hash_workers_per_process(workers: int) -> int:
+    # Split the cores between processes so N workers don't each start a CPU-count bcrypt pool.
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Serve the API with one worker process per core.")
+    parser.add_argument("--workers", type=int, default=None, help="defaults to WEB_CONCURRENCY or the CPU count")
+    parser.add_argument("--host", default=settings.server_host)
+    parser.add_argument("--port", type=int, default=settings.server_port)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    settings = get_settings()
+    workers = worker_count(args.workers)
+    if settings.hash_workers is None:
+        # Worker processes inherit the environment, so this sizes each of their hash pools.
+        os.environ["HASH_WORKERS"] = str(hash_workers_per_process(workers))
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        timeout_graceful_shutdown=settings.graceful_shutdown_seconds,
+        proxy_headers=True,
+        log_level=settings.log_level.lower(),
+    )
+
+
+if __name__ == "__main__":
+    main()
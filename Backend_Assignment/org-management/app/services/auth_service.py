@@ -1,25 +1,79 @@
-from datetime import timedelta
-from typing import Dict, Optional
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
 
 from loguru import logger
 from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, IndexModel, ReturnDocument
 
-from ..utils import verify_password, create_access_token
 from ..config import get_settings
+from ..hashing import hash_password, verify_password
+from ..tracing import span
+from ..utils import create_access_token
+from .org_service import LIVE_ORGS
+
+REFRESH_TOKEN_INDEXES = [
+    # Expired tokens are removed by the server; queries still check expires_at for the TTL monitor's lag.
+    IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+    IndexModel([("family_id", ASCENDING)], name="family_id"),
+    IndexModel([("org_id", ASCENDING)], name="org_id"),
+]
+
+
+_dummy_hash: Optional[str] = None
+
+
+async def dummy_password_hash() -> str:
+    """A real bcrypt hash at the configured cost, verified against when an email is unknown."""
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = await hash_password(secrets.token_urlsafe(16))
+    return _dummy_hash
+
+
+def refresh_token_digest(token: str) -> str:
+    # Refresh tokens are 256 random bits, so a plain SHA-256 is enough to make the stored value useless.
+    return hashlib.sha256(token.encode()).hexdigest()
 
 
 class AuthService:
-    def __init__(self, master_collection: AsyncIOMotorCollection):
+    def __init__(
+        self,
+        master_collection: AsyncIOMotorCollection,
+        refresh_collection: Optional[AsyncIOMotorCollection] = None,
+        read_collection: Optional[AsyncIOMotorCollection] = None,
+    ):
         self.master_collection = master_collection
+        self.read_collection = read_collection if read_collection is not None else master_collection
+        self.stale_reads = self.read_collection.read_preference != master_collection.read_preference
+        self.refresh_collection = (
+            refresh_collection if refresh_collection is not None else master_collection.database["refresh_tokens"]
+        )
+
+    async def ensure_indexes(self) -> List[str]:
+        return await self.refresh_collection.create_indexes(REFRESH_TOKEN_INDEXES)
 
-    async def get_admin_org(self, email: str) -> Optional[Dict]:
-        return await self.master_collection.find_one({"admin.email": email})
+    async def get_admin_org(self, email: str, primary: bool = False) -> Optional[Dict]:
+        """Look up an admin's org, by default on the read preference and confirming misses on the primary."""
+        if not primary and self.stale_reads:
+            with span("mongo.find_one", query="admin.email", read="secondary_ok"):
+                org = await self.read_collection.find_one({"admin.email": email, **LIVE_ORGS})
+            if org is not None:
+                return org
+        with span("mongo.find_one", query="admin.email", read="primary"):
+            return await self.master_collection.find_one({"admin.email": email, **LIVE_ORGS})
 
     async def authenticate_admin(self, email: str, password: str) -> Dict:
-        org = await self.get_admin_org(email)
+        # Always the primary: a secondary may still hold a changed password's old hash.
+        org = await self.get_admin_org(email, primary=True)
         if not org:
+            # Spend the same bcrypt time as a wrong password, so response latency doesn't reveal
+            # which emails have accounts.
+            await verify_password(password, await dummy_password_hash())
             raise PermissionError("Invalid credentials")
-        if not verify_password(password, org["admin"]["password"]):
+        if not await verify_password(password, org["admin"]["password"]):
             raise PermissionError("Invalid credentials")
         logger.info("Admin {} authenticated for org {}", email, org["organization_name"])
         return org
@@ -31,6 +85,73 @@ class AuthService:
             "organization_name": org_name,
             "role": "admin",
         }
-        return create_access_token(payload, expires_minutes=settings.access_token_expire_minutes)
+        with span("jwt.issue"):
+            return create_access_token(payload, expires_minutes=settings.access_token_expire_minutes)
+
+    async def issue_refresh_token(self, org: Dict, family_id: Optional[str] = None) -> str:
+        """Store a new refresh token for the org's admin; only its digest is persisted."""
+        token = secrets.token_urlsafe(32)
+        now = datetime.now(timezone.utc)
+        with span("mongo.insert_one", collection="refresh_tokens"):
+            await self.refresh_collection.insert_one(
+                {
+                    "_id": refresh_token_digest(token),
+                    "family_id": family_id or uuid.uuid4().hex,
+                    "org_id": org["_id"],
+                    "admin_email": org["admin"]["email"],
+                    "organization_name": org["organization_name"],
+                    "used_at": None,
+                    "created_at": now,
+                    "expires_at": now + timedelta(days=get_settings().refresh_token_expire_days),
+                }
+            )
+        return token
+
+    async def issue_token_pair(self, org: Dict) -> Tuple[str, str]:
+        access_token = await self.issue_token(org["admin"]["email"], org["organization_name"])
+        return access_token, await self.issue_refresh_token(org)
+
+    async def refresh(self, refresh_token: str) -> Tuple[str, str]:
+        """Exchange a refresh token for a new access/refresh pair, without touching the password hash.
+
+        The token is consumed by one conditional update on its ``_id``. Presenting a token that
+        was already used means it leaked, so every token descended from the same login is revoked.
+        """
+        digest = refresh_token_digest(refresh_token)
+        now = datetime.now(timezone.utc)
+        with span("mongo.find_one_and_update", collection="refresh_tokens"):
+            stored = await self.refresh_collection.find_one_and_update(
+                {"_id": digest, "used_at": None, "expires_at": {"$gt": now}},
+                {"$set": {"used_at": now}},
+                return_document=ReturnDocument.AFTER,
+            )
+        if stored is None:
+            reused = await self.refresh_collection.find_one({"_id": digest, "used_at": {"$ne": None}})
+            if reused is not None:
+                await self.revoke_family(reused["family_id"])
+                logger.warning("Refresh token reuse for {}, revoked its family", reused["admin_email"])
+            raise PermissionError("Invalid refresh token")
+
+        org = {
+            "_id": stored["org_id"],
+            "organization_name": stored["organization_name"],
+            "admin": {"email": stored["admin_email"]},
+        }
+        access_token = await self.issue_token(stored["admin_email"], stored["organization_name"])
+        return access_token, await self.issue_refresh_token(org, family_id=stored["family_id"])
+
+    async def revoke_refresh_token(self, refresh_token: str) -> None:
+        """Revoke the token and every other token rotated from the same login."""
+        digest = refresh_token_digest(refresh_token)
+        stored = await self.refresh_collection.find_one({"_id": digest}, {"family_id": 1})
+        if stored is not None:
+            await self.revoke_family(stored["family_id"])
 
+    async def revoke_family(self, family_id: str) -> None:
+        await self.refresh_collection.delete_many({"family_id": family_id})
 
+    async def revoke_org_tokens(self, org_id: Any) -> None:
+        """Drop every refresh token of an org, whose claims go stale when it is updated or deleted."""
+        result = await self.refresh_collection.delete_many({"org_id": org_id})
+        if result.deleted_count:
+            logger.info("Revoked {} refresh tokens for org {}", result.deleted_count, org_id)
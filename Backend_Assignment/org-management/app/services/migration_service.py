@@ -0,0 +1,205 @@
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from bson import json_util
+from loguru import logger
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from ..config import get_settings
+
+ProgressCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+DUPLICATE_KEY = 11000
+NAMESPACE_NOT_FOUND = 26
+
+
+class CollectionMigrator:
+    """Moves a collection with as few client round trips as the deployment allows.
+
+    Tries, in order: a server-side ``renameCollection`` (same database), a ``$merge``
+    aggregation (same cluster) and finally streamed ``insert_many`` batches. Batch
+    progress is checkpointed in ``progress_collection`` so a migration interrupted
+    halfway resumes from the last copied ``_id`` instead of starting over.
+
+    A whole-collection move refuses a target that already holds documents, rather than
+    merging two collections into one. With a ``query``, only matching documents are moved
+    (batched) and then deleted from the source, which stays in place. ``drop_source=False`` leaves the source
+    untouched so the caller can remove it once readers have switched over.
+
+    Migrations are checkpointed under their source and target namespaces; between shards,
+    whose databases may share a name, pass a ``route`` naming both ends to tell them apart.
+    """
+
+    def __init__(self, progress_collection: AsyncIOMotorCollection, batch_size: Optional[int] = None):
+        self.progress_collection = progress_collection
+        self.batch_size = batch_size or get_settings().migration_batch_size
+
+    @staticmethod
+    def migration_id(
+        source: AsyncIOMotorCollection,
+        target: AsyncIOMotorCollection,
+        query: Optional[Dict[str, Any]] = None,
+        route: Optional[str] = None,
+    ) -> str:
+        migration_id = f"{source.full_name}->{target.full_name}"
+        if route:
+            migration_id = f"{route}:{migration_id}"
+        return f"{migration_id}?{json_util.dumps(query, sort_keys=True)}" if query else migration_id
+
+    async def get_progress(
+        self,
+        source: AsyncIOMotorCollection,
+        target: AsyncIOMotorCollection,
+        query: Optional[Dict[str, Any]] = None,
+        route: Optional[str] = None,
+    ) -> Optional[Dict]:
+        return await self.progress_collection.find_one({"_id": self.migration_id(source, target, query, route)})
+
+    async def discard(
+        self,
+        source: AsyncIOMotorCollection,
+        target: AsyncIOMotorCollection,
+        query: Optional[Dict[str, Any]] = None,
+        route: Optional[str] = None,
+    ) -> None:
+        """Forget an abandoned migration's checkpoint, so the next attempt copies from the start."""
+        await self.progress_collection.delete_one({"_id": self.migration_id(source, target, query, route)})
+
+    async def migrate(
+        self,
+        source: AsyncIOMotorCollection,
+        target: AsyncIOMotorCollection,
+        on_progress: Optional[ProgressCallback] = None,
+        query: Optional[Dict[str, Any]] = None,
+        drop_source: bool = True,
+        route: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        migration_id = self.migration_id(source, target, query, route)
+        progress = await self.progress_collection.find_one({"_id": migration_id})
+
+        if progress is None:
+            if not query and await target.find_one({}, {"_id": 1}) is not None:
+                raise ValueError(f"Target collection {target.full_name} already holds documents")
+            # Recorded before any data moves, so a rerun after an interrupted $merge resumes instead of refusing.
+            progress = {
+                "_id": migration_id,
+                "source": source.full_name,
+                "target": target.full_name,
+                "copied": 0,
+                "last_id": None,
+                "started_at": datetime.now(timezone.utc),
+            }
+            await self.progress_collection.insert_one(progress)
+            if not query and drop_source and await self._try_rename(source, target):
+                return await self._finish(migration_id, "rename", None, on_progress)
+            if not query and await self._try_merge(source, target):
+                if drop_source:
+                    await source.drop()
+                return await self._finish(migration_id, "merge", None, on_progress)
+        else:
+            logger.info("Resuming migration {} after {} documents", migration_id, progress["copied"])
+
+        copied = await self._copy_batches(source, target, progress, on_progress, query or {})
+        if drop_source and query:
+            await source.delete_many(query)
+        elif drop_source:
+            await source.drop()
+        return await self._finish(migration_id, "batched", copied, on_progress)
+
+    async def _try_rename(self, source: AsyncIOMotorCollection, target: AsyncIOMotorCollection) -> bool:
+        if source.database.client is not target.database.client or source.database.name != target.database.name:
+            return False
+        try:
+            await source.rename(target.name)
+        except OperationFailure as exc:
+            if exc.code == NAMESPACE_NOT_FOUND:
+                # Tenant collections are created lazily, so there may be nothing to move.
+                return True
+            logger.info("renameCollection unavailable for {}: {}", source.full_name, exc)
+            return False
+        except NotImplementedError as exc:
+            logger.info("renameCollection unavailable for {}: {}", source.full_name, exc)
+            return False
+        return True
+
+    async def _try_merge(self, source: AsyncIOMotorCollection, target: AsyncIOMotorCollection) -> bool:
+        if source.database.client is not target.database.client:
+            return False
+        pipeline = [
+            {
+                "$merge": {
+                    "into": {"db": target.database.name, "coll": target.name},
+                    "on": "_id",
+                    "whenMatched": "keepExisting",
+                    "whenNotMatched": "insert",
+                }
+            }
+        ]
+        try:
+            await source.aggregate(pipeline).to_list(length=None)
+        except (OperationFailure, NotImplementedError) as exc:
+            logger.info("$merge unavailable for {}: {}", source.full_name, exc)
+            return False
+        return True
+
+    async def _copy_batches(
+        self,
+        source: AsyncIOMotorCollection,
+        target: AsyncIOMotorCollection,
+        progress: Dict,
+        on_progress: Optional[ProgressCallback],
+        query: Dict[str, Any],
+    ) -> int:
+        # Keyset resume assumes homogeneous _id types, which holds for driver-generated ObjectIds.
+        if progress["last_id"] is not None:
+            query = {**query, "_id": {"$gt": progress["last_id"]}}
+        cursor = source.find(query, sort=[("_id", 1)], batch_size=self.batch_size)
+        copied = progress["copied"]
+        batch: List[Dict] = []
+        async for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= self.batch_size:
+                copied = await self._flush(target, batch, progress["_id"], copied, on_progress)
+                batch = []
+        if batch:
+            copied = await self._flush(target, batch, progress["_id"], copied, on_progress)
+        return copied
+
+    async def _flush(
+        self,
+        target: AsyncIOMotorCollection,
+        batch: List[Dict],
+        migration_id: str,
+        copied: int,
+        on_progress: Optional[ProgressCallback],
+    ) -> int:
+        try:
+            await target.insert_many(batch, ordered=False)
+        except BulkWriteError as exc:
+            # Documents already present from an interrupted run are expected; anything else is not.
+            if any(err.get("code") != DUPLICATE_KEY for err in exc.details.get("writeErrors", [])):
+                raise
+        copied += len(batch)
+        await self.progress_collection.update_one(
+            {"_id": migration_id},
+            {"$set": {"copied": copied, "last_id": batch[-1]["_id"], "updated_at": datetime.now(timezone.utc)}},
+        )
+        logger.info("Migration {} copied {} documents", migration_id, copied)
+        if on_progress:
+            await on_progress({"migration_id": migration_id, "copied": copied})
+        return copied
+
+    async def _finish(
+        self,
+        migration_id: str,
+        method: str,
+        copied: Optional[int],
+        on_progress: Optional[ProgressCallback],
+    ) -> Dict[str, Any]:
+        await self.progress_collection.delete_one({"_id": migration_id})
+        result = {"migration_id": migration_id, "method": method, "copied": copied, "done": True}
+        if on_progress:
+            await on_progress(result)
+        logger.info("Migration {} finished via {}", migration_id, method)
+        return result
@@ -1,44 +1,363 @@
 import asyncio
+import re
+import time
+import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from typing import Dict, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, NoReturn, Optional, Tuple
 
+from bson import ObjectId
 from loguru import logger
 from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
-from pymongo.errors import DuplicateKeyError
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
-from ..utils import get_password_hash, safe_collection_name
+from ..cache import OrgCache, org_cache
+from ..config import get_settings
+from ..db import ShardRouter, causal_session, shard_router
+from ..hashing import HashingOverloadedError, hash_password
+from ..tracing import span
+from ..tenancy import COLLECTION_MODE, TenancyStrategies, TenancyStrategy
+from .migration_service import CollectionMigrator, ProgressCallback
+
+
+# Fields safe to return to clients; never includes admin.password.
+PUBLIC_PROJECTION = {"_id": 0, "organization_name": 1, "collection_name": 1, "admin.email": 1, "created_at": 1}
+# Listings span every org, so they leave out the admin emails a caller could otherwise harvest.
+LIST_PROJECTION = {"_id": 0, "organization_name": 1, "collection_name": 1, "created_at": 1}
+# Everything but the password hash and write leases: all that reads, the cache and tenant routing need.
+METADATA_PROJECTION = {"admin.password": 0, "write_leases": 0}
+# Deleted orgs stay behind as tombstones, holding their name and storage until the data is dropped; lookups skip them.
+LIVE_ORGS = {"deleting": {"$exists": False}}
+# Fields that locate a tenant's data; enough for strategies to move or drop it after the org is gone.
+STORAGE_FIELDS = ("_id", "organization_name", "collection_name", "tenancy", "tenant_id", "shard")
+
+
+# How often a data move checks whether the writers it waits for have finished.
+WRITE_LEASE_POLL_SECONDS = 0.5
+
+
+class TenantMovingError(RuntimeError):
+    """The tenant's data is being renamed or moved to another shard; writes should be retried later."""
+
+
+def duplicate_message(details: Optional[Dict[str, Any]]) -> str:
+    key_pattern = (details or {}).get("keyPattern", {})
+    if "admin.email" in key_pattern:
+        return "Admin email already in use"
+    return "Organization already exists"
+
+
+def _bulk_error(item: Dict[str, Any], detail: str) -> Dict[str, Any]:
+    return {"index": item["index"], "organization_name": item["organization_name"], "status": "error", "detail": detail}
 
 
 class OrgService:
-    def __init__(self, master_collection: AsyncIOMotorCollection, master_db: AsyncIOMotorDatabase):
+    def __init__(
+        self,
+        master_collection: AsyncIOMotorCollection,
+        master_db: AsyncIOMotorDatabase,
+        migrator: Optional[CollectionMigrator] = None,
+        cache: Optional[OrgCache] = None,
+        tenancy: Optional[TenancyStrategies] = None,
+        router: Optional[ShardRouter] = None,
+        read_collection: Optional[AsyncIOMotorCollection] = None,
+    ):
         self.master_collection = master_collection
+        # Stale-tolerant reads go here (see Database.get_read_db); writes and read-your-writes use the primary.
+        self.read_collection = read_collection if read_collection is not None else master_collection
+        self.stale_reads = self.read_collection.read_preference != master_collection.read_preference
         self.master_db = master_db
+        self.migrator = migrator or CollectionMigrator(master_db["migrations"])
+        self.cache = cache if cache is not None else org_cache
+        self.tenancy = tenancy or TenancyStrategies(self.migrator)
+        self.router = router or shard_router
 
-    async def organization_exists(self, organization_name: str) -> Optional[Dict]:
-        return await self.master_collection.find_one({"organization_name": organization_name})
+    def tenant_db(self, org: Dict) -> AsyncIOMotorDatabase:
+        """The database holding an organization's documents, as recorded by its ``shard`` placement."""
+        return self._shard_db(org.get("shard"))
 
-    async def create_organization(self, organization_name: str, email: str, password: str) -> Dict:
-        if await self.organization_exists(organization_name):
-            raise ValueError("Organization already exists")
+    def _shard_db(self, shard: Optional[str]) -> AsyncIOMotorDatabase:
+        return self.master_db if shard is None else self.router.get_database(shard)
+
+    def _placement(self) -> Dict[str, Any]:
+        # Placement hashes the immutable _id so renames never change where a tenant belongs.
+        org_id = ObjectId()
+        shard = self.router.place(str(org_id))
+        return {"_id": org_id, "shard": shard} if shard else {"_id": org_id}
+
+    def strategy_for(self, org: Dict) -> TenancyStrategy:
+        return self.tenancy.for_org(org)
+
+    def tenant_scope(self, org: Dict) -> Tuple[AsyncIOMotorCollection, Dict[str, Any]]:
+        """The collection holding an organization's documents and the filter that confines queries to it."""
+        strategy = self.strategy_for(org)
+        return strategy.collection(self.tenant_db(org), org), strategy.tenant_filter(org)
+
+    def storage_moving(self, org: Dict) -> bool:
+        """Whether the org's data is being moved, by a shard move or a rename whose data move hasn't finished."""
+        if "moving_to" in org:
+            return True
+        expected = self.strategy_for(org).metadata_for(org["organization_name"])
+        return expected["collection_name"] != org["collection_name"]
 
-        collection_name = safe_collection_name(organization_name)
-        org_collection = self.master_db[collection_name]
-        await org_collection.insert_one({"_meta": "initialized"})  # ensure collection creation
+    @asynccontextmanager
+    async def write_lease(self, org: Dict) -> AsyncIterator[Callable[[], Awaitable[None]]]:
+        """Register a writer of the org's data, so moves wait for it to finish instead of copying under it.
 
-        hashed_password = get_password_hash(password)
+        The lease is recorded on the master document by an update that only matches while the
+        org's name and storage are still as ``org`` describes and no move has started, so a
+        writer either holds a lease the move will wait for or is refused. Leases expire after
+        ``TENANT_WRITE_LEASE_SECONDS``; call the yielded function before each batch to renew it.
+        """
+        if self.storage_moving(org):
+            raise TenantMovingError("Organization data is being moved, retry later")
+        ttl = get_settings().tenant_write_lease_seconds
+        field = f"write_leases.{uuid.uuid4().hex}"
+        fence = {
+            "_id": org["_id"],
+            "organization_name": org["organization_name"],
+            "collection_name": org["collection_name"],
+            "moving_to": {"$exists": False},
+            **LIVE_ORGS,
+        }
+        with span("mongo.update_one", query="write_lease"):
+            result = await self.master_collection.update_one(fence, {"$set": {field: time.time() + ttl}})
+        if not result.matched_count:
+            raise TenantMovingError("Organization data is being moved, retry later")
+        renewed_at = time.monotonic()
+
+        async def renew() -> None:
+            nonlocal renewed_at
+            if time.monotonic() - renewed_at < ttl / 2:
+                return
+            # A lease that already ran out may have let a move start; stop writing rather than extend it.
+            now = time.time()
+            result = await self.master_collection.update_one(
+                {"_id": org["_id"], field: {"$gt": now}}, {"$set": {field: now + ttl}}
+            )
+            if not result.matched_count:
+                raise TenantMovingError("Write lease expired, retry later")
+            renewed_at = time.monotonic()
+
+        try:
+            yield renew
+        finally:
+            await self.master_collection.update_one({"_id": org["_id"]}, {"$unset": {field: ""}})
+
+    async def wait_for_writers(self, org: Dict, on_progress: Optional[ProgressCallback] = None) -> None:
+        """Wait until no unexpired write lease is held on the org; expired ones are cleared."""
+        while True:
+            doc = await self.master_collection.find_one({"_id": org["_id"]}, {"write_leases": 1})
+            leases = (doc or {}).get("write_leases") or {}
+            now = time.time()
+            expired = [lease for lease, expires_at in leases.items() if expires_at <= now]
+            if expired:
+                unset = {f"write_leases.{lease}": "" for lease in expired}
+                await self.master_collection.update_one({"_id": org["_id"]}, {"$unset": unset})
+            if len(expired) == len(leases):
+                return
+            if on_progress:
+                await on_progress({"waiting_for_writers": len(leases) - len(expired)})
+            await asyncio.sleep(WRITE_LEASE_POLL_SECONDS)
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self.cache.stats()
+
+    async def organization_exists(self, organization_name: str) -> Optional[Dict]:
+        with span("mongo.find_one", query="organization_name"):
+            return await self.master_collection.find_one({"organization_name": organization_name, **LIVE_ORGS})
+
+    async def create_organization(self, organization_name: str, email: str, password: str) -> Dict:
+        # One insert: the unique indexes reject taken names and emails, and the tenant
+        # collection is created by its first write rather than up front.
+        strategy = self.tenancy.default
+        hashed_password = await hash_password(password)
         now = datetime.now(timezone.utc)
         org_doc = {
+            **self._placement(),
             "organization_name": organization_name,
-            "collection_name": collection_name,
+            **strategy.metadata_for(organization_name),
             "admin": {"email": email, "password": hashed_password},
             "created_at": now,
         }
-        await self.master_collection.insert_one(org_doc)
+        try:
+            with span("mongo.insert_one"):
+                await self.master_collection.insert_one(org_doc)
+        except DuplicateKeyError as exc:
+            raise ValueError(duplicate_message(exc.details)) from exc
+        self.cache.invalidate(organization_name)
+        with span("tenancy.provision", mode=strategy.mode):
+            await strategy.provision(self.tenant_db(org_doc), org_doc)
         logger.info("Created organization {}", organization_name)
         return org_doc
 
+    async def create_organizations(self, items: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """Provision many organizations, yielding one result per item as each chunk completes.
+
+        Each item carries ``index``, ``organization_name``, ``email`` and ``password``.
+        """
+        chunk_size = get_settings().bulk_create_chunk_size
+        seen: set = set()
+        for start in range(0, len(items), chunk_size):
+            for result in await self._create_chunk(items[start : start + chunk_size], seen):
+                yield result
+
+    async def _create_chunk(self, items: List[Dict[str, Any]], seen: set) -> List[Dict[str, Any]]:
+        strategy = self.tenancy.default
+        results: Dict[int, Dict[str, Any]] = {}
+        candidates = []
+        for item in items:
+            storage = strategy.metadata_for(item["organization_name"])
+            keys = {("name", item["organization_name"]), ("email", item["email"])}
+            if strategy.mode == COLLECTION_MODE:
+                keys.add(("collection", storage["collection_name"]))
+            if keys & seen:
+                results[item["index"]] = _bulk_error(item, "Duplicate in request")
+                continue
+            seen.update(keys)
+            candidates.append({**item, "storage": storage})
+
+        # Names taken by existing orgs come back as per-document errors from the unordered insert.
+        hashes = await asyncio.gather(*(hash_password(item["password"]) for item in candidates), return_exceptions=True)
+        now = datetime.now(timezone.utc)
+        docs, pending = [], []
+        for item, hashed in zip(candidates, hashes):
+            if isinstance(hashed, HashingOverloadedError):
+                results[item["index"]] = _bulk_error(item, "Server busy, retry later")
+                continue
+            if isinstance(hashed, Exception):
+                raise hashed
+            docs.append(
+                {
+                    **self._placement(),
+                    "organization_name": item["organization_name"],
+                    **item["storage"],
+                    "admin": {"email": item["email"], "password": hashed},
+                    "created_at": now,
+                }
+            )
+            pending.append(item)
+
+        failed: Dict[int, str] = {}
+        if docs:
+            try:
+                with span("mongo.insert_many", size=len(docs)):
+                    await self.master_collection.insert_many(docs, ordered=False)
+            except BulkWriteError as exc:
+                for error in exc.details.get("writeErrors", []):
+                    failed[error["index"]] = duplicate_message(error)
+
+        created = []
+        for position, (item, doc) in enumerate(zip(pending, docs)):
+            if position in failed:
+                results[item["index"]] = _bulk_error(item, failed[position])
+                continue
+            created.append(doc)
+            results[item["index"]] = {
+                "index": item["index"],
+                "organization_name": item["organization_name"],
+                "status": "created",
+                "collection_name": doc["collection_name"],
+            }
+        self.cache.invalidate(*(doc["organization_name"] for doc in created))
+        with span("tenancy.provision", mode=strategy.mode, size=len(created)):
+            await asyncio.gather(*(strategy.provision(self.tenant_db(doc), doc) for doc in created))
+        logger.info("Bulk created {} of {} organizations", len(created), len(items))
+        return [results[item["index"]] for item in items]
+
     async def get_organization(self, organization_name: str) -> Optional[Dict]:
-        return await self.master_collection.find_one({"organization_name": organization_name})
+        cached = self.cache.get(organization_name)
+        if cached is not None:
+            return cached
+        with span("mongo.find_one", query="organization_name", read="secondary_ok"):
+            org = await self.read_collection.find_one(
+                {"organization_name": organization_name, **LIVE_ORGS}, METADATA_PROJECTION
+            )
+        if org is None and self.stale_reads:
+            # A lagging secondary may not have a just-created org yet; misses are confirmed on the primary.
+            with span("mongo.find_one", query="organization_name", read="primary"):
+                org = await self.master_collection.find_one(
+                    {"organization_name": organization_name, **LIVE_ORGS}, METADATA_PROJECTION
+                )
+        if org is not None:
+            self.cache.set(organization_name, org)
+        return org
+
+    async def get_organizations(self, organization_names: List[str]) -> Dict[str, Dict]:
+        """Resolve many names at once: cache hits first, then one projected ``$in`` for the rest.
+
+        Returns found orgs keyed by name; names missing from the result don't exist. Queried
+        documents carry only public fields, so they are not added to the cache of full documents.
+        """
+        found: Dict[str, Dict] = {}
+        missing = []
+        for name in dict.fromkeys(organization_names):
+            cached = self.cache.get(name)
+            if cached is not None:
+                found[name] = cached
+            else:
+                missing.append(name)
+        collections = [self.read_collection]
+        if self.stale_reads:
+            collections.append(self.master_collection)
+        for collection in collections:
+            if not missing:
+                break
+            with span("mongo.find", query="organization_name $in", size=len(missing)):
+                cursor = collection.find(
+                    {"organization_name": {"$in": missing}, **LIVE_ORGS}, PUBLIC_PROJECTION, batch_size=len(missing)
+                )
+                async for org in cursor:
+                    found[org["organization_name"]] = org
+            # As in get_organization, names a secondary misses are confirmed on the primary.
+            missing = [name for name in missing if name not in found]
+        return found
+
+    def _list_query(self, prefix: Optional[str], after: Optional[str]) -> Dict[str, Any]:
+        condition: Dict[str, Any] = {}
+        if prefix:
+            condition["$regex"] = f"^{re.escape(prefix)}"
+        if after is not None:
+            condition["$gt"] = after
+        return {"organization_name": condition, **LIVE_ORGS} if condition else dict(LIVE_ORGS)
+
+    async def list_organizations(
+        self, limit: int, after: Optional[str] = None, prefix: Optional[str] = None
+    ) -> List[Dict]:
+        """One keyset page ordered by ``organization_name``; pass the last name seen as ``after``."""
+        cursor = self.read_collection.find(
+            self._list_query(prefix, after),
+            LIST_PROJECTION,
+            sort=[("organization_name", 1)],
+            limit=limit,
+        )
+        with span("mongo.find", query="organization_name range", limit=limit):
+            return await cursor.to_list(length=limit)
+
+    async def iter_organizations(self, prefix: Optional[str] = None) -> AsyncIterator[Dict]:
+        cursor = self.read_collection.find(
+            self._list_query(prefix, None),
+            LIST_PROJECTION,
+            sort=[("organization_name", 1)],
+            batch_size=get_settings().list_batch_size,
+        )
+        async for org in cursor:
+            yield org
+
+    async def _raise_missing_or_forbidden(self, organization_name: str, session=None) -> NoReturn:
+        """Explain why a write filtered on name and admin email matched nothing.
+
+        Run in the write's causal session, the read may go to a secondary and still see the write.
+        """
+        with span("mongo.find_one", query="organization_name"):
+            collection = self.read_collection if session is not None else self.master_collection
+            exists = await collection.find_one(
+                {"organization_name": organization_name, **LIVE_ORGS}, {"_id": 1}, session=session
+            )
+        if exists is None:
+            raise LookupError("Organization not found")
+        raise PermissionError("Unauthorized")
 
     async def update_organization(
         self,
@@ -47,67 +366,218 @@ class OrgService:
         new_email: Optional[str] = None,
         new_password: Optional[str] = None,
         new_organization_name: Optional[str] = None,
+        move_data: bool = True,
+        pending_job: Optional[Dict[str, Any]] = None,
     ) -> Dict:
-        org = await self.organization_exists(organization_name)
-        if not org:
-            raise LookupError("Organization not found")
-
-        if org["admin"]["email"] != requester_email:
-            raise PermissionError("Unauthorized")
+        """Apply the changes with one conditional ``find_one_and_update`` and return the post-image.
 
-        update_fields = {}
-        target_collection_name = org["collection_name"]
-        # Handle rename
+        Ownership is part of the filter and the unique indexes reject taken names and emails, so
+        nothing can change between checking and writing. A rename claims the storage its new name
+        maps to in the same write, so it fails before any data moves if another org owns it. It
+        keeps the old storage fields until the data is in place, then flips them with a second
+        write; with ``move_data=False`` that is left to the caller (see ``move_renamed_tenant``),
+        and a ``pending_job`` describing the job that will do it is recorded by the same write.
+        """
+        query = {"organization_name": organization_name, "admin.email": requester_email, **LIVE_ORGS}
+        update_fields: Dict[str, Any] = {}
+        claims: Dict[str, Any] = {}
         if new_organization_name:
-            if await self.organization_exists(new_organization_name):
-                raise ValueError("New organization name already exists")
-
-            new_collection_name = safe_collection_name(new_organization_name)
-            old_collection = self.master_db[org["collection_name"]]
-            new_collection = self.master_db[new_collection_name]
-
-            cursor = old_collection.find({})
-            async for doc in cursor:
-                try:
-                    await new_collection.insert_one(doc)
-                except DuplicateKeyError:
-                    doc_copy = doc.copy()
-                    doc_copy.pop("_id", None)
-                    await new_collection.insert_one(doc_copy)
-
-            await old_collection.drop()
-            target_collection_name = new_collection_name
             update_fields["organization_name"] = new_organization_name
-            update_fields["collection_name"] = new_collection_name
-            logger.info("Renamed organization {} to {}", organization_name, new_organization_name)
-
+            # Tenancy never changes after creation, so reading it ahead of the write cannot go stale.
+            current = await self.master_collection.find_one(query, {"tenancy": 1})
+            if current is not None:
+                claims = self.strategy_for(current).claims_for(new_organization_name)
+                update_fields.update(claims)
+            if pending_job and not move_data and new_organization_name != organization_name:
+                update_fields["pending_job"] = pending_job
         if new_email:
             update_fields["admin.email"] = new_email
         if new_password:
-            update_fields["admin.password"] = get_password_hash(new_password)
+            update_fields["admin.password"] = await hash_password(new_password)
 
-        if update_fields:
+        async with causal_session(self.master_collection.database.client) as session:
+            try:
+                if update_fields:
+                    with span("mongo.find_one_and_update"):
+                        org = await self.master_collection.find_one_and_update(
+                            query,
+                            {"$set": update_fields},
+                            projection=METADATA_PROJECTION,
+                            return_document=ReturnDocument.AFTER,
+                            session=session,
+                        )
+                else:
+                    with span("mongo.find_one", query="organization_name admin.email"):
+                        org = await self.master_collection.find_one(query, METADATA_PROJECTION, session=session)
+            except DuplicateKeyError as exc:
+                message = duplicate_message(exc.details)
+                if new_organization_name and message == "Organization already exists":
+                    message = "New organization name already exists"
+                raise ValueError(message) from exc
+            finally:
+                self.cache.invalidate(organization_name, new_organization_name)
+            if org is None:
+                await self._raise_missing_or_forbidden(organization_name, session)
+        # Seed the cache with the post-image, so this process's next read can't refill it from a lagging secondary.
+        self.cache.set(org["organization_name"], org)
+
+        if new_organization_name and new_organization_name != organization_name:
+            if "collection_claim" in claims and await self._collection_owned_elsewhere(org, claims["collection_claim"]):
+                await self.revert_rename(org, organization_name)
+                raise ValueError("New organization name already exists")
+            logger.info("Renamed organization {} to {}", organization_name, new_organization_name)
+        if move_data and new_organization_name and new_organization_name != organization_name:
+            try:
+                org = await self.move_renamed_tenant(org)
+            except Exception:
+                await self.revert_rename(org, organization_name)
+                raise
+        return org
+
+    async def _collection_owned_elsewhere(self, org: Dict, collection_name: str) -> bool:
+        # Orgs created before claims existed own their collection without claiming it. None can take
+        # the name once this org's claim is written, so checking afterwards leaves no gap.
+        with span("mongo.find_one", query="collection_name"):
+            owner = await self.master_collection.find_one(
+                {"collection_name": collection_name, "_id": {"$ne": org["_id"]}}, {"_id": 1}
+            )
+        return owner is not None
+
+    async def move_renamed_tenant(self, org: Dict, on_progress: Optional[ProgressCallback] = None) -> Dict:
+        """Move a renamed org's data to match its new name, then record the new storage fields.
+
+        Safe to repeat: an interrupted move resumes and an already-moved collection is a no-op.
+        """
+        strategy = self.strategy_for(org)
+        if self.storage_moving(org):
+            # Writers leased before the rename may still be writing to the old collection.
+            await self.wait_for_writers(org, on_progress)
+        try:
+            with span("tenancy.rename", mode=strategy.mode):
+                storage_fields = await strategy.rename(
+                    self.tenant_db(org), org, org["organization_name"], on_progress=on_progress
+                )
+            storage_fields = {key: value for key, value in storage_fields.items() if org.get(key) != value}
+            update: Dict[str, Any] = {"$unset": {"pending_job": ""}}
+            if storage_fields:
+                update["$set"] = storage_fields
+            with span("mongo.update_one"):
+                await self.master_collection.update_one({"_id": org["_id"]}, update)
+        finally:
+            self.cache.invalidate(org["organization_name"])
+        logger.info("Moved data for renamed organization {}", org["organization_name"])
+        return {**org, **storage_fields}
+
+    async def revert_rename(self, org: Dict, old_name: str) -> None:
+        """Give a failed rename its old name back, matching where its data still is."""
+        restored = {"organization_name": old_name}
+        if "collection_claim" in org:
+            restored["collection_claim"] = org["collection_name"]
+        await self.master_collection.update_one({"_id": org["_id"]}, {"$set": restored, "$unset": {"pending_job": ""}})
+        self.cache.invalidate(old_name, org["organization_name"])
+        logger.warning("Rename of {} to {} failed, restored the old name", old_name, org["organization_name"])
+
+    async def move_tenant(
+        self, org: Dict, target_shard: Optional[str], on_progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, Any]:
+        """Copy a tenant's documents to ``target_shard``, then flip its recorded placement.
+
+        Reads keep hitting the old shard until the flip and the source copy is removed only
+        afterwards. Setting ``moving_to`` refuses new write leases, and the copy starts once the
+        writers already holding one are done, so no write lands behind the copy's cursor. A move
+        that fails before the flip discards its partial copy and clears ``moving_to``, so writes
+        resume on the old shard and a later attempt starts over.
+        """
+        strategy = self.strategy_for(org)
+        source_db = self.tenant_db(org)
+        target_db = self._shard_db(target_shard)
+        source, target = strategy.collection(source_db, org), strategy.collection(target_db, org)
+        query = strategy.tenant_filter(org) or None
+        route = f"{org.get('shard')}->{target_shard}"
+        await strategy.ensure_indexes(target_db)
+        await self.master_collection.update_one({"_id": org["_id"]}, {"$set": {"moving_to": target_shard}})
+        try:
+            await self.wait_for_writers(org, on_progress)
+            result = await self.migrator.migrate(
+                source, target, on_progress=on_progress, query=query, drop_source=False, route=route
+            )
             await self.master_collection.update_one(
-                {"organization_name": organization_name},
-                {"$set": update_fields},
+                {"_id": org["_id"]},
+                {"$set": {"shard": target_shard}, "$unset": {"moving_to": ""}},
             )
+        except Exception:
+            await self._abandon_move(org, target_shard, target_db, source, target, query, route)
+            raise
+        self.cache.invalidate(org["organization_name"])
+        await strategy.drop(source_db, org)
+        logger.info("Moved organization {} to shard {}", org["organization_name"], target_shard)
+        return result
 
-        updated_name = update_fields.get("organization_name", organization_name)
-        updated = await self.get_organization(updated_name)
-        if not updated:
-            raise RuntimeError("Failed to fetch updated organization")
-        return updated
+    async def _abandon_move(
+        self,
+        org: Dict,
+        target_shard: Optional[str],
+        target_db: AsyncIOMotorDatabase,
+        source: AsyncIOMotorCollection,
+        target: AsyncIOMotorCollection,
+        query: Optional[Dict[str, Any]],
+        route: str,
+    ) -> None:
+        # Only while the placement is unflipped: after the flip the target copy is the tenant's data.
+        result = await self.master_collection.update_one(
+            {"_id": org["_id"], "shard": org.get("shard"), "moving_to": target_shard}, {"$unset": {"moving_to": ""}}
+        )
+        if not result.matched_count:
+            return
+        # Writes resume on the source, so a partial copy would go stale; the next attempt copies afresh.
+        await self.strategy_for(org).drop(target_db, org)
+        await self.migrator.discard(source, target, query, route)
+        logger.warning("Move of {} to shard {} failed, left it in place", org["organization_name"], target_shard)
 
-    async def delete_organization(self, organization_name: str, requester_email: str) -> None:
-        org = await self.organization_exists(organization_name)
-        if not org:
-            raise LookupError("Organization not found")
-        if org["admin"]["email"] != requester_email:
-            raise PermissionError("Unauthorized")
+    async def delete_organization(
+        self,
+        organization_name: str,
+        requester_email: str,
+        drop_data: bool = True,
+        pending_job: Optional[Dict[str, Any]] = None,
+    ) -> Dict:
+        """Mark the org deleted and, unless ``drop_data=False``, purge it now; returns the deleted document.
 
-        collection_name = org["collection_name"]
-        await self.master_db[collection_name].drop()
-        await self.master_collection.delete_one({"organization_name": organization_name})
+        The org disappears from every lookup at once, but its master document stays as a tombstone
+        until ``purge_organization`` has dropped the data. Until then its name, collection and admin
+        email stay taken, so a new org can't be handed storage that still holds the old one's data.
+        A ``pending_job`` that will purge it later is recorded on the tombstone by the same write.
+        """
+        query = {"organization_name": organization_name, "admin.email": requester_email, **LIVE_ORGS}
+        tombstone: Dict[str, Any] = {"deleting": True}
+        if pending_job:
+            tombstone["pending_job"] = pending_job
+        async with causal_session(self.master_collection.database.client) as session:
+            with span("mongo.find_one_and_update"):
+                org = await self.master_collection.find_one_and_update(
+                    query,
+                    {"$set": tombstone},
+                    projection=METADATA_PROJECTION,
+                    return_document=ReturnDocument.AFTER,
+                    session=session,
+                )
+            self.cache.invalidate(organization_name)
+            if org is None:
+                await self._raise_missing_or_forbidden(organization_name, session)
         logger.info("Deleted organization {}", organization_name)
+        if drop_data:
+            await self.purge_organization(org)
+        return org
 
+    async def purge_organization(self, org: Dict, on_progress: Optional[ProgressCallback] = None) -> None:
+        """Drop a deleted org's data once its writers are done, then remove its tombstone. Safe to repeat."""
+        await self.wait_for_writers(org, on_progress)
+        await self.drop_tenant(org)
+        with span("mongo.delete_one"):
+            await self.master_collection.delete_one({"_id": org["_id"], "deleting": True})
 
+    async def drop_tenant(self, org: Dict) -> None:
+        strategy = self.strategy_for(org)
+        with span("tenancy.drop", mode=strategy.mode):
+            await strategy.drop(self.tenant_db(org), org)
+        logger.info("Dropped data for organization {}", org["organization_name"])
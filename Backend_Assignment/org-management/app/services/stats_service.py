@@ -0,0 +1,248 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+from pymongo.errors import OperationFailure, PyMongoError
+
+from ..config import get_settings
+from ..tenancy import COLLECTION_MODE
+from ..tracing import span
+from .migration_service import NAMESPACE_NOT_FOUND
+from .org_service import LIVE_ORGS, STORAGE_FIELDS, OrgService
+
+
+def _size(stats: Dict[str, Any]) -> Tuple[int, int]:
+    # Counting fallbacks have no data size, so document counts break the tie.
+    return stats["data_size"] or 0, stats["documents"]
+
+
+def _empty(source: str) -> Dict[str, Any]:
+    return {"documents": 0, "data_size": 0, "storage_size": 0, "index_size": 0, "source": source}
+
+
+class TenantStatsService:
+    """Per-tenant storage statistics, cached so dashboards don't turn every poll into stats commands.
+
+    Entries are served for ``STATS_CACHE_TTL_SECONDS``; a stale entry is still served while one
+    background refresh replaces it, and concurrent misses for the same org share one fetch. The
+    all-tenant summary is rebuilt at most once per TTL, fetching at most ``STATS_CONCURRENCY``
+    tenants at a time, and a background loop keeps it warm every ``STATS_REFRESH_INTERVAL_SECONDS``.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[Any, Tuple[float, Dict[str, Any]]] = {}
+        self._inflight: Dict[Any, asyncio.Future] = {}
+        self._summary: Optional[Tuple[float, Dict[str, Any]]] = None
+        self._summary_task: Optional[asyncio.Future] = None
+        self._summary_requested = False
+        self._refresher: Optional[asyncio.Task] = None
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._inflight.clear()
+        self._summary = None
+        self._summary_task = None
+        self._summary_requested = False
+
+    async def collect(self, service: OrgService, org: Dict) -> Dict[str, Any]:
+        """Fetch an org's stats from the server: ``$collStats`` where the org owns its collection,
+        otherwise an aggregation over its documents, falling back to a plain count."""
+        collection, tenant_filter = service.tenant_scope(org)
+        stats = None
+        with span("mongo.stats", collection=collection.name):
+            if service.strategy_for(org).mode == COLLECTION_MODE:
+                stats = await self._coll_stats(collection)
+            if stats is None:
+                stats = await self._aggregate_stats(collection, tenant_filter)
+        return {
+            "organization_name": org["organization_name"],
+            "collection_name": org["collection_name"],
+            **stats,
+            "computed_at": datetime.now(timezone.utc),
+        }
+
+    @staticmethod
+    async def _coll_stats(collection) -> Optional[Dict[str, Any]]:
+        try:
+            result = await collection.aggregate([{"$collStats": {"storageStats": {}}}]).to_list(None)
+        except OperationFailure as exc:
+            if exc.code == NAMESPACE_NOT_FOUND:
+                # Tenant collections are created by their first write; no collection means no data.
+                return _empty("collStats")
+            return None
+        except NotImplementedError:
+            return None
+        if not result:
+            return _empty("collStats")
+        storage = result[0].get("storageStats", {})
+        return {
+            "documents": storage.get("count", 0),
+            "data_size": storage.get("size", 0),
+            "storage_size": storage.get("storageSize", 0),
+            "index_size": storage.get("totalIndexSize", 0),
+            "source": "collStats",
+        }
+
+    @staticmethod
+    async def _aggregate_stats(collection, tenant_filter: Dict[str, Any]) -> Dict[str, Any]:
+        # Documents in a shared collection have no storage of their own to report, only their BSON size.
+        pipeline = [
+            {"$match": tenant_filter},
+            {"$group": {"_id": None, "documents": {"$sum": 1}, "data_size": {"$sum": {"$bsonSize": "$$ROOT"}}}},
+        ]
+        try:
+            result = await collection.aggregate(pipeline).to_list(None)
+        except (OperationFailure, NotImplementedError):
+            documents = await collection.count_documents(tenant_filter)
+            return {
+                "documents": documents,
+                "data_size": None,
+                "storage_size": None,
+                "index_size": None,
+                "source": "count",
+            }
+        totals = result[0] if result else {"documents": 0, "data_size": 0}
+        return {
+            "documents": totals["documents"],
+            "data_size": totals["data_size"],
+            "storage_size": None,
+            "index_size": None,
+            "source": "aggregate",
+        }
+
+    async def get(self, service: OrgService, org: Dict, wait_for_refresh: bool = False) -> Dict[str, Any]:
+        """Cached stats for the org; a stale entry is returned at once and refreshed in the background,
+        unless ``wait_for_refresh`` is set."""
+        settings = get_settings()
+        entry = self._entries.get(org["_id"])
+        if entry is not None:
+            fetched_at, stats = entry
+            if time.monotonic() - fetched_at < settings.stats_cache_ttl_seconds:
+                return stats
+            if not wait_for_refresh:
+                self._fetch(service, org)
+                return stats
+        # Shielded: a caller that disconnects must not cancel a fetch other callers share.
+        return await asyncio.shield(self._fetch(service, org))
+
+    def _fetch(self, service: OrgService, org: Dict) -> asyncio.Future:
+        key = org["_id"]
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return inflight
+
+        async def fetch() -> Dict[str, Any]:
+            try:
+                stats = await self.collect(service, org)
+                self._entries[key] = (time.monotonic(), stats)
+                return stats
+            finally:
+                self._inflight.pop(key, None)
+
+        future = asyncio.ensure_future(fetch())
+        # Background refreshes nobody awaits must not log "exception was never retrieved".
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._inflight[key] = future
+        return future
+
+    async def summary(self, service: OrgService) -> Dict[str, Any]:
+        """Totals over every organization, from a snapshot rebuilt at most once per TTL."""
+        settings = get_settings()
+        if self._summary is not None:
+            # Served from the snapshot, so the refresh loop should keep it warm.
+            self._summary_requested = True
+            fetched_at, summary = self._summary
+            if time.monotonic() - fetched_at >= settings.stats_cache_ttl_seconds:
+                self._rebuild_summary(service)
+            return summary
+        return await asyncio.shield(self._rebuild_summary(service))
+
+    def _rebuild_summary(self, service: OrgService) -> asyncio.Future:
+        if self._summary_task is None or self._summary_task.done():
+            self._summary_task = asyncio.ensure_future(self._build_summary(service))
+            self._summary_task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return self._summary_task
+
+    async def _build_summary(self, service: OrgService) -> Dict[str, Any]:
+        settings = get_settings()
+        semaphore = asyncio.Semaphore(settings.stats_concurrency)
+        totals = {"documents": 0, "data_size": 0, "storage_size": 0, "index_size": 0}
+        largest: List[Dict[str, Any]] = []
+        organizations = failed = 0
+        seen = set()
+        pending: set = set()
+        started = time.perf_counter()
+
+        async def one(org: Dict) -> None:
+            nonlocal failed
+            try:
+                # Waiting keeps every fetch of the rebuild under the semaphore.
+                stats = await self.get(service, org, wait_for_refresh=True)
+            except PyMongoError as exc:
+                failed += 1
+                logger.warning("Stats for organization {} failed: {}", org["organization_name"], exc)
+                return
+            finally:
+                semaphore.release()
+            for field in totals:
+                totals[field] += stats[field] or 0
+            largest.append(stats)
+
+        projection = {field: 1 for field in STORAGE_FIELDS}
+        async for org in service.read_collection.find(LIVE_ORGS, projection, batch_size=settings.list_batch_size):
+            # Acquiring before creating the task bounds both concurrency and the orgs held in memory.
+            await semaphore.acquire()
+            organizations += 1
+            seen.add(org["_id"])
+            task = asyncio.ensure_future(one(org))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            if len(largest) > 4 * settings.stats_summary_top:
+                largest.sort(key=_size, reverse=True)
+                del largest[settings.stats_summary_top :]
+        if pending:
+            await asyncio.gather(*pending)
+        largest.sort(key=_size, reverse=True)
+        summary = {
+            "organizations": organizations,
+            "failed": failed,
+            **totals,
+            "largest": largest[: settings.stats_summary_top],
+            "computed_at": datetime.now(timezone.utc),
+        }
+        self._summary = (time.monotonic(), summary)
+        for key in set(self._entries) - seen:
+            # Deleted organizations.
+            del self._entries[key]
+        logger.info("Rebuilt stats for {} organizations in {:.1f}s", organizations, time.perf_counter() - started)
+        return summary
+
+    async def _refresh_loop(self, service: OrgService) -> None:
+        # Only workers whose summary was asked for since the last pass keep it warm; the rest stay idle.
+        interval = get_settings().stats_refresh_interval_seconds
+        while True:
+            await asyncio.sleep(interval)
+            if not self._summary_requested:
+                continue
+            self._summary_requested = False
+            try:
+                await self._rebuild_summary(service)
+            except PyMongoError as exc:
+                logger.warning("Refreshing tenant stats failed: {}", exc)
+
+    def start(self, service: OrgService) -> None:
+        if get_settings().stats_refresh_interval_seconds > 0:
+            self._refresher = asyncio.create_task(self._refresh_loop(service))
+
+    async def stop(self) -> None:
+        for task in (self._refresher, self._summary_task):
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*(task for task in (self._refresher, self._summary_task) if task), return_exceptions=True)
+        self._refresher = None
+        self._summary_task = None
+
+
+tenant_stats = TenantStatsService()
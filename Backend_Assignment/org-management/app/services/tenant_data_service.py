@@ -0,0 +1,321 @@
+import asyncio
+import base64
+import binascii
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from bson import json_util
+from bson.errors import InvalidBSON
+from bson.json_util import CANONICAL_JSON_OPTIONS
+from loguru import logger
+from pymongo import DeleteOne, InsertOne, ReplaceOne
+from pymongo.errors import BulkWriteError
+
+from ..config import get_settings
+from ..streams import DocumentDecoder, encode_stream
+from ..tracing import span
+from .org_service import LIVE_ORGS, OrgService, TenantMovingError
+
+# Operators that run server-side JavaScript; tenant filters must stay declarative.
+FORBIDDEN_OPERATORS = {"$where", "$function", "$accumulator"}
+
+
+class TenantWritesOverloadedError(RuntimeError):
+    pass
+
+
+class BulkWriteLimiter:
+    """Caps concurrent ``bulk_write`` calls per process and refuses requests once too many are waiting.
+
+    Refusing at admission, before any batch is written, lets clients back off and retry whole
+    requests instead of piling more work onto a saturated primary.
+    """
+
+    def __init__(self) -> None:
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(get_settings().tenant_bulk_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    @asynccontextmanager
+    async def request(self) -> AsyncIterator[None]:
+        settings = get_settings()
+        self._get_semaphore()
+        if self._pending >= settings.tenant_bulk_concurrency + settings.tenant_bulk_queue_size:
+            raise TenantWritesOverloadedError("Bulk write queue is full")
+        self._pending += 1
+        try:
+            yield
+        finally:
+            self._pending -= 1
+
+    @asynccontextmanager
+    async def batch(self) -> AsyncIterator[None]:
+        async with self._get_semaphore():
+            yield
+
+
+bulk_write_limiter = BulkWriteLimiter()
+
+
+def encode_cursor(last_id: Any) -> str:
+    # Canonical extended JSON keeps the _id's BSON type (ObjectId, int, string...) across the round trip.
+    encoded = json_util.dumps({"_id": last_id}, json_options=CANONICAL_JSON_OPTIONS)
+    return base64.urlsafe_b64encode(encoded.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Any:
+    try:
+        return json_util.loads(base64.urlsafe_b64decode(cursor.encode()))["_id"]
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError, InvalidBSON):
+        raise ValueError("Invalid cursor")
+
+
+def check_filter(value: Any) -> None:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key in FORBIDDEN_OPERATORS:
+                raise ValueError(f"Operator {key} is not allowed")
+            check_filter(item)
+    elif isinstance(value, list):
+        for item in value:
+            check_filter(item)
+
+
+def check_id(value: Any) -> None:
+    # An _id like {"$ne": null} would turn a single-document write into a query.
+    if isinstance(value, dict) and any(key.startswith("$") for key in value):
+        raise ValueError("_id may not contain operators")
+
+
+def _operation_error(index: int, detail: str, code: Optional[int] = None) -> Dict[str, Any]:
+    return {"index": index, "code": code, "detail": detail}
+
+
+class TenantDataService:
+    """Reads and writes an organization's own documents, always confined by its tenancy filter."""
+
+    def __init__(self, org_service: OrgService, limiter: Optional[BulkWriteLimiter] = None) -> None:
+        self.org_service = org_service
+        self.limiter = limiter or bulk_write_limiter
+
+    async def resolve(self, organization_name: str, admin_email: str, for_write: bool = False) -> Dict:
+        """The token's organization, provided its admin still matches.
+
+        Writes read the metadata from the primary, never the cache, so a rename or shard move
+        that just started is seen and the write doesn't land in storage about to be dropped.
+        """
+        if for_write:
+            with span("mongo.find_one", query="organization_name"):
+                org = await self.org_service.master_collection.find_one(
+                    {"organization_name": organization_name, **LIVE_ORGS}
+                )
+        else:
+            org = await self.org_service.get_organization(organization_name)
+        if org is None:
+            raise LookupError("Organization not found")
+        if org["admin"]["email"] != admin_email:
+            raise PermissionError("Unauthorized")
+        if for_write and self.org_service.storage_moving(org):
+            raise TenantMovingError("Organization data is being moved, retry later")
+        return org
+
+    async def query(
+        self,
+        org: Dict,
+        query_filter: Optional[Dict[str, Any]] = None,
+        fields: Optional[List[str]] = None,
+        limit: int = 100,
+        after: Any = None,
+    ) -> List[Dict]:
+        """One keyset page ordered by ``_id``; pass the last ``_id`` seen as ``after``."""
+        check_filter(query_filter)
+        collection, tenant_filter = self.org_service.tenant_scope(org)
+        parts = [part for part in (tenant_filter, query_filter) if part]
+        if after is not None:
+            parts.append({"_id": {"$gt": after}})
+        query = parts[0] if len(parts) == 1 else ({"$and": parts} if parts else {})
+        cursor = collection.find(
+            query, self._projection(tenant_filter, fields), sort=[("_id", 1)], limit=limit, batch_size=limit
+        )
+        with span("mongo.find", collection=collection.name, limit=limit):
+            return await cursor.to_list(length=limit)
+
+    @staticmethod
+    def _projection(tenant_filter: Dict[str, Any], fields: Optional[List[str]]) -> Optional[Dict[str, int]]:
+        # _id is always returned since it is the pagination key; tenancy fields never are.
+        if fields:
+            if any(field.startswith("$") for field in fields):
+                raise ValueError("Invalid projection field")
+            selected = {field: 1 for field in fields if field not in tenant_filter}
+            if selected:
+                return {**selected, "_id": 1}
+        return {field: 0 for field in tenant_filter} or None
+
+    @staticmethod
+    def _build(raw: Any, tenant_filter: Dict[str, Any]):
+        if not isinstance(raw, dict) or raw.get("op") not in ("upsert", "delete"):
+            raise ValueError('Expected {"op": "upsert", "document": {...}} or {"op": "delete", "_id": ...}')
+        if raw["op"] == "delete":
+            if "_id" not in raw:
+                raise ValueError("Delete requires _id")
+            check_id(raw["_id"])
+            return DeleteOne({"_id": raw["_id"], **tenant_filter})
+        document = raw.get("document")
+        if not isinstance(document, dict):
+            raise ValueError("Upsert requires a document object")
+        if any(key.startswith("$") for key in document):
+            raise ValueError("Document keys may not start with $")
+        document = {**document, **tenant_filter}
+        if "_id" not in document:
+            return InsertOne(document)
+        check_id(document["_id"])
+        return ReplaceOne({"_id": document["_id"], **tenant_filter}, document, upsert=True)
+
+    async def bulk_write(self, org: Dict, operations: List[Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Apply upserts and deletes as unordered ``bulk_write`` calls of ``TENANT_BULK_BATCH_SIZE``.
+
+        Yields one result per batch with its counts and per-operation errors, indexed by the
+        operation's position in ``operations``. Invalid operations are reported, not sent.
+        Batches are written under a write lease (see ``OrgService.write_lease``), so a data move
+        that starts meanwhile waits for the request to finish.
+        """
+        collection, tenant_filter = self.org_service.tenant_scope(org)
+        batch_size = get_settings().tenant_bulk_batch_size
+        async with self.limiter.request(), self.org_service.write_lease(org) as renew_lease:
+            for number, start in enumerate(range(0, len(operations), batch_size)):
+                requests: List[Tuple[int, Any]] = []
+                errors = []
+                for index, raw in enumerate(operations[start : start + batch_size], start):
+                    try:
+                        requests.append((index, self._build(raw, tenant_filter)))
+                    except (ValueError, TypeError) as exc:
+                        errors.append(_operation_error(index, str(exc)))
+                result = {"batch": number, "start": start, "size": min(batch_size, len(operations) - start)}
+                await renew_lease()
+                result.update(await self._write_batch(collection, requests, errors))
+                yield result
+        logger.info("Bulk wrote {} operations for organization {}", len(operations), org["organization_name"])
+
+    async def _write_batch(self, collection, requests: List[Tuple[int, Any]], errors: List[Dict]) -> Dict[str, Any]:
+        counts = {"inserted": 0, "upserted": 0, "matched": 0, "modified": 0, "deleted": 0}
+        if requests:
+            async with self.limiter.batch():
+                try:
+                    with span("mongo.bulk_write", collection=collection.name, size=len(requests)):
+                        written = await collection.bulk_write([op for _, op in requests], ordered=False)
+                    outcome = written.bulk_api_result
+                except BulkWriteError as exc:
+                    outcome = exc.details
+                    for error in outcome.get("writeErrors", []):
+                        errors.append(_operation_error(requests[error["index"]][0], error["errmsg"], error.get("code")))
+            counts = {
+                "inserted": outcome.get("nInserted", 0),
+                "upserted": outcome.get("nUpserted", 0),
+                "matched": outcome.get("nMatched", 0),
+                "modified": outcome.get("nModified", 0),
+                "deleted": outcome.get("nRemoved", 0),
+            }
+        return {**counts, "errors": sorted(errors, key=lambda error: error["index"])}
+
+    async def _export_cursor(self, org: Dict) -> AsyncIterator[Dict]:
+        collection, tenant_filter = self.org_service.tenant_scope(org)
+        # No sort: natural order streams straight off the collection without an index walk.
+        cursor = collection.find(
+            tenant_filter,
+            {field: 0 for field in tenant_filter} or None,
+            batch_size=get_settings().export_batch_size,
+        )
+        async for document in cursor:
+            yield document
+
+    def export_documents(self, org: Dict, fmt: str, compress: bool = False) -> AsyncIterator[bytes]:
+        """Stream every document of the org as NDJSON or concatenated BSON, optionally gzipped."""
+        settings = get_settings()
+        return encode_stream(
+            self._export_cursor(org),
+            fmt,
+            settings.export_chunk_bytes,
+            gzip_level=settings.export_gzip_level if compress else None,
+        )
+
+    async def import_documents(self, org: Dict, chunks: AsyncIterator[bytes], fmt: str) -> Dict[str, Any]:
+        """Insert documents from an export stream with unordered ``insert_many`` batches.
+
+        The stream is decoded as it arrives and the next batch is read while the previous one
+        is written, so at most two batches are in memory. Documents whose ``_id`` already exists
+        are counted as duplicates and left unchanged, so a failed import can simply be repeated.
+        Like ``bulk_write``, the import holds a write lease throughout.
+        """
+        collection, tenant_filter = self.org_service.tenant_scope(org)
+        settings = get_settings()
+        decoder = DocumentDecoder(fmt)
+        stats: Dict[str, Any] = {"documents": 0, "inserted": 0, "duplicates": 0, "errors": []}
+        pending: Optional[asyncio.Task] = None
+        batch: List[Dict] = []
+
+        async def flush(documents: List[Dict]) -> None:
+            async with self.limiter.batch():
+                try:
+                    with span("mongo.insert_many", collection=collection.name, size=len(documents)):
+                        result = await collection.insert_many(documents, ordered=False)
+                    stats["inserted"] += len(result.inserted_ids)
+                except BulkWriteError as exc:
+                    stats["inserted"] += exc.details.get("nInserted", 0)
+                    for error in exc.details.get("writeErrors", []):
+                        if error.get("code") == 11000:
+                            stats["duplicates"] += 1
+                        elif len(stats["errors"]) < 10:
+                            stats["errors"].append({"code": error.get("code"), "detail": error["errmsg"]})
+
+        async def submit(documents: List[Dict]) -> None:
+            nonlocal pending
+            if pending is not None:
+                await pending
+            await renew_lease()
+            pending = asyncio.ensure_future(flush(documents))
+
+        def add(documents: Iterator[Dict]) -> List[List[Dict]]:
+            nonlocal batch
+            full = []
+            for document in documents:
+                if not isinstance(document, dict):
+                    raise ValueError("Every record must be a document")
+                batch.append({**document, **tenant_filter})
+                stats["documents"] += 1
+                if len(batch) >= settings.import_batch_size:
+                    full.append(batch)
+                    batch = []
+            return full
+
+        async with self.limiter.request(), self.org_service.write_lease(org) as renew_lease:
+            try:
+                async for chunk in chunks:
+                    for documents in add(decoder.feed(chunk)):
+                        await submit(documents)
+                for documents in add(decoder.close()):
+                    await submit(documents)
+                if batch:
+                    await submit(batch)
+                if pending is not None:
+                    await pending
+            finally:
+                if pending is not None and not pending.done():
+                    pending.cancel()
+        logger.info(
+            "Imported {} documents ({} duplicates) into organization {}",
+            stats["inserted"],
+            stats["duplicates"],
+            org["organization_name"],
+        )
+        return stats
@@ -0,0 +1,151 @@
+import zlib
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import bson
+from bson import json_util
+from bson.errors import BSONError
+from bson.json_util import CANONICAL_JSON_OPTIONS
+
+NDJSON = "ndjson"
+BSON = "bson"
+FORMATS = (NDJSON, BSON)
+MEDIA_TYPES = {NDJSON: "application/x-ndjson", BSON: "application/bson"}
+GZIP_MAGIC = b"\x1f\x8b"
+# Mongo's document limit plus headroom for the length prefix; anything larger is a corrupt stream.
+MAX_DOCUMENT_BYTES = 16 * 1024 * 1024 + 16 * 1024
+# Extended JSON spells types out (``{"$numberInt": "1"}``), so a line can be several times its BSON size.
+MAX_LINE_BYTES = 4 * MAX_DOCUMENT_BYTES
+
+
+def encode_document(document: Dict[str, Any], fmt: str) -> bytes:
+    if fmt == BSON:
+        return bson.encode(document)
+    # Canonical extended JSON keeps every BSON type (ObjectId, dates, int64, decimal) through a re-import.
+    return json_util.dumps(document, json_options=CANONICAL_JSON_OPTIONS).encode() + b"\n"
+
+
+async def encode_stream(
+    documents: AsyncIterator[Dict[str, Any]], fmt: str, chunk_bytes: int, gzip_level: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    """Serialize documents into chunks of about ``chunk_bytes``, gzip-compressed when ``gzip_level`` is set.
+
+    Only one chunk is held at a time, so memory stays flat however large the export.
+    """
+    compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31) if gzip_level is not None else None
+    buffer: List[bytes] = []
+    size = 0
+    async for document in documents:
+        encoded = encode_document(document, fmt)
+        buffer.append(encoded)
+        size += len(encoded)
+        if size >= chunk_bytes:
+            chunk = b"".join(buffer)
+            buffer, size = [], 0
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+    chunk = b"".join(buffer)
+    if compressor is not None:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+
+class DocumentDecoder:
+    """Incrementally splits a (possibly gzip-compressed) NDJSON or BSON byte stream into documents.
+
+    Feed it chunks as they arrive; it keeps only the bytes of the document still incomplete.
+    Gzip is detected from the stream's magic bytes and inflated in bounded steps, so memory stays
+    flat however well a chunk compresses. Malformed input raises ``ValueError``.
+    """
+
+    def __init__(self, fmt: str) -> None:
+        self.fmt = fmt
+        self._decompressor: Optional[Any] = None
+        self._sniffed = False
+        self._pending = b""
+        self.line = 0
+
+    def feed(self, chunk: bytes) -> Iterator[Dict[str, Any]]:
+        if not self._sniffed:
+            if len(self._pending) + len(chunk) < 2:
+                self._pending += chunk
+                return
+            chunk, self._pending = self._pending + chunk, b""
+            self._sniffed = True
+            if chunk.startswith(GZIP_MAGIC):
+                self._decompressor = zlib.decompressobj(31)
+        if self._decompressor is not None:
+            yield from self._inflate(chunk)
+        else:
+            yield from self._split(self._pending + chunk)
+
+    def _inflate(self, chunk: bytes) -> Iterator[Dict[str, Any]]:
+        while True:
+            try:
+                data = self._decompressor.decompress(chunk, MAX_DOCUMENT_BYTES)
+            except zlib.error as exc:
+                raise ValueError("Invalid gzip stream") from exc
+            chunk = self._decompressor.unconsumed_tail
+            yield from self._split(self._pending + data)
+            # A full step may leave output buffered in zlib even once the input is consumed.
+            if not chunk and len(data) < MAX_DOCUMENT_BYTES:
+                return
+
+    def close(self) -> Iterator[Dict[str, Any]]:
+        if not self._sniffed:
+            self._sniffed = True
+            data, self._pending = self._pending, b""
+            if data:
+                yield from self._split(data)
+        elif self._decompressor is not None:
+            if not self._decompressor.eof:
+                raise ValueError("Truncated gzip stream")
+            yield from self._split(self._pending)
+        else:
+            yield from self._split(self._pending)
+        if self.fmt == NDJSON and self._pending.strip():
+            # A final line without a newline is still a complete document.
+            data, self._pending = self._pending, b""
+            yield from self._split(data + b"\n")
+        if self._pending:
+            raise ValueError("Stream ends in the middle of a document")
+
+    def _split(self, data: bytes) -> Iterator[Dict[str, Any]]:
+        position = 0
+        if self.fmt == BSON:
+            while len(data) - position >= 4:
+                length = int.from_bytes(data[position : position + 4], "little")
+                if length < 5 or length > MAX_DOCUMENT_BYTES:
+                    raise ValueError(f"Invalid BSON document length {length}")
+                if len(data) - position < length:
+                    break
+                try:
+                    document = bson.decode(data[position : position + length])
+                except BSONError as exc:
+                    raise ValueError(f"Invalid BSON document: {exc}") from exc
+                position += length
+                yield document
+        else:
+            while True:
+                end = data.find(b"\n", position)
+                if end < 0:
+                    if len(data) - position > MAX_LINE_BYTES:
+                        raise ValueError(f"Line {self.line + 1} is too long")
+                    break
+                self.line += 1
+                if end - position > MAX_LINE_BYTES:
+                    raise ValueError(f"Line {self.line} is too long")
+                line = data[position:end].strip()
+                position = end + 1
+                if not line:
+                    continue
+                try:
+                    document = json_util.loads(line)
+                except (ValueError, LookupError, TypeError, BSONError) as exc:
+                    raise ValueError(f"Invalid JSON on line {self.line}") from exc
+                if not isinstance(document, dict):
+                    raise ValueError(f"Line {self.line} is not a JSON object")
+                yield document
+        self._pending = data[position:]
@@ -0,0 +1,139 @@
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+from loguru import logger
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import ASCENDING, IndexModel
+
+from .config import get_settings
+from .services.migration_service import CollectionMigrator, ProgressCallback
+from .utils import safe_collection_name
+
+COLLECTION_MODE = "collection"
+SHARED_MODE = "shared"
+
+
+class TenancyStrategy(ABC):
+    """Decides where an organization's documents live and how they move or disappear."""
+
+    mode: str
+
+    @abstractmethod
+    def metadata_for(self, organization_name: str) -> Dict[str, Any]:
+        """Storage fields recorded on the master document when an organization is created."""
+
+    def claims_for(self, organization_name: str) -> Dict[str, Any]:
+        """Fields reserving storage only this org may use; a unique index rejects another org's equal claim."""
+        return {}
+
+    def collection(self, database: AsyncIOMotorDatabase, org: Dict) -> AsyncIOMotorCollection:
+        return database[org["collection_name"]]
+
+    def tenant_filter(self, org: Dict) -> Dict[str, Any]:
+        return {}
+
+    async def ensure_indexes(self, database: AsyncIOMotorDatabase) -> None:
+        pass
+
+    async def provision(self, database: AsyncIOMotorDatabase, org: Dict) -> None:
+        """Prepare storage for a new organization; collections are otherwise created by their first write."""
+
+    @abstractmethod
+    async def rename(
+        self,
+        database: AsyncIOMotorDatabase,
+        org: Dict,
+        new_organization_name: str,
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> Dict[str, Any]:
+        """Move the tenant's data and return the storage fields to update on the master document."""
+
+    @abstractmethod
+    async def drop(self, database: AsyncIOMotorDatabase, org: Dict) -> None:
+        """Remove the tenant's data."""
+
+
+class CollectionPerTenantStrategy(TenancyStrategy):
+    mode = COLLECTION_MODE
+
+    def __init__(self, migrator: CollectionMigrator) -> None:
+        self.migrator = migrator
+
+    def metadata_for(self, organization_name: str) -> Dict[str, Any]:
+        return {
+            "collection_name": safe_collection_name(organization_name),
+            "tenancy": self.mode,
+            **self.claims_for(organization_name),
+        }
+
+    def claims_for(self, organization_name: str) -> Dict[str, Any]:
+        # Held from creation, and taken over by a rename before any data moves into the new collection.
+        return {"collection_claim": safe_collection_name(organization_name)}
+
+    async def rename(
+        self,
+        database: AsyncIOMotorDatabase,
+        org: Dict,
+        new_organization_name: str,
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> Dict[str, Any]:
+        new_collection_name = safe_collection_name(new_organization_name)
+        if new_collection_name != org["collection_name"]:
+            await self.migrator.migrate(
+                database[org["collection_name"]], database[new_collection_name], on_progress=on_progress
+            )
+        return {"collection_name": new_collection_name}
+
+    async def drop(self, database: AsyncIOMotorDatabase, org: Dict) -> None:
+        await database[org["collection_name"]].drop()
+
+
+class SharedCollectionStrategy(TenancyStrategy):
+    """All tenants share one collection; documents carry ``tenant_id`` and are indexed on (tenant_id, _id)."""
+
+    mode = SHARED_MODE
+
+    def __init__(self, collection_name: str) -> None:
+        self.collection_name = collection_name
+
+    def metadata_for(self, organization_name: str) -> Dict[str, Any]:
+        return {"collection_name": self.collection_name, "tenancy": self.mode, "tenant_id": uuid.uuid4().hex}
+
+    def tenant_filter(self, org: Dict) -> Dict[str, Any]:
+        return {"tenant_id": org["tenant_id"]}
+
+    async def ensure_indexes(self, database: AsyncIOMotorDatabase) -> None:
+        await database[self.collection_name].create_indexes(
+            [IndexModel([("tenant_id", ASCENDING), ("_id", ASCENDING)], name="tenant_id_id")]
+        )
+
+    async def rename(
+        self,
+        database: AsyncIOMotorDatabase,
+        org: Dict,
+        new_organization_name: str,
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> Dict[str, Any]:
+        # Documents are keyed by the immutable tenant_id, so a rename only touches metadata.
+        return {}
+
+    async def drop(self, database: AsyncIOMotorDatabase, org: Dict) -> None:
+        result = await database[org["collection_name"]].delete_many(self.tenant_filter(org))
+        logger.info("Deleted {} shared documents for tenant {}", result.deleted_count, org["tenant_id"])
+
+
+class TenancyStrategies:
+    """The configured strategy for new organizations, plus lookup of the one an existing org was created with."""
+
+    def __init__(self, migrator: CollectionMigrator, mode: Optional[str] = None) -> None:
+        settings = get_settings()
+        self.strategies: Dict[str, TenancyStrategy] = {
+            COLLECTION_MODE: CollectionPerTenantStrategy(migrator),
+            SHARED_MODE: SharedCollectionStrategy(settings.tenant_shared_collection),
+        }
+        self.default = self.strategies[mode or settings.tenancy_mode]
+
+    def for_org(self, org: Dict) -> TenancyStrategy:
+        # Organizations created before tenancy modes existed have no marker and own a collection.
+        return self.strategies[org.get("tenancy", COLLECTION_MODE)]
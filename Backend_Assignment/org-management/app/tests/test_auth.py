@@ -8,6 +8,8 @@ from app.main import app
 from app.config import get_settings
 from app import config
 from app import db
+from app.cache import org_cache, token_cache
+from app.ratelimit import MemoryRateLimitStore, login_throttle
 from app.utils import get_password_hash
 
 
@@ -23,9 +25,13 @@ def setup_env():
 
 
 @pytest.fixture(autouse=True)
-def mock_db():
+def mock_db(event_loop):
     client = AsyncMongoMockClient()
     db.db._client = client  # type: ignore
+    event_loop.run_until_complete(db.ensure_master_indexes())
+    org_cache.clear()
+    token_cache.clear()
+    login_throttle._store = MemoryRateLimitStore(1000)
     return client
 
 
@@ -63,3 +69,123 @@ async def test_admin_login_success_and_token(client):
     assert decoded["organization_name"] == "Acme"
 
 
+@pytest.mark.asyncio
+async def test_logout_revokes_cached_token(client):
+    await client.post(
+        "/org/create",
+        json={"organization_name": "Acme", "email": "admin@acme.com", "password": "password123"},
+    )
+    login = await client.post("/admin/login", json={"email": "admin@acme.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    res = await client.put("/org/update", headers=headers, json={"organization_name": "Acme", "email": "new@acme.com"})
+    assert res.status_code == 200
+    assert token_cache.stats()["size"] == 1
+
+    assert (await client.post("/admin/logout", headers=headers)).status_code == 200
+    res = await client.put("/org/update", headers=headers, json={"organization_name": "Acme"})
+    assert res.status_code == 401
+
+    # Another worker, or this one after its bounded revocation set forgot the token, still refuses it.
+    token_cache.clear()
+    res = await client.put("/org/update", headers=headers, json={"organization_name": "Acme"})
+    assert res.status_code == 401
+
+
+async def login_pair(client):
+    await client.post(
+        "/org/create",
+        json={"organization_name": "Acme", "email": "admin@acme.com", "password": "password123"},
+    )
+    res = await client.post("/admin/login", json={"email": "admin@acme.com", "password": "password123"})
+    assert res.json()["expires_in"] == 60 * 60
+    return res.json()
+
+
+@pytest.mark.asyncio
+async def test_refresh_rotates_without_password_check(client, monkeypatch):
+    tokens = await login_pair(client)
+
+    async def no_hashing(*args):
+        raise AssertionError("refresh must not verify a password")
+
+    monkeypatch.setattr("app.services.auth_service.verify_password", no_hashing)
+    res = await client.post("/admin/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert res.status_code == 200
+    rotated = res.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    headers = {"Authorization": f"Bearer {rotated['access_token']}"}
+    assert (await client.put("/org/update", headers=headers, json={"organization_name": "Acme"})).status_code == 200
+
+    stored = await db.db.get_master_db()["refresh_tokens"].find_one({"_id": {"$exists": True}})
+    assert tokens["refresh_token"] not in str(stored)
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_reuse_revokes_the_family(client):
+    tokens = await login_pair(client)
+    rotated = (await client.post("/admin/refresh", json={"refresh_token": tokens["refresh_token"]})).json()
+
+    res = await client.post("/admin/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert res.status_code == 401
+    res = await client.post("/admin/refresh", json={"refresh_token": rotated["refresh_token"]})
+    assert res.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_credential_change_revokes_refresh_tokens(client):
+    tokens = await login_pair(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    res = await client.put(
+        "/org/update", headers=headers, json={"organization_name": "Acme", "password": "newpass123"}
+    )
+    assert res.status_code == 200
+    res = await client.post("/admin/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert res.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_login_throttled_before_any_lookup(client, monkeypatch):
+    async def no_lookup(*args):
+        raise AssertionError("throttled logins must not reach the service")
+
+    for _ in range(get_settings().login_email_burst):
+        res = await client.post("/admin/login", json={"email": "nobody@acme.com", "password": "password123"})
+        assert res.status_code == 401
+    monkeypatch.setattr("app.services.auth_service.AuthService.authenticate_admin", no_lookup)
+    res = await client.post("/admin/login", json={"email": "NOBODY@acme.com", "password": "password123"})
+    assert res.status_code == 429
+    assert int(res.headers["retry-after"]) >= 1
+
+
+@pytest.mark.asyncio
+async def test_unknown_email_still_runs_bcrypt(client, monkeypatch):
+    verified = []
+
+    async def recording_verify(password, hashed):
+        verified.append(hashed)
+        return False
+
+    monkeypatch.setattr("app.services.auth_service.verify_password", recording_verify)
+    res = await client.post("/admin/login", json={"email": "ghost@acme.com", "password": "password123"})
+    assert res.status_code == 401
+    assert len(verified) == 1 and verified[0].startswith("$2b$")
+
+
+@pytest.mark.asyncio
+async def test_per_ip_throttle_is_opt_in(client, monkeypatch):
+    for n in range(3):
+        res = await client.post("/admin/login", json={"email": f"user{n}@acme.com", "password": "password123"})
+        assert res.status_code == 401
+
+    monkeypatch.setenv("LOGIN_IP_BURST", "2")
+    config.get_settings.cache_clear()
+    try:
+        statuses = []
+        for n in range(3):
+            res = await client.post("/admin/login", json={"email": f"other{n}@acme.com", "password": "password123"})
+            statuses.append(res.status_code)
+        assert statuses == [401, 401, 429]
+    finally:
+        monkeypatch.delenv("LOGIN_IP_BURST")
+        config.get_settings.cache_clear()
@@ -0,0 +1,57 @@
+import time
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from app.cache import OrgCache, TokenCache, TTLCache
+from app.services.org_service import OrgService
+
+
+def test_ttl_cache_evicts_lru_and_expired_entries():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    cache.set("d", 4, expires_at=time.time() - 1)
+    assert cache.get("d") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_org_service_caches_reads_and_invalidates_on_write():
+    master_db = AsyncMongoMockClient()["test_master"]
+    cache = OrgCache(maxsize=10, ttl=60)
+    service = OrgService(master_db["organizations"], master_db, cache=cache)
+    await service.create_organization("Acme", "admin@acme.com", "password123")
+
+    await service.get_organization("Acme")
+    await service.get_organization("Acme")
+    assert service.cache_stats()["hits"] == 1
+
+    await service.update_organization("Acme", "admin@acme.com", new_organization_name="Acme 2")
+    assert await service.get_organization("Acme") is None
+    assert (await service.get_organization("Acme 2"))["collection_name"] == "org_acme_2"
+
+    await service.delete_organization("Acme 2", "admin@acme.com")
+    assert await service.get_organization("Acme 2") is None
+
+
+def test_org_cache_invalidates_by_document_id():
+    cache = OrgCache(maxsize=10, ttl=60)
+    cache.set("Acme", {"_id": 1, "organization_name": "Acme"})
+    cache.invalidate_id(1)
+    assert "Acme" not in cache
+
+
+def test_token_revocations_stay_bounded():
+    cache = TokenCache(maxsize=2)
+    now = time.time()
+    cache.revoke("a", now + 30)
+    cache.revoke("b", now + 10)
+    cache.revoke("c", now + 20)
+    assert cache.stats()["revoked"] == 2
+    assert not cache.is_revoked("b")
+    assert cache.is_revoked("a") and cache.is_revoked("c")
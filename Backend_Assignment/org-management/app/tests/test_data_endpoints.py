@@ -0,0 +1,186 @@
+import os
+
+import pytest
+from httpx import AsyncClient
+from mongomock_motor import AsyncMongoMockClient
+
+from app import config, db
+from app.cache import org_cache, token_cache
+from app.main import app
+from app.ratelimit import MemoryRateLimitStore, login_throttle
+from app.services.tenant_data_service import bulk_write_limiter
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_env():
+    os.environ["SECRET_KEY"] = "testsecret"
+    os.environ["MASTER_DB_NAME"] = "test_master"
+    os.environ["TENANT_BULK_BATCH_SIZE"] = "2"
+    config.get_settings.cache_clear()
+    yield
+    del os.environ["TENANT_BULK_BATCH_SIZE"]
+    config.get_settings.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def mock_db(event_loop):
+    client = AsyncMongoMockClient()
+    db.db._client = client  # type: ignore
+    event_loop.run_until_complete(db.ensure_master_indexes())
+    org_cache.clear()
+    token_cache.clear()
+    login_throttle._store = MemoryRateLimitStore(1000)
+    return client
+
+
+@pytest.fixture
+def client(event_loop):
+    c = AsyncClient(app=app, base_url="http://testserver")
+    yield c
+    event_loop.run_until_complete(c.aclose())
+
+
+async def admin_headers(client: AsyncClient, name: str = "Acme", email: str = "admin@acme.com"):
+    await client.post("/org/create", json={"organization_name": name, "email": email, "password": "password123"})
+    res = await client.post("/admin/login", json={"email": email, "password": "password123"})
+    return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+
+@pytest.mark.asyncio
+async def test_bulk_write_reports_per_batch_results(client, mock_db):
+    headers = await admin_headers(client)
+    operations = [
+        {"op": "upsert", "document": {"_id": 1, "kind": "invoice", "amount": 10}},
+        {"op": "upsert", "document": {"_id": 2, "kind": "note"}},
+        {"op": "upsert", "document": {"_id": 1, "kind": "invoice", "amount": 20}},
+        {"op": "bogus"},
+        {"op": "upsert", "document": {"kind": "ticket"}},
+        {"op": "delete", "_id": 2},
+    ]
+    res = await client.post("/data/bulk", json=operations, headers=headers)
+    assert res.status_code == 200
+    batches = res.json()["batches"]
+    assert [batch["start"] for batch in batches] == [0, 2, 4]
+    assert batches[0]["upserted"] == 2
+    assert batches[1]["matched"] == 1 and batches[1]["errors"][0]["index"] == 3
+    assert batches[2]["inserted"] == 1 and batches[2]["deleted"] == 1
+
+    stored = mock_db["test_master"]["org_acme"]
+    assert await stored.count_documents({}) == 2
+    assert (await stored.find_one({"_id": 1}))["amount"] == 20
+
+
+@pytest.mark.asyncio
+async def test_query_projects_and_pages_by_id(client):
+    headers = await admin_headers(client)
+    operations = [{"op": "upsert", "document": {"_id": n, "kind": "note", "body": "x" * n}} for n in range(5)]
+    await client.post("/data/bulk", json=operations, headers=headers)
+
+    seen, cursor = [], None
+    while True:
+        body = {"filter": {"_id": {"$gte": 1}}, "fields": ["kind"], "limit": 2, "cursor": cursor}
+        res = await client.post("/data/query", json=body, headers=headers)
+        assert res.status_code == 200
+        page = res.json()
+        assert all(set(item) == {"_id", "kind"} for item in page["items"])
+        seen += [item["_id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [1, 2, 3, 4]
+
+    res = await client.post("/data/query", json={"filter": {"$where": "true"}}, headers=headers)
+    assert res.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_data_api_is_scoped_to_the_token_org(client, mock_db):
+    acme = await admin_headers(client)
+    globex = await admin_headers(client, "Globex", "admin@globex.com")
+    await client.post("/data/bulk", json=[{"op": "upsert", "document": {"_id": 1, "owner": "acme"}}], headers=acme)
+    await client.post("/data/bulk", json=[{"op": "delete", "_id": 1}], headers=globex)
+
+    res = await client.post("/data/query", json={}, headers=globex)
+    assert res.json()["items"] == []
+    res = await client.post("/data/query", json={}, headers=acme)
+    assert res.json()["items"] == [{"_id": 1, "owner": "acme"}]
+    assert (await client.post("/data/query", json={})).status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_bulk_write_limits_and_backpressure(client, monkeypatch):
+    headers = await admin_headers(client)
+    monkeypatch.setenv("TENANT_BULK_MAX_OPERATIONS", "3")
+    config.get_settings.cache_clear()
+    try:
+        res = await client.post("/data/bulk", json=[{"op": "delete", "_id": n} for n in range(4)], headers=headers)
+        assert res.status_code == 413
+
+        monkeypatch.setattr(bulk_write_limiter, "_pending", 1000)
+        res = await client.post("/data/bulk", json=[{"op": "delete", "_id": 1}], headers=headers)
+        assert res.status_code == 503
+        assert res.headers["Retry-After"] == "1"
+    finally:
+        config.get_settings.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_import_rejects_malformed_documents(client):
+    headers = await admin_headers(client)
+    params = {"organization_name": "Acme", "format": "ndjson"}
+    res = await client.post("/org/import", params=params, content=b'{"_id": {"$oid": "zz"}}\n', headers=headers)
+    assert res.status_code == 400
+    assert res.json()["detail"] == "Invalid JSON on line 1"
+
+
+@pytest.mark.asyncio
+async def test_writes_wait_while_a_rename_moves_data(client):
+    headers = await admin_headers(client)
+    rename = {"organization_name": "Acme", "new_organization_name": "Acme 2"}
+    res = await client.put("/org/update", json=rename, headers=headers)
+    assert res.status_code == 202
+    # The token still names the old org, so log in again as the renamed org's admin.
+    res = await client.post("/admin/login", json={"email": "admin@acme.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+    res = await client.post("/data/bulk", json=[{"op": "delete", "_id": 1}], headers=headers)
+    assert res.status_code == 503
+    assert (await client.post("/data/query", json={}, headers=headers)).status_code == 200
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fmt,gzip", [("ndjson", True), ("bson", False)])
+async def test_export_streams_into_import(client, mock_db, monkeypatch, fmt, gzip):
+    monkeypatch.setenv("EXPORT_CHUNK_BYTES", "64")
+    monkeypatch.setenv("IMPORT_BATCH_SIZE", "3")
+    config.get_settings.cache_clear()
+    try:
+        source = await admin_headers(client)
+        target = await admin_headers(client, "Globex", "admin@globex.com")
+        documents = [
+            {"_id": {"$oid": f"{n:024x}"}, "n": n, "at": {"$date": "2024-01-01T00:00:00Z"}, "tags": ["a"] * n}
+            for n in range(10)
+        ]
+        await client.post("/data/bulk", json=[{"op": "upsert", "document": doc} for doc in documents], headers=source)
+
+        params = {"organization_name": "Acme", "format": fmt, "gzip": str(gzip).lower()}
+        res = await client.get("/org/export", params=params, headers=source)
+        assert res.status_code == 200
+        assert res.content.startswith(b"\x1f\x8b") == gzip
+        assert (await client.get("/org/export", params=params, headers=target)).status_code == 403
+
+        exported = res.content
+        params = {"organization_name": "Globex", "format": fmt}
+        res = await client.post("/org/import", params=params, content=exported, headers=target)
+        assert res.status_code == 200
+        assert res.json() == {"documents": 10, "inserted": 10, "duplicates": 0, "errors": []}
+        res = await client.post("/org/import", params=params, content=exported, headers=target)
+        assert res.json()["duplicates"] == 10
+        res = await client.post("/org/import", params=params, content=exported[:-7], headers=target)
+        assert res.status_code == 400
+
+        original = await mock_db["test_master"]["org_acme"].find({}, sort=[("_id", 1)]).to_list(None)
+        copied = await mock_db["test_master"]["org_globex"].find({}, sort=[("_id", 1)]).to_list(None)
+        assert copied == original
+    finally:
+        config.get_settings.cache_clear()
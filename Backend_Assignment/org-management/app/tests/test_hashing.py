@@ -0,0 +1,39 @@
+import asyncio
+import os
+
+import pytest
+
+from app import config
+from app.hashing import HashingOverloadedError, PasswordHasher
+
+
+@pytest.fixture(autouse=True)
+def setup_env():
+    os.environ["HASH_WORKERS"] = "1"
+    os.environ["HASH_QUEUE_SIZE"] = "1"
+    config.get_settings.cache_clear()
+    yield
+    os.environ.pop("HASH_WORKERS")
+    os.environ.pop("HASH_QUEUE_SIZE")
+    config.get_settings.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_roundtrip():
+    hasher = PasswordHasher()
+    hashed = await hasher.hash_password("password123")
+    assert await hasher.verify_password("password123", hashed)
+    assert not await hasher.verify_password("wrong", hashed)
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_queue_limit_rejects_excess_work():
+    hasher = PasswordHasher()
+    results = await asyncio.gather(
+        *(hasher.hash_password("password123") for _ in range(3)),
+        return_exceptions=True,
+    )
+    assert sum(isinstance(r, HashingOverloadedError) for r in results) == 1
+    assert hasher.pending == 0
+    hasher.shutdown()
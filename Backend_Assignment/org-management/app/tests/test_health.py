@@ -0,0 +1,101 @@
+import pytest
+from httpx import AsyncClient
+from mongomock_motor import AsyncMongoMockClient
+
+from app import db
+from app.main import app
+
+
+@pytest.fixture(autouse=True)
+def mock_db():
+    client = AsyncMongoMockClient()
+    db.db._client = client  # type: ignore
+    return client
+
+
+@pytest.fixture
+def client(event_loop):
+    c = AsyncClient(app=app, base_url="http://testserver")
+    yield c
+    event_loop.run_until_complete(c.aclose())
+
+
+@pytest.mark.asyncio
+async def test_ready_reports_ping_and_pool_stats(client):
+    res = await client.get("/ready")
+    assert res.status_code == 200
+    body = res.json()
+    assert body["status"] == "ready"
+    assert body["ping_ms"] >= 0
+    assert set(body["pool"]) >= {"open", "in_use", "idle"}
+
+
+def test_client_options_come_from_settings(monkeypatch):
+    from app import config
+
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "42")
+    monkeypatch.setenv("MONGO_COMPRESSORS", "zlib")
+    config.get_settings.cache_clear()
+    try:
+        options = db.Database().client_options()
+    finally:
+        config.get_settings.cache_clear()
+    assert options["maxPoolSize"] == 42
+    assert options["compressors"] == "zlib"
+
+
+@pytest.mark.asyncio
+async def test_metrics_exposes_route_histograms(client):
+    await client.get("/health")
+    await client.get("/org/get", params={"organization_name": "Missing"})
+    await client.get("/does-not-exist")
+
+    res = await client.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    body = res.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in body
+    assert 'http_request_duration_seconds_count{method="GET",route="/org/get",status="404"}' in body
+    assert 'route="unmatched",status="404"' in body
+    assert "# TYPE mongodb_command_duration_seconds histogram" in body
+    assert 'cache_stats{cache="org",stat="misses"}' in body
+
+
+def test_histogram_buckets_are_cumulative():
+    from app.metrics import Histogram
+
+    histogram = Histogram("t", "test", ["op"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, op="x")
+    lines = histogram.render()
+    assert 't_bucket{op="x",le="0.1"} 1' in lines
+    assert 't_bucket{op="x",le="1.0"} 2' in lines
+    assert 't_bucket{op="x",le="+Inf"} 3' in lines
+    assert 't_count{op="x"} 3' in lines
+
+
+@pytest.mark.asyncio
+async def test_slow_requests_log_span_breakdown(client, monkeypatch):
+    import json
+
+    from loguru import logger
+
+    from app import config
+
+    monkeypatch.setenv("SLOW_REQUEST_MS", "0")
+    config.get_settings.cache_clear()
+    records = []
+    sink = logger.add(lambda message: records.append(message.record), level="WARNING")
+    try:
+        res = await client.get("/org/get", params={"organization_name": "Missing"}, headers={"X-Request-ID": "req-1"})
+    finally:
+        logger.remove(sink)
+        config.get_settings.cache_clear()
+
+    assert res.headers["x-request-id"] == "req-1"
+    slow = [r for r in records if r["extra"].get("request_id") == "req-1"]
+    assert len(slow) == 1
+    trace = slow[0]["extra"]["trace"]
+    assert trace["status"] == 404
+    assert [child["name"] for child in trace["children"]] == ["mongo.find_one"]
+    json.dumps(trace)
@@ -0,0 +1,45 @@
+import os
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from app.db import ensure_master_indexes
+from app.diagnostics import collection_scans, explain_service_queries
+from app.services.org_service import OrgService
+
+
+@pytest.mark.asyncio
+async def test_ensure_master_indexes_is_idempotent_and_unique():
+    master_db = AsyncMongoMockClient()["test_master"]
+    collection = master_db["organizations"]
+    await collection.create_index("collection_name", unique=True, name="collection_name_unique")
+    await ensure_master_indexes(collection)
+    await ensure_master_indexes(collection)
+
+    info = await collection.index_information()
+    for name in ("organization_name_unique", "collection_tenant_unique", "admin_email_unique", "collection_claim_unique"):
+        assert info[name]["unique"] is True
+    assert "collection_name_unique" not in info
+
+    service = OrgService(collection, master_db)
+    await service.create_organization("Acme", "admin@acme.com", "password123")
+    with pytest.raises(ValueError, match="Organization already exists"):
+        await service.create_organization("ACME", "other@acme.com", "password123")
+    with pytest.raises(ValueError, match="Admin email already in use"):
+        await service.create_organization("Beta", "admin@acme.com", "password123")
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif("MONGODB_TEST_URI" not in os.environ, reason="query plans need a real mongod")
+async def test_service_queries_use_indexes():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ["MONGODB_TEST_URI"])
+    collection = client["org_plan_check"]["organizations"]
+    try:
+        await ensure_master_indexes(collection)
+        plans = await explain_service_queries(collection)
+        assert collection_scans(plans) == []
+    finally:
+        await client.drop_database("org_plan_check")
+        client.close()
@@ -0,0 +1,111 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from app import config
+from app.db import Database
+from app.jobs import FAILED, QUEUED, SUCCEEDED, JobQueue
+
+
+@pytest.fixture(autouse=True)
+def setup_env():
+    os.environ["JOB_MAX_ATTEMPTS"] = "2"
+    os.environ["JOB_RETRY_BACKOFF_SECONDS"] = "0"
+    config.get_settings.cache_clear()
+    yield
+    os.environ.pop("JOB_MAX_ATTEMPTS")
+    os.environ.pop("JOB_RETRY_BACKOFF_SECONDS")
+    config.get_settings.cache_clear()
+
+
+@pytest.fixture
+def queue():
+    database = Database()
+    database._client = AsyncMongoMockClient()  # type: ignore
+    return JobQueue(database)
+
+
+@pytest.mark.asyncio
+async def test_failed_attempts_retry_then_give_up(queue):
+    calls, restored = [], []
+
+    async def flaky(params, progress):
+        calls.append(params)
+        await progress({"step": len(calls)})
+        if len(calls) == 1:
+            raise RuntimeError("transient")
+        return {"ok": True}
+
+    async def always_fails(params, progress):
+        raise RuntimeError("broken")
+
+    async def on_failure(params):
+        restored.append(params)
+
+    queue.register("flaky", flaky)
+    queue.register("broken", always_fails, on_failure=on_failure)
+    flaky_job = await queue.enqueue("flaky", {"n": 1})
+    broken_job = await queue.enqueue("broken", {"n": 2})
+
+    assert await queue.run_pending() == 4
+    done = await queue.get(flaky_job["_id"])
+    assert (done["status"], done["attempts"], done["result"]) == (SUCCEEDED, 2, {"ok": True})
+    assert done["progress"] == {"step": 2}
+    failed = await queue.get(broken_job["_id"])
+    assert (failed["status"], failed["attempts"], failed["error"]) == (FAILED, 2, "broken")
+    assert restored == [{"n": 2}]
+
+
+@pytest.mark.asyncio
+async def test_lease_is_renewed_while_a_silent_step_runs(queue, monkeypatch):
+    monkeypatch.setenv("JOB_LEASE_SECONDS", "0.15")
+    config.get_settings.cache_clear()
+    other = JobQueue(queue.database)
+    claimed_elsewhere = []
+
+    async def long_step(params, progress):
+        # Outlives several leases without reporting progress, as a large $merge would.
+        for _ in range(4):
+            await asyncio.sleep(0.1)
+            claimed_elsewhere.append(await other.claim())
+        return {}
+
+    queue.register("merge", long_step)
+    job = await queue.enqueue("merge", {})
+    try:
+        assert await queue.run_pending() == 1
+    finally:
+        config.get_settings.cache_clear()
+    assert claimed_elsewhere == [None] * 4
+    assert (await queue.get(job["_id"]))["status"] == SUCCEEDED
+
+
+@pytest.mark.asyncio
+async def test_jobs_with_expired_lease_are_recovered(queue):
+    async def handler(params, progress):
+        return {"recovered": True}
+
+    queue.register("work", handler)
+    job = await queue.enqueue("work", {})
+    assert (await queue.claim())["_id"] == job["_id"]
+    assert await queue.claim() is None  # leased by the (now dead) first worker
+
+    await queue.collection.update_one(
+        {"_id": job["_id"]}, {"$set": {"lease_expires_at": datetime.now(timezone.utc) - timedelta(seconds=1)}}
+    )
+    restarted = JobQueue(queue.database)
+    restarted.register("work", handler)
+    assert await restarted.run_pending() == 1
+    assert (await restarted.get(job["_id"]))["status"] == SUCCEEDED
+
+
+@pytest.mark.asyncio
+async def test_stop_requeues_interrupted_jobs(queue):
+    job = await queue.enqueue("work", {})
+    await queue.claim()
+    await queue.stop()
+    stored = await queue.get(job["_id"])
+    assert (stored["status"], stored["attempts"]) == (QUEUED, 0)
@@ -0,0 +1,71 @@
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from app.services.migration_service import CollectionMigrator
+
+
+@pytest.fixture
+def database():
+    return AsyncMongoMockClient()["test_master"]
+
+
+@pytest.mark.asyncio
+async def test_migrate_uses_server_side_rename(database):
+    await database["org_old"].insert_many([{"n": i} for i in range(5)])
+    migrator = CollectionMigrator(database["migrations"], batch_size=2)
+
+    result = await migrator.migrate(database["org_old"], database["org_new"])
+
+    assert result["method"] == "rename"
+    assert await database["org_new"].count_documents({}) == 5
+    assert "org_old" not in await database.list_collection_names()
+
+
+@pytest.mark.asyncio
+async def test_migrate_resumes_batched_copy(database):
+    docs = [{"n": i} for i in range(7)]
+    await database["org_old"].insert_many(docs)
+    # Simulate a run that died after copying the first three documents.
+    await database["org_new"].insert_many([dict(d) for d in docs[:3]])
+    migrator = CollectionMigrator(database["migrations"], batch_size=2)
+    await database["migrations"].insert_one(
+        {
+            "_id": migrator.migration_id(database["org_old"], database["org_new"]),
+            "copied": 3,
+            "last_id": docs[2]["_id"],
+        }
+    )
+    seen = []
+
+    async def on_progress(update):
+        seen.append(update)
+
+    result = await migrator.migrate(database["org_old"], database["org_new"], on_progress=on_progress)
+
+    assert result["method"] == "batched"
+    assert result["copied"] == 7
+    assert [u["copied"] for u in seen[:-1]] == [5, 7]
+    assert sorted(d["n"] for d in await database["org_new"].find({}).to_list(None)) == list(range(7))
+    assert "org_old" not in await database.list_collection_names()
+    assert await database["migrations"].count_documents({}) == 0
+
+
+@pytest.mark.asyncio
+async def test_migrate_refuses_a_target_that_already_holds_documents(database):
+    await database["org_old"].insert_many([{"n": i} for i in range(3)])
+    await database["org_new"].insert_one({"n": "existing"})
+    migrator = CollectionMigrator(database["migrations"], batch_size=2)
+
+    with pytest.raises(ValueError, match="already holds documents"):
+        await migrator.migrate(database["org_old"], database["org_new"])
+
+    assert await database["org_old"].count_documents({}) == 3
+    assert await database["org_new"].count_documents({}) == 1
+    assert await database["migrations"].count_documents({}) == 0
+
+
+def test_migration_id_tells_shards_with_the_same_namespace_apart(database):
+    source, target = database["org_acme"], database["org_acme"]
+    to_a = CollectionMigrator.migration_id(source, target, route="None->a")
+    to_b = CollectionMigrator.migration_id(source, target, route="None->b")
+    assert to_a != to_b
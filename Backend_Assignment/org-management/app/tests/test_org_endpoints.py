@@ -1,3 +1,4 @@
+import json
 import os
 import pytest
 from httpx import AsyncClient
@@ -6,6 +7,11 @@ from mongomock_motor import AsyncMongoMockClient
 from app.main import app
 from app import config
 from app import db
+from app.cache import org_cache, token_cache
+from app.ratelimit import MemoryRateLimitStore, login_throttle
+from app.jobs import jobs, requeue_pending_jobs
+from app.hashing import HashingOverloadedError
+from app.services.org_service import OrgService
 from app.utils import safe_collection_name
 
 
@@ -21,9 +27,13 @@ def setup_env():
 
 
 @pytest.fixture(autouse=True)
-def mock_db():
+def mock_db(event_loop):
     client = AsyncMongoMockClient()
     db.db._client = client  # type: ignore
+    event_loop.run_until_complete(db.ensure_master_indexes())
+    org_cache.clear()
+    token_cache.clear()
+    login_throttle._store = MemoryRateLimitStore(1000)
     return client
 
 
@@ -55,8 +65,8 @@ async def test_org_create_success(client):
     stored = await master_db["organizations"].find_one({"organization_name": "Acme Corp"})
     assert stored is not None
     assert stored["admin"]["email"] == "admin@acme.com"
-    collections = await master_db.list_collection_names()
-    assert safe_collection_name("Acme Corp") in collections
+    # The tenant collection is created by its first write, not by provisioning.
+    assert safe_collection_name("Acme Corp") not in await master_db.list_collection_names()
 
 
 @pytest.mark.asyncio
@@ -77,6 +87,8 @@ async def test_update_org_name_and_copy(client):
     await create_org_helper(client)
     login = await client.post("/admin/login", json={"email": "admin@acme.com", "password": "password123"})
     token = login.json()["access_token"]
+    master_db = db.db.get_master_db()
+    await master_db[safe_collection_name("Acme Corp")].insert_one({"name": "doc"})
 
     res = await client.put(
         "/org/update",
@@ -86,15 +98,72 @@ async def test_update_org_name_and_copy(client):
             "new_organization_name": "New Acme",
         },
     )
-    assert res.status_code == 200
+    assert res.status_code == 202
+    status_url = res.json()["status_url"]
+    assert res.headers["location"] == status_url
+    # The name changes at once; the data follows when the job runs.
+    assert (await client.get("/org/get", params={"organization_name": "New Acme"})).status_code == 200
+    assert await jobs.run_pending() == 1
+
+    job = await client.get(status_url, headers={"Authorization": f"Bearer {token}"})
+    assert job.json()["status"] == "succeeded"
+    assert job.json()["result"]["collection_name"] == safe_collection_name("New Acme")
     new_coll = safe_collection_name("New Acme")
-    master_db = db.db.get_master_db()
     collections = await master_db.list_collection_names()
     assert new_coll in collections
     assert safe_collection_name("Acme Corp") not in collections
     updated_doc = await master_db["organizations"].find_one({"organization_name": "New Acme"})
     assert updated_doc is not None
     assert updated_doc["collection_name"] == new_coll
+    assert await master_db[new_coll].count_documents({"name": "doc"}) == 1
+
+
+@pytest.mark.asyncio
+async def test_update_rejects_taken_name_and_foreign_org(client):
+    await create_org_helper(client)
+    await client.post(
+        "/org/create", json={"organization_name": "Other", "email": "admin@other.com", "password": "password123"}
+    )
+    login = await client.post("/admin/login", json={"email": "admin@acme.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    res = await client.put(
+        "/org/update", headers=headers, json={"organization_name": "Acme Corp", "new_organization_name": "Other"}
+    )
+    assert res.status_code == 400
+    assert res.json()["detail"] == "New organization name already exists"
+    res = await client.put("/org/update", headers=headers, json={"organization_name": "Other", "email": "x@acme.com"})
+    assert res.status_code == 403
+    res = await client.put("/org/update", headers=headers, json={"organization_name": "Missing", "email": "x@acme.com"})
+    assert res.status_code == 404
+    master_db = db.db.get_master_db()
+    assert (await master_db["organizations"].find_one({"organization_name": "Acme Corp"})) is not None
+
+
+@pytest.mark.asyncio
+async def test_rename_cannot_take_another_orgs_collection(client):
+    for name in ("foo", "bar", "legacy"):
+        await client.post(
+            "/org/create", json={"organization_name": name, "email": f"admin@{name}.com", "password": "password123"}
+        )
+    master_db = db.db.get_master_db()
+    await master_db["org_foo"].insert_one({"owner": "foo"})
+    await master_db["org_bar"].insert_one({"owner": "bar"})
+    # Orgs created before claims existed own their collection without a collection_claim.
+    await master_db["organizations"].update_one({"organization_name": "legacy"}, {"$unset": {"collection_claim": ""}})
+    login = await client.post("/admin/login", json={"email": "admin@bar.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    for new_name in ("FOO!", "Legacy"):
+        rename = {"organization_name": "bar", "new_organization_name": new_name}
+        res = await client.put("/org/update", headers=headers, json=rename)
+        assert res.status_code == 400
+        assert res.json()["detail"] == "New organization name already exists"
+    assert await jobs.run_pending() == 0
+    bar = await master_db["organizations"].find_one({"admin.email": "admin@bar.com"})
+    assert (bar["organization_name"], bar["collection_claim"]) == ("bar", "org_bar")
+    assert await master_db["org_foo"].distinct("owner") == ["foo"]
+    assert await master_db["org_bar"].distinct("owner") == ["bar"]
 
 
 @pytest.mark.asyncio
@@ -120,12 +189,195 @@ async def test_delete_org_permissions(client):
     )
     assert res_forbidden.status_code == 403
 
+    await master_db[safe_collection_name("Acme Corp")].insert_one({"name": "doc"})
     res = await client.delete(
         "/org/delete",
         params={"organization_name": "Acme Corp"},
         headers={"Authorization": f"Bearer {token}"},
     )
-    assert res.status_code == 200
+    assert res.status_code == 202
+    assert (await client.get("/org/get", params={"organization_name": "Acme Corp"})).status_code == 404
+    # Until the data is dropped, the name stays taken so a new org can't inherit the old collection.
+    recreate = {"organization_name": "Acme Corp", "email": "new@acme.com", "password": "password123"}
+    assert (await client.post("/org/create", json=recreate)).status_code == 400
+    assert await jobs.run_pending() == 1
     assert await master_db["organizations"].find_one({"organization_name": "Acme Corp"}) is None
+    assert safe_collection_name("Acme Corp") not in await master_db.list_collection_names()
+    assert (await client.post("/org/create", json=recreate)).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_startup_requeues_jobs_lost_after_the_metadata_write(client):
+    await create_org_helper(client)
+    login = await client.post("/admin/login", json={"email": "admin@acme.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    master_db = db.db.get_master_db()
+    await master_db[safe_collection_name("Acme Corp")].insert_one({"name": "doc"})
+
+    res = await client.put(
+        "/org/update",
+        json={"organization_name": "Acme Corp", "new_organization_name": "Beta Corp"},
+        headers=headers,
+    )
+    assert res.status_code == 202
+    # A crash between the rename and the enqueue leaves the rename without its job.
+    await master_db["jobs"].delete_many({})
+    assert await requeue_pending_jobs() == 1
+    assert await requeue_pending_jobs() == 0
+    assert await jobs.run_pending() == 1
+    org = await master_db["organizations"].find_one({"organization_name": "Beta Corp"})
+    assert "pending_job" not in org
+    assert await master_db[safe_collection_name("Beta Corp")].count_documents({}) == 1
+
+    res = await client.delete("/org/delete", params={"organization_name": "Beta Corp"}, headers=headers)
+    assert res.status_code == 202
+    await master_db["jobs"].delete_many({})
+    assert await requeue_pending_jobs() == 1
+    assert await jobs.run_pending() == 1
+    assert await master_db["organizations"].find_one({"organization_name": "Beta Corp"}) is None
+
+
+@pytest.fixture
+def bulk_operator(monkeypatch):
+    monkeypatch.setenv("BULK_CREATE_ADMIN_EMAILS", '["admin@acme.com"]')
+    config.get_settings.cache_clear()
+    yield
+    config.get_settings.cache_clear()
 
 
+async def operator_headers(client: AsyncClient) -> dict:
+    await create_org_helper(client)
+    login = await client.post("/admin/login", json={"email": "admin@acme.com", "password": "password123"})
+    return {"Authorization": f"Bearer {login.json()['access_token']}", "Content-Type": "application/x-ndjson"}
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_requires_an_operator_and_caps_the_body(client, monkeypatch):
+    body = json.dumps({"organization_name": "Alpha", "email": "admin@alpha.com", "password": "password123"})
+    assert (await client.post("/org/bulk_create", content=body)).status_code == 401
+    headers = await operator_headers(client)
+    assert (await client.post("/org/bulk_create", content=body, headers=headers)).status_code == 403
+
+    monkeypatch.setenv("BULK_CREATE_ADMIN_EMAILS", '["admin@acme.com"]')
+    monkeypatch.setenv("BULK_CREATE_MAX_BYTES", str(len(body)))
+    config.get_settings.cache_clear()
+    try:
+        res = await client.post("/org/bulk_create", content=body + "\n" + body, headers=headers)
+        assert res.status_code == 413
+        assert (await client.post("/org/bulk_create", content=body, headers=headers)).status_code == 200
+    finally:
+        config.get_settings.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_streams_per_item_results(client, bulk_operator):
+    headers = await operator_headers(client)
+    lines = [
+        {"organization_name": "Alpha", "email": "admin@alpha.com", "password": "password123"},
+        {"organization_name": "Acme Corp", "email": "other@acme.com", "password": "password123"},
+        {"organization_name": "Beta", "email": "admin@beta.com", "password": "short"},
+        {"organization_name": "Alpha", "email": "again@alpha.com", "password": "password123"},
+        {"organization_name": "Gamma", "email": "admin@gamma.com", "password": "password123"},
+    ]
+    res = await client.post(
+        "/org/bulk_create",
+        content="\n".join(json.dumps(line) for line in lines),
+        headers=headers,
+    )
+    assert res.status_code == 200
+    results = {r["index"]: r for r in map(json.loads, res.text.splitlines())}
+    assert [results[i]["status"] for i in range(5)] == ["created", "error", "error", "error", "created"]
+    assert results[1]["detail"] == "Organization already exists"
+    assert results[3]["detail"] == "Duplicate in request"
+
+    master_db = db.db.get_master_db()
+    assert await master_db["organizations"].count_documents({}) == 3
+    assert await master_db["organizations"].find_one({"organization_name": "Gamma"}) is not None
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_reports_only_hashing_overload_as_busy(monkeypatch):
+    async def overloaded(password):
+        if password == "busy-password":
+            raise HashingOverloadedError("Password hashing queue is full")
+        if password == "broken-password":
+            raise RuntimeError("bcrypt failed")
+        return "hash"
+
+    monkeypatch.setattr("app.services.org_service.hash_password", overloaded)
+    master_db = db.db.get_master_db()
+    service = OrgService(master_db["organizations"], master_db)
+    items = [
+        {"index": 0, "organization_name": "Alpha", "email": "admin@alpha.com", "password": "busy-password"},
+        {"index": 1, "organization_name": "Beta", "email": "admin@beta.com", "password": "password123"},
+    ]
+    results = [result async for result in service.create_organizations(items)]
+    assert [result["status"] for result in results] == ["error", "created"]
+    assert results[0]["detail"] == "Server busy, retry later"
+
+    items = [{"index": 0, "organization_name": "Gamma", "email": "admin@gamma.com", "password": "broken-password"}]
+    with pytest.raises(RuntimeError):
+        [result async for result in service.create_organizations(items)]
+
+
+@pytest.mark.asyncio
+async def test_list_orgs_keyset_pages_without_password(client):
+    await create_org_helper(client)
+    login = await client.post("/admin/login", json={"email": "admin@acme.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    master_db = db.db.get_master_db()
+    for name in ("Acme West", "Acme East", "Zeta"):
+        await master_db["organizations"].insert_one(
+            {
+                "organization_name": name,
+                "collection_name": safe_collection_name(name),
+                "admin": {"email": f"admin@{name.replace(' ', '').lower()}.com", "password": "hash"},
+                "created_at": "2023-01-01T00:00:00Z",
+            }
+        )
+
+    first = await client.get("/org/list", params={"prefix": "Acme", "limit": 2}, headers=headers)
+    assert first.status_code == 200
+    assert [o["organization_name"] for o in first.json()["items"]] == ["Acme Corp", "Acme East"]
+    assert "admin_email" not in first.json()["items"][0]
+    second = await client.get(
+        "/org/list", params={"prefix": "Acme", "limit": 2, "cursor": first.json()["next_cursor"]}, headers=headers
+    )
+    assert [o["organization_name"] for o in second.json()["items"]] == ["Acme West"]
+    assert second.json()["next_cursor"] is None
+
+    streamed = await client.get("/org/list", params={"stream": "true"}, headers=headers)
+    rows = [json.loads(line) for line in streamed.text.splitlines()]
+    assert [r["organization_name"] for r in rows] == ["Acme Corp", "Acme East", "Acme West", "Zeta"]
+    assert "password" not in streamed.text and "admin" not in streamed.text
+
+
+@pytest.mark.asyncio
+async def test_batch_get_preserves_order_and_marks_missing(client):
+    await create_org_helper(client)
+    await client.post(
+        "/org/create", json={"organization_name": "Beta", "email": "admin@beta.com", "password": "password123"}
+    )
+    await client.get("/org/get", params={"organization_name": "Beta"})  # cached
+
+    names = ["Beta", "Missing", "Acme Corp", "Beta"]
+    res = await client.post("/org/batch_get", json={"organization_names": names})
+    assert res.status_code == 200
+    items = res.json()["items"]
+    assert [item["organization_name"] for item in items] == names
+    assert [item["found"] for item in items] == [True, False, True, True]
+    assert items[1]["organization"] is None
+    assert items[2]["organization"]["admin_email"] == "admin@acme.com"
+    assert "password" not in res.text
+
+
+@pytest.mark.asyncio
+async def test_batch_get_rejects_oversized_requests(client, monkeypatch):
+    monkeypatch.setenv("BATCH_GET_MAX_NAMES", "2")
+    config.get_settings.cache_clear()
+    try:
+        res = await client.post("/org/batch_get", json={"organization_names": ["a", "b", "c"]})
+    finally:
+        monkeypatch.delenv("BATCH_GET_MAX_NAMES")
+        config.get_settings.cache_clear()
+    assert res.status_code == 413
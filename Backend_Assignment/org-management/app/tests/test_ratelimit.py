@@ -0,0 +1,30 @@
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from app.db import Database
+from app.ratelimit import MemoryRateLimitStore, MongoRateLimitStore
+
+
+def mongo_store():
+    database = Database()
+    database._client = AsyncMongoMockClient()  # type: ignore
+    return MongoRateLimitStore(database)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("make_store", [lambda: MemoryRateLimitStore(100), mongo_store])
+async def test_bucket_allows_burst_then_reports_wait(make_store):
+    store = make_store()
+    assert [await store.hit("k", 3, 60.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    retry_after = await store.hit("k", 3, 60.0)
+    assert 59.0 < retry_after <= 60.0
+    assert await store.hit("other", 3, 60.0) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_memory_store_evicts_least_recent_keys():
+    store = MemoryRateLimitStore(max_keys=2)
+    for key in ("a", "b", "c"):
+        await store.hit(key, 1, 60.0)
+    assert await store.hit("a", 1, 60.0) == 0.0
+    assert await store.hit("c", 1, 60.0) > 0
@@ -0,0 +1,87 @@
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.read_preferences import Primary, SecondaryPreferred
+
+from app import config, db
+from app.cache import OrgCache
+from app.services.auth_service import AuthService
+from app.services.org_service import OrgService
+
+
+def lagging_secondary():
+    # A separate mock client stands in for a secondary that hasn't replicated anything yet.
+    return AsyncMongoMockClient().get_database("test_master", read_preference=SecondaryPreferred())["organizations"]
+
+
+def test_read_preference_comes_from_settings(monkeypatch):
+    monkeypatch.delenv("MONGO_READ_PREFERENCE", raising=False)
+    config.get_settings.cache_clear()
+    assert config.get_settings().mongo_read_preference == "primary"
+    monkeypatch.setenv("MONGO_READ_PREFERENCE", "secondaryPreferred")
+    monkeypatch.setenv("MONGO_MAX_STALENESS_SECONDS", "120")
+    config.get_settings.cache_clear()
+    try:
+        preference = db.read_preference()
+        monkeypatch.setenv("MONGO_READ_PREFERENCE", "primary")
+        config.get_settings.cache_clear()
+        primary = db.read_preference()
+    finally:
+        config.get_settings.cache_clear()
+    assert preference == SecondaryPreferred(max_staleness=120)
+    assert primary == Primary()
+
+
+def test_handles_are_built_once_per_client():
+    database = db.Database()
+    database._client = AsyncMongoMockClient()  # type: ignore
+    read_db, collection = database.get_read_db(), database.get_collection("organizations", read=True)
+    assert database.get_read_db() is read_db
+    assert database.get_collection("organizations", read=True) is collection
+    assert database.get_collection("organizations") is not collection
+    database._client = AsyncMongoMockClient()  # type: ignore
+    assert database.get_read_db() is not read_db
+    assert database.get_collection("organizations", read=True) is not collection
+
+
+@pytest.mark.asyncio
+async def test_reads_missing_on_secondary_are_confirmed_on_primary():
+    master_db = AsyncMongoMockClient()["test_master"]
+    service = OrgService(
+        master_db["organizations"], master_db, cache=OrgCache(maxsize=10, ttl=60), read_collection=lagging_secondary()
+    )
+    assert service.stale_reads
+    await service.create_organization("Acme", "admin@acme.com", "password123")
+
+    assert (await service.get_organization("Acme"))["admin"]["email"] == "admin@acme.com"
+    found = await service.get_organizations(["Acme", "Missing"])
+    assert list(found) == ["Acme"]
+    assert await service.list_organizations(limit=10) == []  # listings tolerate lag
+
+
+@pytest.mark.asyncio
+async def test_update_runs_without_sessions_and_caches_post_image():
+    master_db = AsyncMongoMockClient()["test_master"]
+    service = OrgService(
+        master_db["organizations"], master_db, cache=OrgCache(maxsize=10, ttl=60), read_collection=lagging_secondary()
+    )
+    await service.create_organization("Acme", "admin@acme.com", "password123")
+    await service.update_organization("Acme", "admin@acme.com", new_email="new@acme.com")
+    assert service.cache.get("Acme")["admin"]["email"] == "new@acme.com"
+    with pytest.raises(PermissionError):
+        await service.update_organization("Acme", "admin@acme.com", new_email="other@acme.com")
+
+
+@pytest.mark.asyncio
+async def test_login_reads_the_password_hash_from_the_primary():
+    master_db = AsyncMongoMockClient()["test_master"]
+    secondary = lagging_secondary()
+    service = OrgService(master_db["organizations"], master_db)
+    org = await service.create_organization("Acme", "admin@acme.com", "old-password")
+    await secondary.insert_one(dict(org))
+    await service.update_organization("Acme", "admin@acme.com", new_password="new-password")
+
+    auth = AuthService(master_db["organizations"], read_collection=secondary)
+    assert (await auth.authenticate_admin("admin@acme.com", "new-password"))["organization_name"] == "Acme"
+    for password in ("old-password", "wrong-password"):
+        with pytest.raises(PermissionError):
+            await auth.authenticate_admin("admin@acme.com", password)
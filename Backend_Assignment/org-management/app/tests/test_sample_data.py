@@ -0,0 +1,43 @@
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from scripts.create_sample_data import Generator, parse_args
+
+
+async def generate(seed: int):
+    master_db = AsyncMongoMockClient()["test_master"]
+    batches = ["--org-batch-size", "2", "--doc-batch-size", "2"]
+    args = parse_args(["--orgs", "3", "--docs", "7", *batches, "--seed", str(seed), "--shared-hash"])
+    stats = await Generator(args, master_db).run()
+    docs = await master_db["org_sample_org_1"].find({"number": {"$exists": True}}, sort=[("number", 1)]).to_list(None)
+    return stats, master_db, docs
+
+
+@pytest.mark.asyncio
+async def test_generator_populates_tenants_deterministically():
+    stats, master_db, docs = await generate(seed=1)
+    assert stats["orgs_created"] == 3
+    assert stats["docs_inserted"] == 21
+    assert await master_db["organizations"].count_documents({}) == 3
+    assert [doc["number"] for doc in docs] == list(range(7))
+
+    _, _, same = await generate(seed=1)
+    _, _, other = await generate(seed=2)
+    assert same == docs
+    assert other != docs
+
+
+@pytest.mark.asyncio
+async def test_rerun_skips_existing_orgs_and_tops_up_short_tenants():
+    master_db = AsyncMongoMockClient()["test_master"]
+    args = parse_args(["--orgs", "2", "--docs", "5", "--doc-batch-size", "2", "--shared-hash"])
+    await Generator(args, master_db).run()
+    # As if the first run died while filling the second tenant.
+    await master_db["org_sample_org_1"].delete_many({"number": {"$gte": 3}})
+
+    stats = await Generator(args, master_db).run()
+    assert stats["orgs_created"] == 0
+    assert stats["orgs_skipped"] == 2
+    assert stats["orgs_topped_up"] == 1
+    assert stats["docs_inserted"] == 2
+    assert await master_db["org_sample_org_1"].count_documents({}) == 5
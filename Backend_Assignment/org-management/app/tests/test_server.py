@@ -0,0 +1,30 @@
+import os
+
+from app import config
+from app.db import Database
+from app.server import hash_workers_per_process, worker_count
+
+
+def test_worker_count_prefers_flag_then_env_then_cpus(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    config.get_settings.cache_clear()
+    assert worker_count(2) == 2
+    assert worker_count() == 3
+    monkeypatch.delenv("WEB_CONCURRENCY")
+    config.get_settings.cache_clear()
+    assert worker_count() == (os.cpu_count() or 1)
+    assert hash_workers_per_process(os.cpu_count() * 4) == 1
+
+
+def test_database_rebuilds_clients_after_fork(monkeypatch):
+    database = Database()
+    parent_client = database.get_client()
+    assert database.get_client() is parent_client
+
+    child_pid = database._pid + 1
+    monkeypatch.setattr(os, "getpid", lambda: child_pid)
+    child_client = database.get_client()
+    assert child_client is not parent_client
+    assert database.get_client() is child_client
+    parent_client.close()
+    child_client.close()
@@ -0,0 +1,130 @@
+import asyncio
+import json
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from app import config
+from app.cache import OrgCache
+from app.db import Database, HashRing, ShardRouter
+from app.rebalance import rebalance
+from app.services.org_service import OrgService, TenantMovingError
+
+SHARDS = {"a": "mongodb://shard-a/tenants", "b": "mongodb://shard-b/tenants"}
+
+
+@pytest.fixture
+def shards(monkeypatch):
+    monkeypatch.setenv("TENANT_SHARDS", json.dumps(SHARDS))
+    config.get_settings.cache_clear()
+    database = Database()
+    database._client = AsyncMongoMockClient()  # type: ignore
+    for uri in SHARDS.values():
+        database._shard_clients[uri] = AsyncMongoMockClient()  # type: ignore
+    yield database
+    config.get_settings.cache_clear()
+
+
+def make_service(database: Database) -> OrgService:
+    master_db = database.get_master_db()
+    return OrgService(master_db["organizations"], master_db, cache=OrgCache(10, 60), router=ShardRouter(database))
+
+
+def test_hash_ring_moves_only_keys_taken_by_new_node():
+    keys = [f"org-{i}" for i in range(2000)]
+    before = HashRing(["a", "b", "c"])
+    after = HashRing(["a", "b", "c", "d"])
+    moved = [key for key in keys if before.get_node(key) != after.get_node(key)]
+    assert all(after.get_node(key) == "d" for key in moved)
+    assert 0.1 < len(moved) / len(keys) < 0.4
+
+
+@pytest.mark.asyncio
+async def test_create_records_shard_and_writes_there(shards):
+    service = make_service(shards)
+    org = await service.create_organization("Acme", "admin@acme.com", "password123")
+
+    assert org["shard"] in SHARDS
+    collection, _ = service.tenant_scope(org)
+    await collection.insert_one({"name": "doc"})
+    collections = await service.tenant_db(org).list_collection_names()
+    assert org["collection_name"] in collections
+    assert org["collection_name"] not in await shards.get_master_db().list_collection_names()
+
+
+@pytest.mark.asyncio
+async def test_rebalance_moves_unplaced_tenants_to_their_shard(shards):
+    service = make_service(shards)
+    master_db = shards.get_master_db()
+    await master_db["organizations"].insert_one(
+        {
+            "organization_name": "Legacy",
+            "collection_name": "org_legacy",
+            "admin": {"email": "admin@legacy.com", "password": "hash"},
+            "created_at": "2023-01-01T00:00:00Z",
+        }
+    )
+    await master_db["org_legacy"].insert_many([{"n": i} for i in range(5)])
+
+    moves = await rebalance(service)
+
+    assert len(moves) == 1
+    org = await master_db["organizations"].find_one({"organization_name": "Legacy"})
+    assert org["shard"] == moves[0]["target"]
+    assert "moving_to" not in org
+    assert await service.tenant_db(org)["org_legacy"].count_documents({}) == 5
+    assert "org_legacy" not in await master_db.list_collection_names()
+    assert await rebalance(service) == []
+
+
+@pytest.mark.asyncio
+async def test_failed_shard_move_reopens_writes_and_discards_the_copy(shards, monkeypatch):
+    service = make_service(shards)
+    org = await service.create_organization("Acme", "admin@acme.com", "password123")
+    target = next(shard for shard in SHARDS if shard != org["shard"])
+    collection, _ = service.tenant_scope(org)
+    await collection.insert_many([{"n": n} for n in range(5)])
+    copy_batches = service.migrator._copy_batches
+
+    async def copy_then_fail(*args, **kwargs):
+        await copy_batches(*args, **kwargs)
+        raise RuntimeError("target shard unreachable")
+
+    monkeypatch.setattr(service.migrator, "_copy_batches", copy_then_fail)
+    with pytest.raises(RuntimeError):
+        await service.move_tenant(org, target)
+
+    stored = await shards.get_master_db()["organizations"].find_one({"_id": org["_id"]})
+    assert stored["shard"] == org["shard"]
+    assert "moving_to" not in stored
+    assert await service.migrator.progress_collection.count_documents({}) == 0
+    assert org["collection_name"] not in await service._shard_db(target).list_collection_names()
+    async with service.write_lease(stored):
+        await collection.insert_one({"n": 5})
+    assert await collection.count_documents({}) == 6
+
+
+@pytest.mark.asyncio
+async def test_shard_move_waits_for_leased_writers(shards, monkeypatch):
+    monkeypatch.setattr("app.services.org_service.WRITE_LEASE_POLL_SECONDS", 0.01)
+    service = make_service(shards)
+    org = await service.create_organization("Acme", "admin@acme.com", "password123")
+    target = next(shard for shard in SHARDS if shard != org["shard"])
+    collection, _ = service.tenant_scope(org)
+
+    async with service.write_lease(org) as renew:
+        move = asyncio.ensure_future(service.move_tenant(org, target))
+        await asyncio.sleep(0.05)
+        assert not move.done()
+        with pytest.raises(TenantMovingError):
+            async with service.write_lease(org):
+                pass
+        # Written while the move waits, so it must be copied rather than lost with the source.
+        await renew()
+        await collection.insert_one({"name": "late write"})
+    await move
+
+    moved = await shards.get_master_db()["organizations"].find_one({"_id": org["_id"]})
+    assert moved["shard"] == target
+    assert not moved.get("write_leases")
+    assert await service.tenant_db(moved)[org["collection_name"]].count_documents({"name": "late write"}) == 1
@@ -0,0 +1,141 @@
+import asyncio
+import os
+import time
+
+import pytest
+from httpx import AsyncClient
+from mongomock_motor import AsyncMongoMockClient
+
+from app import config, db
+from app.cache import org_cache, token_cache
+from app.main import app
+from app.ratelimit import MemoryRateLimitStore, login_throttle
+from app.services.stats_service import TenantStatsService, tenant_stats
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_env():
+    os.environ["SECRET_KEY"] = "testsecret"
+    os.environ["MASTER_DB_NAME"] = "test_master"
+    os.environ["STATS_ADMIN_EMAILS"] = '["admin@acme.com"]'
+    config.get_settings.cache_clear()
+    yield
+    del os.environ["STATS_ADMIN_EMAILS"]
+    config.get_settings.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def mock_db(event_loop):
+    client = AsyncMongoMockClient()
+    db.db._client = client  # type: ignore
+    event_loop.run_until_complete(db.ensure_master_indexes())
+    org_cache.clear()
+    token_cache.clear()
+    tenant_stats.clear()
+    login_throttle._store = MemoryRateLimitStore(1000)
+    return client
+
+
+@pytest.fixture
+def client(event_loop):
+    c = AsyncClient(app=app, base_url="http://testserver")
+    yield c
+    event_loop.run_until_complete(c.aclose())
+
+
+async def admin_headers(client: AsyncClient, name: str, email: str):
+    await client.post("/org/create", json={"organization_name": name, "email": email, "password": "password123"})
+    res = await client.post("/admin/login", json={"email": email, "password": "password123"})
+    return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+
+@pytest.mark.asyncio
+async def test_org_stats_are_cached_and_scoped(client, mock_db):
+    acme = await admin_headers(client, "Acme", "admin@acme.com")
+    globex = await admin_headers(client, "Globex", "admin@globex.com")
+    await mock_db["test_master"]["org_acme"].insert_many([{"n": n} for n in range(3)])
+
+    res = await client.get("/org/stats", params={"organization_name": "Acme"}, headers=acme)
+    assert res.status_code == 200
+    stats = res.json()
+    assert stats["documents"] == 3
+    # mongomock has neither $collStats nor $bsonSize, so this exercises the count fallback.
+    assert stats["source"] == "count"
+
+    await mock_db["test_master"]["org_acme"].insert_one({"n": 3})
+    res = await client.get("/org/stats", params={"organization_name": "Acme"}, headers=acme)
+    assert res.json()["documents"] == 3
+    res = await client.get("/org/stats", params={"organization_name": "Acme"}, headers=globex)
+    assert res.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_stats_summary_totals_every_org_for_operators_only(client, mock_db):
+    acme = await admin_headers(client, "Acme", "admin@acme.com")
+    globex = await admin_headers(client, "Globex", "admin@globex.com")
+    await mock_db["test_master"]["org_acme"].insert_many([{"n": n} for n in range(3)])
+    await mock_db["test_master"]["org_globex"].insert_many([{"n": n} for n in range(5)])
+
+    assert (await client.get("/org/stats/summary", headers=globex)).status_code == 403
+    res = await client.get("/org/stats/summary", headers=acme)
+    assert res.status_code == 200
+    summary = res.json()
+    assert summary["organizations"] == 2
+    assert summary["documents"] == 8
+    assert [stats["organization_name"] for stats in summary["largest"]] == ["Globex", "Acme"]
+
+
+@pytest.mark.asyncio
+async def test_refresh_loop_only_runs_after_the_summary_was_requested(monkeypatch):
+    builds = []
+
+    async def build_summary(service):
+        builds.append(service)
+        stats._summary = (time.monotonic(), {"organizations": len(builds)})
+        return stats._summary[1]
+
+    stats = TenantStatsService()
+    monkeypatch.setattr(stats, "_build_summary", build_summary)
+    monkeypatch.setenv("STATS_REFRESH_INTERVAL_SECONDS", "0.02")
+    config.get_settings.cache_clear()
+    try:
+        stats.start("service")
+        await asyncio.sleep(0.1)
+        assert builds == []
+
+        assert await stats.summary("service") == {"organizations": 1}
+        await asyncio.sleep(0.1)
+        assert len(builds) == 1
+        assert await stats.summary("service") == {"organizations": 1}
+        await asyncio.sleep(0.1)
+        assert len(builds) == 2
+        await asyncio.sleep(0.1)
+        assert len(builds) == 2
+    finally:
+        await stats.stop()
+        config.get_settings.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_fetch_and_stale_entries_refresh_in_background(monkeypatch):
+    calls = []
+
+    async def collect(service, org):
+        calls.append(org["_id"])
+        await asyncio.sleep(0.01)
+        return {"documents": len(calls)}
+
+    stats = TenantStatsService()
+    monkeypatch.setattr(stats, "collect", collect)
+    org = {"_id": 1}
+    results = await asyncio.gather(*(stats.get(None, org) for _ in range(5)))
+    assert calls == [1] and all(result == {"documents": 1} for result in results)
+
+    monkeypatch.setenv("STATS_CACHE_TTL_SECONDS", "0")
+    config.get_settings.cache_clear()
+    try:
+        assert await stats.get(None, org) == {"documents": 1}
+        await asyncio.sleep(0.05)
+        assert await stats.get(None, org, wait_for_refresh=True) == {"documents": 3}
+    finally:
+        config.get_settings.cache_clear()
@@ -0,0 +1,54 @@
+import gzip
+
+import bson
+import pytest
+
+from app import streams
+from app.streams import BSON, NDJSON, DocumentDecoder
+
+
+def decode(fmt: str, data: bytes, chunk_size: int = 7):
+    decoder = DocumentDecoder(fmt)
+    documents = []
+    for start in range(0, len(data), chunk_size):
+        documents.extend(decoder.feed(data[start : start + chunk_size]))
+    return documents + list(decoder.close())
+
+
+def test_gzip_is_inflated_in_bounded_steps(monkeypatch):
+    monkeypatch.setattr(streams, "MAX_DOCUMENT_BYTES", 64)
+    sizes = []
+    split = DocumentDecoder._split
+
+    def recording_split(self, data):
+        sizes.append(len(data))
+        return split(self, data)
+
+    monkeypatch.setattr(DocumentDecoder, "_split", recording_split)
+    lines = b"".join(b'{"n": %d}\n' % n for n in range(1000))
+    documents = decode(NDJSON, gzip.compress(lines), chunk_size=len(lines))
+    assert [doc["n"] for doc in documents] == list(range(1000))
+    assert max(sizes) < 2 * 64
+
+
+def test_ndjson_lines_are_bounded(monkeypatch):
+    monkeypatch.setattr(streams, "MAX_LINE_BYTES", 64)
+    with pytest.raises(ValueError, match="Line 2 is too long"):
+        decode(NDJSON, b'{"n": 1}\n' + b"x" * 1000)
+    with pytest.raises(ValueError, match="Line 1 is too long"):
+        decode(NDJSON, b"x" * 100 + b"\n", chunk_size=200)
+
+
+@pytest.mark.parametrize(
+    "fmt,data",
+    [
+        (BSON, bson.encode({"a": 1})[:-1] + b"\x01"),
+        (NDJSON, b'{"_id": {"$oid": "zz"}}\n'),
+        (NDJSON, b'{"at": {"$date": []}}\n'),
+        (NDJSON, b'{"re": {"$regularExpression": {}}}\n'),
+        (NDJSON, b"[1]\n"),
+    ],
+)
+def test_malformed_documents_raise_value_error(fmt, data):
+    with pytest.raises(ValueError):
+        decode(fmt, data)
@@ -0,0 +1,63 @@
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from app.cache import OrgCache
+from app.db import ensure_master_indexes
+from app.services.migration_service import CollectionMigrator
+from app.services.org_service import OrgService
+from app.tenancy import TenancyStrategies
+
+
+def make_service(mode: str) -> OrgService:
+    master_db = AsyncMongoMockClient()["test_master"]
+    migrator = CollectionMigrator(master_db["migrations"])
+    return OrgService(
+        master_db["organizations"],
+        master_db,
+        migrator=migrator,
+        cache=OrgCache(maxsize=10, ttl=60),
+        tenancy=TenancyStrategies(migrator, mode=mode),
+    )
+
+
+@pytest.mark.asyncio
+async def test_shared_mode_keys_documents_by_tenant():
+    service = make_service("shared")
+    await ensure_master_indexes(service.master_collection)
+    await service.tenancy.default.ensure_indexes(service.master_db)
+    acme = await service.create_organization("Acme", "admin@acme.com", "password123")
+    beta = await service.create_organization("Beta", "admin@beta.com", "password123")
+    assert acme["collection_name"] == beta["collection_name"] == "tenant_data"
+    assert acme["tenant_id"] != beta["tenant_id"]
+
+    for org in (acme, beta):
+        collection, tenant_filter = service.tenant_scope(org)
+        await collection.insert_many([{**tenant_filter, "n": i} for i in range(3)])
+
+    renamed = await service.update_organization("Acme", "admin@acme.com", new_organization_name="Acme 2")
+    assert renamed["collection_name"] == "tenant_data"
+    assert renamed["tenant_id"] == acme["tenant_id"]
+
+    await service.delete_organization("Acme 2", "admin@acme.com")
+    shared = service.master_db["tenant_data"]
+    assert await shared.count_documents({"tenant_id": acme["tenant_id"]}) == 0
+    assert await shared.count_documents({"tenant_id": beta["tenant_id"]}) == 3
+
+
+@pytest.mark.asyncio
+async def test_legacy_orgs_keep_collection_strategy_after_switching_mode():
+    service = make_service("shared")
+    await service.master_collection.insert_one(
+        {
+            "organization_name": "Legacy",
+            "collection_name": "org_legacy",
+            "admin": {"email": "admin@legacy.com", "password": "hash"},
+            "created_at": "2023-01-01T00:00:00Z",
+        }
+    )
+    await service.master_db["org_legacy"].insert_one({"n": 1})
+
+    updated = await service.update_organization("Legacy", "admin@legacy.com", new_organization_name="Legacy 2")
+
+    assert updated["collection_name"] == "org_legacy_2"
+    assert await service.master_db["org_legacy_2"].count_documents({}) == 1
@@ -0,0 +1,111 @@
+import json
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from loguru import logger
+
+from .config import get_settings
+
+REQUEST_ID_HEADER = b"x-request-id"
+
+
+class Span:
+    __slots__ = ("name", "start", "end", "attributes", "children")
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> None:
+        self.name = name
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.attributes = attributes or {}
+        self.children: List["Span"] = []
+
+    def finish(self) -> None:
+        self.end = time.perf_counter()
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def to_dict(self, origin: Optional[float] = None) -> Dict[str, Any]:
+        origin = self.start if origin is None else origin
+        return {
+            "name": self.name,
+            "offset_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration_ms, 3),
+            **self.attributes,
+            "children": [child.to_dict(origin) for child in self.children],
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Record a child of the current span; a no-op outside a traced request."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name, attributes)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    finally:
+        child.finish()
+        _current_span.reset(token)
+
+
+def configure_logging() -> None:
+    settings = get_settings()
+    logger.remove()
+    # enqueue=True hands records to a background thread, so logging never blocks the event loop.
+    logger.add(sys.stderr, level=settings.log_level, enqueue=True, serialize=settings.log_serialize)
+
+
+class TracingMiddleware:
+    """Opens a root span per request, echoes ``X-Request-ID`` and logs a span breakdown for slow requests."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = dict(scope["headers"]).get(REQUEST_ID_HEADER, b"").decode() or uuid.uuid4().hex
+        root = Span(f"{scope['method']} {scope['path']}", {"request_id": request_id})
+        span_token = _current_span.set(root)
+        id_token = _request_id.set(request_id)
+        status_code = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(REQUEST_ID_HEADER, request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            root.finish()
+            _current_span.reset(span_token)
+            _request_id.reset(id_token)
+            if root.duration_ms >= get_settings().slow_request_ms:
+                root.attributes["status"] = status_code
+                breakdown = root.to_dict()
+                logger.bind(request_id=request_id, trace=breakdown).warning(
+                    "Slow request {} took {:.1f} ms: {}", root.name, root.duration_ms, json.dumps(breakdown)
+                )
@@ -1,13 +1,31 @@
 import re
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
+import orjson
+from fastapi.responses import ORJSONResponse
+from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from passlib.context import CryptContext
+from pymongo import ASCENDING, IndexModel
 
+from .cache import token_cache
 from .config import get_settings
+from .db import db
+from .metrics import JWT_DECODE_DURATION, TOKEN_CACHE_LOOKUPS
+from .tracing import span
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/admin/login")
+# Revoked access tokens, keyed by their digest; the server removes each once the token has expired anyway.
+REVOKED_TOKEN_INDEXES = [IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl")]
+
+
+class FastJSONResponse(ORJSONResponse):
+    """orjson encoding, writing UTC datetimes with a ``Z`` suffix as pydantic does."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
 
 
 def get_password_hash(password: str) -> str:
@@ -35,6 +53,48 @@ def decode_access_token(token: str) -> Dict[str, Any]:
         raise ValueError("Invalid token") from exc
 
 
+async def ensure_revocation_indexes() -> List[str]:
+    return await db.get_collection("revoked_tokens").create_indexes(REVOKED_TOKEN_INDEXES)
+
+
+async def verify_access_token(token: str) -> Dict[str, Any]:
+    """Check a JWT, verifying its signature once per process and its revocation on every call.
+
+    Revocations live in Mongo, so a logout handled by one worker holds on all of them; the
+    in-process set only spares the lookup for tokens this process already knows are revoked.
+    """
+    digest = token_cache.digest(token)
+    if token_cache.is_revoked(digest):
+        raise ValueError("Token revoked")
+    with span("jwt.verify") as current:
+        payload = token_cache.get(digest)
+        if current is not None:
+            current.attributes["cached"] = payload is not None
+        if payload is not None:
+            TOKEN_CACHE_LOOKUPS.inc(result="hit")
+        else:
+            TOKEN_CACHE_LOOKUPS.inc(result="miss")
+            with JWT_DECODE_DURATION.time():
+                payload = decode_access_token(token)
+            token_cache.add(digest, payload)
+    with span("mongo.find_one", query="revoked_tokens _id"):
+        revoked = await db.get_collection("revoked_tokens").find_one({"_id": digest}, {"_id": 1})
+    if revoked is not None:
+        token_cache.revoke(digest, float(payload["exp"]))
+        raise ValueError("Token revoked")
+    return payload
+
+
+async def revoke_access_token(token: str) -> None:
+    payload = await verify_access_token(token)
+    digest = token_cache.digest(token)
+    expires_at = datetime.fromtimestamp(float(payload["exp"]), timezone.utc)
+    await db.get_collection("revoked_tokens").update_one(
+        {"_id": digest}, {"$set": {"expires_at": expires_at}}, upsert=True
+    )
+    token_cache.revoke(digest, float(payload["exp"]))
+
+
 def safe_collection_name(org_name: str) -> str:
     cleaned = org_name.strip().lower()
     cleaned = re.sub(r"[^a-z0-9]+", "_", cleaned)
@@ -0,0 +1,139 @@
+"""Measure CPU time per ``GET /org/get`` request, lean response path vs. the validated one it replaced.
+
+Usage:
+    python -m benchmarks.org_get_cpu --requests 20000
+    python -m benchmarks.org_get_cpu --requests 5000 --output org_get_cpu.json
+
+Both routes run inside the real app, behind the same middleware, and read the same org from the
+warm metadata cache, so the difference is the response path alone: the ``validated`` route builds
+an ``OrgResponse``, lets FastAPI validate it against ``response_model`` and encodes it with the
+stdlib JSON encoder; ``lean`` is the production ``/org/get``. Requests are sent straight to the ASGI
+app, without a client or network, and timed with ``time.process_time``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+ORG_NAME = "Bench Org"
+
+
+async def call(app, path: str, query: bytes) -> int:
+    """Send one GET through the ASGI app and return the status code."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query,
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    status = 0
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Dict[str, Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def measure(app, path: str, query: bytes, requests: int, warmup: int) -> Dict[str, float]:
+    for _ in range(warmup):
+        await call(app, path, query)
+    errors = 0
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for _ in range(requests):
+        if await call(app, path, query) != 200:
+            errors += 1
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    return {
+        "requests": requests,
+        "errors": errors,
+        "cpu_us_per_request": round(cpu / requests * 1e6, 2),
+        "rps": round(requests / wall, 1) if wall else 0.0,
+    }
+
+
+async def benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    os.environ.setdefault("SLOW_REQUEST_MS", "1000000")
+    from fastapi.responses import JSONResponse
+    from mongomock_motor import AsyncMongoMockClient
+
+    from app import config
+    from app.db import db
+    from app.main import app
+    from app.routers.org_router import get_org_service
+    from app.schemas import OrgResponse
+
+    config.get_settings.cache_clear()
+    db._client = AsyncMongoMockClient()  # type: ignore
+
+    async def validated_get(organization_name: str):
+        service = await get_org_service()
+        org_doc = await service.get_organization(organization_name)
+        return OrgResponse(
+            organization_name=org_doc["organization_name"],
+            collection_name=org_doc["collection_name"],
+            admin_email=org_doc["admin"]["email"],
+            created_at=org_doc["created_at"],
+        )
+
+    app.add_api_route(
+        "/bench/org/get_validated", validated_get, methods=["GET"], response_model=OrgResponse, response_class=JSONResponse
+    )
+    service = await get_org_service()
+    await service.create_organization(ORG_NAME, "admin@bench.example", "password123")
+    await service.get_organization(ORG_NAME)
+
+    query = f"organization_name={ORG_NAME.replace(' ', '%20')}".encode()
+    results = {}
+    for name, path in (("validated", "/bench/org/get_validated"), ("lean", "/org/get")):
+        results[name] = await measure(app, path, query, args.requests, args.warmup)
+        print(f"{name}: {results[name]}", file=sys.stderr)
+    before, after = results["validated"]["cpu_us_per_request"], results["lean"]["cpu_us_per_request"]
+    return {
+        "meta": {
+            "requests": args.requests,
+            "python": platform.python_version(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+        "cpu_reduction": round(1 - after / before, 3) if before else 0.0,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000, help="timed requests per route")
+    parser.add_argument("--warmup", type=int, default=1000, help="untimed requests per route first")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    report = asyncio.run(benchmark(args))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""Load-test the API in-process and compare against a stored baseline.
+
+Usage:
+    python -m benchmarks.run_benchmarks --requests 200 --concurrency 16 --output results.json
+    python -m benchmarks.run_benchmarks --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --baseline benchmarks/baseline.json --threshold 0.25
+
+Runs against ``mongomock_motor`` unless ``--mongodb-uri`` points at a real mongod, in which
+case a throwaway master database is created and dropped afterwards.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+SCENARIOS = ("create", "login", "get", "update_rename", "delete")
+PASSWORD = "password123"
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies: List[float], errors: int, wall_seconds: float) -> Dict[str, float]:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / wall_seconds, 2) if wall_seconds else 0.0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+async def drive(
+    count: int, concurrency: int, request: Callable[[int], Awaitable[httpx.Response]], expected: int = 200
+) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker() -> None:
+        nonlocal next_index, errors
+        while next_index < count:
+            index = next_index
+            next_index += 1
+            start = time.perf_counter()
+            response = await request(index)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != expected:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def org_payload(run_id: str, index: int) -> Dict[str, str]:
+    return {"organization_name": f"Bench {run_id} {index}", "email": f"admin{index}@{run_id}.bench", "password": PASSWORD}
+
+
+async def seed(client: httpx.AsyncClient, run_id: str, count: int, concurrency: int) -> List[str]:
+    """Create ``count`` organizations and return an access token for each."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> str:
+        async with semaphore:
+            payload = org_payload(run_id, index)
+            await client.post("/org/create", json=payload)
+            res = await client.post("/admin/login", json={"email": payload["email"], "password": PASSWORD})
+            return res.json()["access_token"]
+
+    return await asyncio.gather(*(one(index) for index in range(count)))
+
+
+async def run_scenarios(client: httpx.AsyncClient, scenarios: List[str], count: int, concurrency: int) -> Dict:
+    results: Dict[str, Dict[str, float]] = {}
+    for scenario in scenarios:
+        run_id = uuid.uuid4().hex[:8]
+        if scenario == "create":
+            results[scenario] = await drive(
+                count, concurrency, lambda i: client.post("/org/create", json=org_payload(run_id, i))
+            )
+            continue
+
+        tokens = await seed(client, run_id, count, concurrency)
+        if scenario == "login":
+            results[scenario] = await drive(
+                count,
+                concurrency,
+                lambda i: client.post("/admin/login", json={"email": org_payload(run_id, i)["email"], "password": PASSWORD}),
+            )
+        elif scenario == "get":
+            results[scenario] = await drive(
+                count,
+                concurrency,
+                lambda i: client.get("/org/get", params={"organization_name": org_payload(run_id, i)["organization_name"]}),
+            )
+        elif scenario == "update_rename":
+            results[scenario] = await drive(
+                count,
+                concurrency,
+                lambda i: client.put(
+                    "/org/update",
+                    headers={"Authorization": f"Bearer {tokens[i]}"},
+                    json={
+                        "organization_name": org_payload(run_id, i)["organization_name"],
+                        "new_organization_name": f"Renamed {run_id} {i}",
+                    },
+                ),
+                expected=202,
+            )
+        elif scenario == "delete":
+            results[scenario] = await drive(
+                count,
+                concurrency,
+                lambda i: client.delete(
+                    "/org/delete",
+                    headers={"Authorization": f"Bearer {tokens[i]}"},
+                    params={"organization_name": org_payload(run_id, i)["organization_name"]},
+                ),
+                expected=202,
+            )
+        print(f"{scenario}: {results[scenario]}", file=sys.stderr)
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """Regressions where p95 latency rose or throughput fell by more than ``threshold`` (a fraction)."""
+    regressions = []
+    for scenario, current in results.items():
+        previous = baseline.get(scenario)
+        if not previous:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            regressions.append(f"{scenario}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if previous["rps"] and current["rps"] < previous["rps"] * (1 - threshold):
+            regressions.append(f"{scenario}: rps {previous['rps']} -> {current['rps']}")
+        if current["errors"] > previous.get("errors", 0):
+            regressions.append(f"{scenario}: errors {previous.get('errors', 0)} -> {current['errors']}")
+    return regressions
+
+
+async def benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.mongodb_uri:
+        os.environ["MONGODB_URI"] = args.mongodb_uri
+        os.environ["MASTER_DB_NAME"] = f"bench_{uuid.uuid4().hex[:8]}"
+
+    from app import config
+    from app.db import db
+    from app.main import app
+
+    config.get_settings.cache_clear()
+    if not args.mongodb_uri:
+        from mongomock_motor import AsyncMongoMockClient
+
+        db._client = AsyncMongoMockClient()  # type: ignore
+
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                results = await run_scenarios(client, args.scenarios, args.requests, args.concurrency)
+    finally:
+        if args.mongodb_uri:
+            from motor.motor_asyncio import AsyncIOMotorClient
+
+            cleanup = AsyncIOMotorClient(args.mongodb_uri)
+            await cleanup.drop_database(os.environ["MASTER_DB_NAME"])
+            cleanup.close()
+
+    return {
+        "meta": {
+            "backend": "mongod" if args.mongodb_uri else "mongomock",
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mongodb-uri", help="benchmark against a real mongod instead of mongomock")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--baseline", help="compare against this results file and exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed regression as a fraction (0.2 = 20%%)")
+    parser.add_argument("--save-baseline", help="write results to this path as the new baseline")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    report = asyncio.run(benchmark(args))
+    print(json.dumps(report, indent=2))
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as handle:
+            json.dump(report, handle, indent=2)
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        regressions = compare(report["results"], baseline["results"], args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+import asyncio
+import sys
+
+from app.db import ensure_master_indexes, get_master_collection
+from app.diagnostics import collection_scans, explain_service_queries
+
+
+async def main() -> int:
+    collection = await get_master_collection()
+    await ensure_master_indexes(collection)
+    plans = await explain_service_queries(collection)
+    for name, stages in plans.items():
+        print(f"{name}: {' -> '.join(stages)}")
+    scans = collection_scans(plans)
+    if scans:
+        print(f"Queries not served by an index: {', '.join(scans)}")
+        return 1
+    print("All service queries use an index")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -1,35 +1,239 @@
+"""Generate a synthetic dataset: N organizations with admin hashes and M documents per tenant.
+
+Usage:
+    python -m scripts.create_sample_data --orgs 50000 --docs 2000 --concurrency 32 --shared-hash
+    python -m scripts.create_sample_data --orgs 100 --docs 500 --bcrypt-rounds 12 --seed 7
+
+Organizations are named ``<prefix> <index>`` with admin ``admin<index>@<prefix-slug>.example`` and the
+``--password`` given, so generated tenants can log in. Everything except bcrypt salts is derived from
+``--seed`` and the org index, so the same arguments always produce the same dataset regardless of
+concurrency. An interrupted run can be repeated: orgs that already exist are not created again, and
+tenants left short of ``--docs`` documents are topped up with the documents they are missing.
+"""
+import argparse
 import asyncio
-from datetime import datetime
+import math
+import random
+import re
+import string
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from passlib.hash import bcrypt
+from pymongo.errors import BulkWriteError
+
+from app.config import get_settings
+from app.db import db, ensure_master_indexes, shard_router
+from app.services.migration_service import DUPLICATE_KEY, CollectionMigrator
+from app.tenancy import TenancyStrategies
+
+KINDS = ("invoice", "ticket", "note", "event", "contact")
+# Payloads are slices of a fixed random block: deterministic and far cheaper than generating text per document.
+FILLER = "".join(random.Random(0).choices(string.ascii_letters + string.digits, k=1 << 16)) * 2
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def hash_password(password: str, rounds: int) -> str:
+    return bcrypt.using(rounds=rounds).hash(password)
+
+
+def org_name(prefix: str, index: int) -> str:
+    return f"{prefix} {index}"
+
+
+def admin_email(prefix: str, index: int) -> str:
+    return f"admin{index}@{re.sub(r'[^a-z0-9]+', '-', prefix.lower()).strip('-')}.example"
+
+
+def document_size(rng: random.Random, mean: int, sigma: float, maximum: int) -> int:
+    # Lognormal sizes: most documents are small, a long tail is large, as in real tenant data.
+    mu = math.log(mean) - sigma * sigma / 2
+    return max(1, min(maximum, len(FILLER) // 2, int(rng.lognormvariate(mu, sigma))))
+
 
-from app.db import db
-from app.utils import safe_collection_name
+def tenant_documents(rng: random.Random, start: int, count: int, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    docs = []
+    for number in range(start, start + count):
+        size = document_size(rng, args.doc_size_mean, args.doc_size_sigma, args.doc_size_max)
+        offset = rng.randrange(len(FILLER) // 2)
+        docs.append(
+            {
+                "_id": ObjectId(rng.getrandbits(96).to_bytes(12, "big")),
+                "number": number,
+                "kind": rng.choice(KINDS),
+                "name": f"Document {number}",
+                "amount": round(rng.uniform(1, 10000), 2),
+                "tags": rng.sample(KINDS, rng.randint(0, 3)),
+                "created_at": EPOCH + timedelta(seconds=rng.randrange(365 * 24 * 3600)),
+                "payload": FILLER[offset : offset + size],
+            }
+        )
+    return docs
 
 
-async def main():
-    master_db = db.get_master_db()
-    orgs = master_db["organizations"]
-    org_name = "Sample Org"
-    collection_name = safe_collection_name(org_name)
+class Generator:
+    def __init__(self, args: argparse.Namespace, master_db: AsyncIOMotorDatabase) -> None:
+        self.args = args
+        self.master_db = master_db
+        self.collection = master_db["organizations"]
+        self.strategy = TenancyStrategies(CollectionMigrator(master_db["migrations"]), args.tenancy).default
+        self.executor = ProcessPoolExecutor(max_workers=args.hash_workers) if not args.shared_hash else None
+        self.shared_hash: Optional[str] = None
+        self.orgs_created = 0
+        self.orgs_skipped = 0
+        self.orgs_topped_up = 0
+        self.docs_inserted = 0
+        self.bytes_inserted = 0
 
-    await orgs.insert_one(
-        {
-            "organization_name": org_name,
-            "collection_name": collection_name,
-            "admin": {"email": "sample@org.com", "password": "hashed_password_here"},
-            "created_at": datetime.utcnow(),
+    def tenant_db(self, org: Dict[str, Any]) -> AsyncIOMotorDatabase:
+        return self.master_db if org.get("shard") is None else shard_router.get_database(org["shard"])
+
+    def org_document(self, index: int, password_hash: str) -> Dict[str, Any]:
+        rng = random.Random(f"{self.args.seed}:org:{index}")
+        name = org_name(self.args.prefix, index)
+        org_id = ObjectId(rng.getrandbits(96).to_bytes(12, "big"))
+        storage = self.strategy.metadata_for(name)
+        if "tenant_id" in storage:
+            storage["tenant_id"] = uuid.UUID(int=rng.getrandbits(128)).hex
+        shard = shard_router.place(str(org_id))
+        return {
+            "_id": org_id,
+            **({"shard": shard} if shard else {}),
+            "organization_name": name,
+            **storage,
+            "admin": {"email": admin_email(self.args.prefix, index), "password": password_hash},
+            "created_at": EPOCH + timedelta(seconds=index),
         }
-    )
-    org_collection = master_db[collection_name]
-    await org_collection.insert_many(
-        [
-            {"name": "Document 1"},
-            {"name": "Document 2"},
-        ]
-    )
-    print(f"Inserted sample data for {org_name} in collection {collection_name}")
 
+    async def hashes(self, count: int) -> List[str]:
+        if self.executor is None:
+            if self.shared_hash is None:
+                self.shared_hash = hash_password(self.args.password, self.args.bcrypt_rounds)
+            return [self.shared_hash] * count
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(
+            *(
+                loop.run_in_executor(self.executor, hash_password, self.args.password, self.args.bcrypt_rounds)
+                for _ in range(count)
+            )
+        )
 
-if __name__ == "__main__":
-    asyncio.run(main())
+    async def insert_orgs(self, indexes: List[int]) -> List[Tuple[Dict[str, Any], bool]]:
+        """Insert the orgs, returning each one to fill with whether it already existed."""
+        orgs = [self.org_document(index, hashed) for index, hashed in zip(indexes, await self.hashes(len(indexes)))]
+        failed = set()
+        try:
+            await self.collection.insert_many(orgs, ordered=False)
+        except BulkWriteError as exc:
+            failed = {error["index"] for error in exc.details.get("writeErrors", [])}
+        self.orgs_skipped += len(failed)
+        created = [(org, False) for position, org in enumerate(orgs) if position not in failed]
+        self.orgs_created += len(created)
+        # Org ids derive from the seed, so an id match means a previous run created it; other clashes are left alone.
+        existing_ids = [orgs[position]["_id"] for position in failed]
+        existing = await self.collection.find({"_id": {"$in": existing_ids}}).to_list(None) if existing_ids else []
+        return created + [(org, True) for org in existing]
+
+    async def fill_tenant(self, org: Dict[str, Any], semaphore: asyncio.Semaphore, existed: bool = False) -> None:
+        async with semaphore:
+            database = self.tenant_db(org)
+            target = self.strategy.collection(database, org)
+            tenant_fields = self.strategy.tenant_filter(org)
+            if existed:
+                if await target.count_documents(tenant_fields) >= self.args.docs:
+                    return
+                # Documents are regenerated identically, so the ones already there are rejected as duplicates.
+                self.orgs_topped_up += 1
+            else:
+                await self.strategy.provision(database, org)
+            index = int(org["organization_name"].rsplit(" ", 1)[1])
+            rng = random.Random(f"{self.args.seed}:docs:{index}")
+            for start in range(0, self.args.docs, self.args.doc_batch_size):
+                count = min(self.args.doc_batch_size, self.args.docs - start)
+                docs = tenant_documents(rng, start, count, self.args)
+                for doc in docs:
+                    doc.update(tenant_fields)
+                try:
+                    await target.insert_many(docs, ordered=False)
+                    inserted = docs
+                except BulkWriteError as exc:
+                    errors = exc.details.get("writeErrors", [])
+                    if any(error.get("code") != DUPLICATE_KEY for error in errors):
+                        raise
+                    duplicates = {error["index"] for error in errors}
+                    inserted = [doc for position, doc in enumerate(docs) if position not in duplicates]
+                self.docs_inserted += len(inserted)
+                self.bytes_inserted += sum(len(doc["payload"]) for doc in inserted)
+
+    async def run(self) -> Dict[str, Any]:
+        await ensure_master_indexes(self.collection)
+        shards = [shard_router.get_database(shard) for shard in sorted(shard_router.shards)]
+        for database in [self.master_db] + shards:
+            await self.strategy.ensure_indexes(database)
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+        started = time.perf_counter()
+        try:
+            for start in range(0, self.args.orgs, self.args.org_batch_size):
+                indexes = list(range(start, min(start + self.args.org_batch_size, self.args.orgs)))
+                orgs = await self.insert_orgs(indexes)
+                await asyncio.gather(*(self.fill_tenant(org, semaphore, existed) for org, existed in orgs))
+                self.report(started, final=False)
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+        return self.report(started, final=True)
+
+    def report(self, started: float, final: bool) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - started
+        stats = {
+            "orgs_created": self.orgs_created,
+            "orgs_skipped": self.orgs_skipped,
+            "orgs_topped_up": self.orgs_topped_up,
+            "docs_inserted": self.docs_inserted,
+            "payload_mb": round(self.bytes_inserted / 1e6, 2),
+            "seconds": round(elapsed, 2),
+            "orgs_per_second": round(self.orgs_created / elapsed, 1) if elapsed else 0.0,
+            "docs_per_second": round(self.docs_inserted / elapsed, 1) if elapsed else 0.0,
+        }
+        label = "Done" if final else "Progress"
+        print(f"{label}: " + ", ".join(f"{key}={value}" for key, value in stats.items()), file=sys.stderr)
+        return stats
 
 
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orgs", type=int, default=10, help="organizations to create")
+    parser.add_argument("--docs", type=int, default=100, help="documents per tenant")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--prefix", default="Sample Org", help="organization name prefix")
+    parser.add_argument("--password", default="password123", help="admin password for every generated org")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4, help="bcrypt cost; the app's default is 12")
+    parser.add_argument("--shared-hash", action="store_true", help="hash once and reuse it for every admin")
+    parser.add_argument("--hash-workers", type=int, default=None, help="processes used for hashing")
+    parser.add_argument("--doc-size-mean", type=int, default=512, help="mean payload size in bytes")
+    parser.add_argument("--doc-size-sigma", type=float, default=1.0, help="lognormal spread of payload sizes")
+    parser.add_argument("--doc-size-max", type=int, default=64 * 1024, help="largest payload in bytes")
+    parser.add_argument("--org-batch-size", type=int, default=1000, help="organizations per insert_many")
+    parser.add_argument("--doc-batch-size", type=int, default=1000, help="documents per insert_many")
+    parser.add_argument("--concurrency", type=int, default=16, help="tenants filled concurrently")
+    parser.add_argument("--tenancy", choices=("collection", "shared"), default=None, help="defaults to TENANCY_MODE")
+    return parser.parse_args(argv)
+
+
+async def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    try:
+        return await Generator(args, db.get_master_db()).run()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print(f"Generating into {get_settings().master_db_name}", file=sys.stderr)
+    asyncio.run(main())